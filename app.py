@@ -1,3 +1,8 @@
+import time
+
+# Boot time is measured from the moment this module starts importing
+_BOOT_STARTED = time.perf_counter()
+
 from flask import Flask, render_template, session, redirect, url_for, jsonify, send_from_directory, flash, request
 from flask_login import LoginManager, login_required, current_user
 from flask_session import Session
@@ -5,7 +10,13 @@ import os
 from datetime import timedelta, datetime
 import pytz  # ADD THIS IMPORT
 from config import Config
-from models.database import init_supabase, check_database_health
+from models.database import (init_supabase, check_database_health, assign_peer_reviews,
+                             run_supabase_diagnostics, start_supabase_diagnostics)
+from models.job_queue import SpoolingRequest
+from models.reminder_engine import reminder_engine
+from models.scheduler_leader import scheduler_leader
+from models.email_outbox import email_outbox
+from models.lazy_imports import current_rss_mb
 from routes.auth import auth_bp
 from routes.admin import admin_bp
 from routes.observer import observer_bp
@@ -13,14 +24,18 @@ from routes.parent import parent_bp
 from routes.messages import messages_bp
 from routes.principal import principal_bp
 from routes.chatbot import chatbot_bp
+from routes.webhooks import webhooks_bp
 import logging
 import sys
-from flask_mail import Mail, Message
+from flask_mail import Mail
 
 # Initialize mail and scheduler with error handling
 mail = Mail()
 scheduler = None
 
+# Worker start-up timings, reported by /health
+startup_metrics = {}
+
 # Try to import and initialize APScheduler
 try:
     from flask_apscheduler import APScheduler
@@ -75,126 +90,53 @@ def send_reminder_email(to, child_name, scheduled_time):
         f"Thank you!"
     )
     try:
-        msg = Message(subject, recipients=[to], body=body)
-        mail.send(msg)
-        logger.info(f"[MAIL] Sent reminder to {to} for session at {scheduled_time}.")
-        print(f"[MAIL] ✅ Sent reminder to {to} for session at {scheduled_time}.")
+        email_outbox.enqueue(to, subject, body, kind='reminder')
+        logger.info(f"[MAIL] Queued reminder to {to} for session at {scheduled_time}.")
         return True
     except Exception as e:
-        logger.error(f"[MAIL] Failed to send email to {to}: {e}", exc_info=True)
-        print(f"[MAIL] ❌ Failed to send email to {to}: {e}")
+        logger.error(f"[MAIL] Failed to queue reminder to {to}: {e}", exc_info=True)
         return False
 
 
 def check_and_send_observer_reminders():
-    """Check for upcoming sessions and send reminders - FIXED VERSION"""
+    """Reload schedules into the reminder engine; the engine itself fires each reminder on time"""
     with scheduler.app.app_context():
-        # Define your timezone (change this to match your location)
-        IST = pytz.timezone('Asia/Kolkata')
-
-        # Get current time in IST
-        now_ist = datetime.now(IST)
-        print(f"[SCHEDULER] Running reminder check at: {now_ist.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-
-        supabase = get_supabase_client()
-        schedules = supabase.table('scheduled_reports').select('*').eq('is_active', True).execute().data or []
-        print(f"[SCHEDULER] Found {len(schedules)} active schedules")
-
-        for sched in schedules:
-            try:
-                observer_id = sched['observer_id']
-                child_id = sched['child_id']
-                scheduled_time_str = sched['scheduled_time']  # e.g., "19:00:00"
-
-                print(
-                    f"[SCHEDULER] Processing schedule: Observer {observer_id}, Child {child_id}, Time {scheduled_time_str}")
-
-                # Parse scheduled time and create datetime object in IST
-                time_parts = scheduled_time_str.split(':')
-                hour = int(time_parts[0])
-                minute = int(time_parts[1])
-
-                # Create today's session datetime in IST
-                session_dt_ist = now_ist.replace(hour=hour, minute=minute, second=0, microsecond=0)
-
-                # If the session time has already passed today, it means it's for tomorrow
-                if session_dt_ist <= now_ist:
-                    session_dt_ist = session_dt_ist + timedelta(days=1)
-
-                # Calculate minutes to session
-                time_diff = session_dt_ist - now_ist
-                mins_to_session = time_diff.total_seconds() / 60.0
-
-                print(f"[SCHEDULER] Session time: {session_dt_ist.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-                print(f"[SCHEDULER] Minutes to session: {mins_to_session:.1f}")
-
-                # reminder window: 29-31 minutes before session
-                if 29.0 <= mins_to_session <= 31.0:
-                    print(f"[SCHEDULER] Session within reminder window (29-31 min)")
-
-                    # Check if observation already submitted today
-                    today_str = now_ist.strftime('%Y-%m-%d')
-                    obs_check = supabase.table('observations').select('id').eq('student_id', child_id).eq('username',
-                                                                                                          observer_id).eq(
-                        'date', today_str).execute()
-
-                    print(
-                        f"[SCHEDULER] Checking for existing observation on {today_str} for child {child_id}, observer {observer_id}")
-                    print(f"[SCHEDULER] Found {len(obs_check.data) if obs_check.data else 0} existing observations")
-
-                    if not obs_check.data:
-                        print(f"[SCHEDULER] ✅ No observation found for today - sending reminder (this is correct!)")
-
-                        # Get observer and child details
-                        observer_response = supabase.table('users').select('email, name').eq('id',
-                                                                                             observer_id).execute()
-                        child_response = supabase.table('children').select('name').eq('id', child_id).execute()
-
-                        if observer_response.data and child_response.data:
-                            observer = observer_response.data[0]
-                            child = child_response.data[0]  # Fixed: was missing [0]
-
-                            print(f"[SCHEDULER] Sending email to {observer['email']} for child {child['name']}")
-                            success = send_reminder_email(
-                                observer['email'],
-                                child['name'],
-                                session_dt_ist.strftime('%I:%M %p')
-                            )
-
-                            if success:
-                                print(f"[SCHEDULER] ✅ Reminder sent successfully")
-                            else:
-                                print(f"[SCHEDULER] ❌ Failed to send reminder")
-                        else:
-                            print("[SCHEDULER] Observer or child not found in database")
-                    else:
-                        print(f"[SCHEDULER] ℹ Observation already submitted today - no reminder needed")
-                else:
-                    print(f"[SCHEDULER] Outside reminder window (need 25-35 min, got {mins_to_session:.1f} min)")
-
-            except Exception as e:
-                print(f"[SCHEDULER] Error processing schedule {sched.get('id', 'unknown')}: {e}")
+        reminder_engine.resync()
 
 
 def create_app():
+    create_started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
+    # Large uploads are buffered on disk next to the job spool, never in memory
+    app.request_class = SpoolingRequest
 
     mail.init_app(app)
     scheduler.init_app(app)
-    scheduler.start()
 
-    # Add the reminder job with better error handling
+    # Reminders fire from the reminder engine's timer heap (armed below when this
+    # worker is elected leader); this job only picks up schedule changes made by other workers
     scheduler.add_job(
         id='observer-reminders',
         func=check_and_send_observer_reminders,
         trigger='interval',
-        minutes=2,  # Changed from 1 to 2 minutes to reduce log spam
+        minutes=Config.REMINDER_RESYNC_MINUTES,
         max_instances=1,  # Prevent overlapping runs
         coalesce=True,  # If multiple runs are pending, only run once
         misfire_grace_time=30  # Allow 30 seconds grace for missed runs
     )
 
+    # Keep the peer review queue topped up with new observations
+    scheduler.add_job(
+        id='peer-review-queue-refill',
+        func=assign_peer_reviews,
+        trigger='interval',
+        minutes=Config.PEER_REVIEW_REFILL_MINUTES,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=60
+    )
+
     @app.route('/test_reminder')
     def test_reminder():
         """Test endpoint for reminder emails"""
@@ -228,6 +170,7 @@ def create_app():
         status = {
             'current_time_ist': now_ist.strftime('%Y-%m-%d %H:%M:%S %Z'),
             'scheduler_running': scheduler.running,
+            'scheduler_leader': scheduler_leader.status(),
             'active_schedules': len(schedules),
             'schedules': []
         }
@@ -252,6 +195,9 @@ def create_app():
                 'in_reminder_window': 25.0 <= mins_to_session <= 35.0
             })
 
+        status['reminder_engine'] = reminder_engine.stats()
+        status['next_reminders'] = reminder_engine.upcoming()
+
         return jsonify(status)
 
     # Register datetimeformat filter for Jinja2 templates
@@ -313,17 +259,43 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        from models.database import get_user_by_id
-        return get_user_by_id(user_id)
+        from models.database import get_cached_user
+        return get_cached_user(user_id)
 
-    # Initialize database with better error handling
+    # Initialize database with better error handling. In the default lazy mode the
+    # client is created on first use and nothing here waits on the network.
+    if Config.SUPABASE_INIT_MODE == 'eager':
+        try:
+            logger.info("Initializing Supabase connection...")
+            init_supabase()
+            logger.info("Supabase initialization successful")
+        except Exception as e:
+            logger.error(f"Failed to initialize Supabase: {e}")
+            logger.warning("Application starting without database connection")
+    elif Config.SUPABASE_DIAGNOSTICS == 'background':
+        start_supabase_diagnostics()
+
+    # Start background workers for queued observation processing
     try:
-        logger.info("Initializing Supabase connection...")
-        init_supabase()
-        logger.info("Supabase initialization successful")
+        from models.job_queue import job_queue
+        job_queue.start()
     except Exception as e:
-        logger.error(f"Failed to initialize Supabase: {e}")
-        logger.warning("Application starting without database connection")
+        logger.error(f"Failed to start job queue: {e}")
+
+    # Start the email sender; routes and jobs only enqueue messages
+    try:
+        email_outbox.start()
+    except Exception as e:
+        logger.error(f"Failed to start email outbox: {e}")
+
+    # Arm observer session reminders
+    try:
+        reminder_engine.start(scheduler, send_reminder_email)
+    except Exception as e:
+        logger.error(f"Failed to start reminder engine: {e}")
+
+    # Scheduled jobs run only in the elected leader worker; the rest keep their scheduler paused
+    scheduler_leader.start(scheduler, on_elected=reminder_engine.rearm)
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -333,6 +305,7 @@ def create_app():
     app.register_blueprint(messages_bp, url_prefix='/messages')
     app.register_blueprint(principal_bp, url_prefix='/principal')
     app.register_blueprint(chatbot_bp)
+    app.register_blueprint(webhooks_bp, url_prefix='/webhooks')
 
     # FIX: Add favicon route to prevent 404 errors
     @app.route('/favicon.ico')
@@ -343,10 +316,29 @@ def create_app():
     # Health check endpoint
     @app.route('/health')
     def health_check():
+        from models.http_client import http_client_stats
+        from models.content_cache import content_cache
+        from models.generation_cache import generation_cache
+        from models.user_cache import user_cache
+        from models.signed_urls import signed_url_cache
+        from models.ocr_image import ocr_stats
+        from models.lazy_imports import loaded_lazy_modules
+        if Config.SUPABASE_DIAGNOSTICS == 'health' or request.args.get('diagnostics'):
+            run_supabase_diagnostics()
         db_health = check_database_health()
         return jsonify({
             'app_status': 'running',
             'database': db_health,
+            'http_clients': http_client_stats(),
+            'content_cache': content_cache.stats(),
+            'generation_cache': generation_cache.stats(),
+            'email_outbox': email_outbox.stats(),
+            'user_cache': user_cache.stats(),
+            'signed_urls': signed_url_cache.stats(),
+            'ocr_uploads': ocr_stats.stats(),
+            'startup': startup_metrics,
+            'deferred_imports': loaded_lazy_modules(),
+            'rss_mb': current_rss_mb(),
             'timestamp': datetime.now().isoformat()
         })
 
@@ -465,6 +457,18 @@ def create_app():
     def not_found_error(error):
         return render_template('errors/404.html'), 404
 
+    startup_metrics.update({
+        'create_app_seconds': round(time.perf_counter() - create_started, 3),
+        'boot_seconds': round(time.perf_counter() - _BOOT_STARTED, 3),
+        'ready_at': datetime.now().isoformat(),
+        'supabase_init_mode': Config.SUPABASE_INIT_MODE,
+        'pid': os.getpid(),
+        'rss_mb': current_rss_mb(),
+    })
+    logger.info(f"App ready in {startup_metrics['boot_seconds']}s "
+                f"(create_app {startup_metrics['create_app_seconds']}s, Supabase {Config.SUPABASE_INIT_MODE}, "
+                f"RSS {startup_metrics['rss_mb']} MB)")
+
     return app
 
 
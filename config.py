@@ -32,9 +32,9 @@ class Config:
     EMAIL_USER = os.environ.get('EMAIL_USER')
     ADMIN_USER = os.environ.get('ADMIN_USER')
     ADMIN_PASS = os.environ.get('ADMIN_PASS')
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', '587'))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'True').lower() == 'true'
     MAIL_USERNAME = os.environ.get('EMAIL_USER')  # your email
     MAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD')  # your app password
     MAIL_DEFAULT_SENDER = os.environ.get('EMAIL_USER')
@@ -43,6 +43,124 @@ class Config:
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 25 * 1024 * 1024  # 25MB max file size (was 16MB)
 
+    # Background job queue (observation processing)
+    JOB_QUEUE_DIR = os.environ.get('JOB_QUEUE_DIR', 'job_queue')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '900'))
+    # Running jobs renew their lease this often, so a long job is never re-claimed while alive
+    JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', '60'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '2'))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '1.0'))
+    JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', str(7 * 24 * 3600)))
+    # Spooled uploads with no live job are removed at start-up once this old
+    JOB_SPOOL_ORPHAN_SECONDS = int(os.environ.get('JOB_SPOOL_ORPHAN_SECONDS', '3600'))
+    PIPELINE_MAX_WORKERS = int(os.environ.get('PIPELINE_MAX_WORKERS', '6'))
+    JOB_MEMORY_SAMPLE_INTERVAL = float(os.environ.get('JOB_MEMORY_SAMPLE_INTERVAL', '0.05'))
+
+    # Outbound HTTP clients for OCR / Groq / AssemblyAI
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '10'))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '120'))
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '3'))
+    HTTP_BACKOFF_BASE = float(os.environ.get('HTTP_BACKOFF_BASE', '0.5'))
+    HTTP_BACKOFF_CAP = float(os.environ.get('HTTP_BACKOFF_CAP', '20'))
+    OCR_MAX_CONCURRENCY = int(os.environ.get('OCR_MAX_CONCURRENCY', '4'))
+    # Images are downscaled to this long side and re-encoded before OCR (models/ocr_image)
+    OCR_MAX_IMAGE_DIMENSION = int(os.environ.get('OCR_MAX_IMAGE_DIMENSION', '2000'))
+    OCR_JPEG_QUALITY = int(os.environ.get('OCR_JPEG_QUALITY', '85'))
+    GROQ_MAX_CONCURRENCY = int(os.environ.get('GROQ_MAX_CONCURRENCY', '4'))
+    ASSEMBLYAI_MAX_CONCURRENCY = int(os.environ.get('ASSEMBLYAI_MAX_CONCURRENCY', '4'))
+    ASSEMBLYAI_UPLOAD_TIMEOUT = float(os.environ.get('ASSEMBLYAI_UPLOAD_TIMEOUT', '300'))
+
+    # Content-addressed cache of OCR / transcription / Groq results for re-uploaded files
+    CONTENT_CACHE_ENABLED = os.environ.get('CONTENT_CACHE_ENABLED', 'True').lower() == 'true'
+    CONTENT_CACHE_PATH = os.environ.get('CONTENT_CACHE_PATH', os.path.join('cache', 'content_cache.sqlite3'))
+    CONTENT_CACHE_MAX_BYTES = int(os.environ.get('CONTENT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+    # Gemini response cache: TTLs per feature, entries for a child dropped when it gets a new observation
+    GENERATION_CACHE_ENABLED = os.environ.get('GENERATION_CACHE_ENABLED', 'True').lower() == 'true'
+    GENERATION_CACHE_PATH = os.environ.get('GENERATION_CACHE_PATH', os.path.join('cache', 'generation_cache.sqlite3'))
+    GENERATION_CACHE_MAX_BYTES = int(os.environ.get('GENERATION_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    GENERATION_CACHE_TTL_TOPIC_SUGGESTIONS = int(os.environ.get('GENERATION_CACHE_TTL_TOPIC_SUGGESTIONS', '21600'))
+    GENERATION_CACHE_TTL_CUSTOM_REPORT = int(os.environ.get('GENERATION_CACHE_TTL_CUSTOM_REPORT', '86400'))
+    GENERATION_CACHE_TTL_MONTHLY_REPORT = int(os.environ.get('GENERATION_CACHE_TTL_MONTHLY_REPORT', str(7 * 86400)))
+    GENERATION_CACHE_TTL_CHATBOT = int(os.environ.get('GENERATION_CACHE_TTL_CHATBOT', '86400'))
+
+    # AssemblyAI transcription: base URL can point at a local stub server for tests.
+    # Setting ASSEMBLYAI_WEBHOOK_URL (public URL of /webhooks/assemblyai) switches
+    # audio jobs to webhook mode; the poller below is then only a fallback.
+    ASSEMBLYAI_BASE_URL = os.environ.get('ASSEMBLYAI_BASE_URL', 'https://api.assemblyai.com')
+    ASSEMBLYAI_WEBHOOK_URL = os.environ.get('ASSEMBLYAI_WEBHOOK_URL')
+    ASSEMBLYAI_WEBHOOK_SECRET = os.environ.get('ASSEMBLYAI_WEBHOOK_SECRET')
+    ASSEMBLYAI_WEBHOOK_FALLBACK_DELAY = float(os.environ.get('ASSEMBLYAI_WEBHOOK_FALLBACK_DELAY', '60'))
+    ASSEMBLYAI_WEBHOOK_FALLBACK_MAX_INTERVAL = float(os.environ.get('ASSEMBLYAI_WEBHOOK_FALLBACK_MAX_INTERVAL', '300'))
+    ASSEMBLYAI_POLL_INITIAL = float(os.environ.get('ASSEMBLYAI_POLL_INITIAL', '2'))
+    ASSEMBLYAI_POLL_MAX_INTERVAL = float(os.environ.get('ASSEMBLYAI_POLL_MAX_INTERVAL', '30'))
+    ASSEMBLYAI_TRANSCRIPT_DEADLINE = float(os.environ.get('ASSEMBLYAI_TRANSCRIPT_DEADLINE', '1800'))
+    # Audio jobs poll inline for at most this long, then park and continue on the fallback timer
+    ASSEMBLYAI_INLINE_WAIT_SECONDS = float(os.environ.get('ASSEMBLYAI_INLINE_WAIT_SECONDS', '300'))
+
+    # Admin dashboard report table page size (keyset pagination)
+    ADMIN_DASHBOARD_PAGE_SIZE = int(os.environ.get('ADMIN_DASHBOARD_PAGE_SIZE', '50'))
+
+    # Peer review: only observations from the last N days are offered for review
+    PEER_REVIEW_WINDOW_DAYS = int(os.environ.get('PEER_REVIEW_WINDOW_DAYS', '7'))
+    # Each visit to the peer review page claims at most a small batch (within the
+    # observer's remaining allowance); claims are held for the lease, then offered
+    # to other observers again
+    PEER_REVIEW_CLAIM_BATCH = int(os.environ.get('PEER_REVIEW_CLAIM_BATCH', '5'))
+    PEER_REVIEW_LEASE_SECONDS = int(os.environ.get('PEER_REVIEW_LEASE_SECONDS', str(2 * 3600)))
+    PEER_REVIEW_REFILL_BATCH = int(os.environ.get('PEER_REVIEW_REFILL_BATCH', '500'))
+    PEER_REVIEW_REFILL_MINUTES = int(os.environ.get('PEER_REVIEW_REFILL_MINUTES', '5'))
+
+    # Observer session reminders: sent REMINDER_LEAD_MINUTES before each scheduled session
+    REMINDER_TIMEZONE = os.environ.get('REMINDER_TIMEZONE', 'Asia/Kolkata')
+    REMINDER_LEAD_MINUTES = int(os.environ.get('REMINDER_LEAD_MINUTES', '30'))
+    # Reminders found late by up to this much (e.g. after a restart) are still sent
+    REMINDER_GRACE_SECONDS = int(os.environ.get('REMINDER_GRACE_SECONDS', '120'))
+    REMINDER_RETRY_SECONDS = int(os.environ.get('REMINDER_RETRY_SECONDS', '60'))
+    # Schedules are reloaded this often to pick up changes made by other workers (and to
+    # re-arm a reminder job APScheduler dropped); one query on the leader per run
+    REMINDER_RESYNC_MINUTES = int(os.environ.get('REMINDER_RESYNC_MINUTES', '1'))
+
+    # Only one worker runs APScheduler jobs: 'file' elects one per host, 'database'
+    # one per cluster (migrations/007), 'none' runs them in every worker
+    SCHEDULER_LEADER_BACKEND = os.environ.get('SCHEDULER_LEADER_BACKEND', 'file').lower()
+    SCHEDULER_LOCK_PATH = os.environ.get('SCHEDULER_LOCK_PATH', os.path.join('job_queue', 'scheduler.lock'))
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', '60'))
+    SCHEDULER_LEASE_RENEW_SECONDS = int(os.environ.get('SCHEDULER_LEASE_RENEW_SECONDS', '15'))
+
+    # Outgoing email is queued in a local outbox and sent by a background worker
+    EMAIL_OUTBOX_PATH = os.environ.get('EMAIL_OUTBOX_PATH', os.path.join('job_queue', 'outbox.sqlite3'))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', '20'))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+    EMAIL_OUTBOX_BACKOFF_BASE = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_BASE', '30'))
+    EMAIL_OUTBOX_BACKOFF_CAP = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_CAP', '3600'))
+    EMAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get('EMAIL_OUTBOX_POLL_INTERVAL', '2'))
+    EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS', '300'))
+    EMAIL_OUTBOX_RETENTION_SECONDS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_SECONDS', str(30 * 24 * 3600)))
+    # The SMTP connection is kept open between batches and closed after this much idle time
+    EMAIL_SMTP_IDLE_SECONDS = float(os.environ.get('EMAIL_SMTP_IDLE_SECONDS', '60'))
+    EMAIL_SMTP_TIMEOUT = float(os.environ.get('EMAIL_SMTP_TIMEOUT', '30'))
+
+    # Supabase client start-up: 'lazy' creates the client on first use without any
+    # network round trip, 'eager' connects (with diagnostics and retries) in create_app.
+    # Connectivity diagnostics run in a 'background' thread at start-up, on every
+    # /health request ('health'), or only via /health?diagnostics=1 ('off')
+    SUPABASE_INIT_MODE = os.environ.get('SUPABASE_INIT_MODE', 'lazy').lower()
+    SUPABASE_DIAGNOSTICS = os.environ.get('SUPABASE_DIAGNOSTICS', 'background').lower()
+
+    # Logged-in users are cached per worker for the user_loader; edits and
+    # deletes made elsewhere show up after the TTL at most
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', '300'))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '4096'))
+
+    # Signed audio URLs are created in batches and reused until shortly before
+    # they expire (models/signed_urls)
+    SIGNED_URL_EXPIRES_SECONDS = int(os.environ.get('SIGNED_URL_EXPIRES_SECONDS', '3600'))
+    SIGNED_URL_REFRESH_MARGIN_SECONDS = int(os.environ.get('SIGNED_URL_REFRESH_MARGIN_SECONDS', '300'))
+    SIGNED_URL_CACHE_MAX_ENTRIES = int(os.environ.get('SIGNED_URL_CACHE_MAX_ENTRIES', '4096'))
+    SIGNED_URL_BATCH_SIZE = int(os.environ.get('SIGNED_URL_BATCH_SIZE', '100'))
+
     # Mobile optimization settings
     MOBILE_USER_AGENTS = [
         'android', 'iphone', 'mobile', 'blackberry',
@@ -0,0 +1,19 @@
+-- Admin dashboard: precomputed report flag and keyset pagination index.
+-- New rows get has_formatted_report from the app at insert time; this
+-- backfills existing rows from the formatted_report key in full_data.
+-- Required: observation inserts, the admin dashboard and the peer review
+-- pages all use the column, with no fallback for databases without it.
+
+ALTER TABLE observations
+    ADD COLUMN IF NOT EXISTS has_formatted_report boolean NOT NULL DEFAULT false;
+
+UPDATE observations
+SET has_formatted_report = true
+WHERE has_formatted_report = false
+  AND full_data IS NOT NULL
+  AND full_data LIKE '%"formatted_report"%'
+  AND coalesce(full_data::jsonb ->> 'formatted_report', '') <> '';
+
+-- Keyset pagination order used by /admin/dashboard: (timestamp DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_observations_timestamp_id
+    ON observations ("timestamp" DESC, id DESC);
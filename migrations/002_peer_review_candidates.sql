@@ -0,0 +1,14 @@
+-- Peer review candidate query (get_peer_review_candidates):
+--   observations in the review window, by other observers, with no peer_reviews row.
+-- The window scan uses idx_observations_timestamp_id from 001; the anti-join
+-- probes peer_reviews by observation_id.
+
+CREATE INDEX IF NOT EXISTS idx_peer_reviews_observation_id
+    ON peer_reviews (observation_id);
+
+-- Completed reviews list on the same page
+CREATE INDEX IF NOT EXISTS idx_peer_reviews_reviewer_created
+    ON peer_reviews (reviewer_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_observations_username_timestamp
+    ON observations (username, "timestamp" DESC);
@@ -0,0 +1,51 @@
+-- Claim-based peer review work queue.
+-- Each observation awaiting review has one row. Observers claim rows with
+-- claim_peer_reviews(), which locks with SKIP LOCKED so concurrent callers
+-- never receive the same observation; a claim not completed before its
+-- lease expires becomes claimable again.
+
+CREATE TABLE IF NOT EXISTS peer_review_queue (
+    observation_id uuid PRIMARY KEY REFERENCES observations (id) ON DELETE CASCADE,
+    author_id text NOT NULL,
+    source_timestamp timestamptz NOT NULL,
+    status text NOT NULL DEFAULT 'available',  -- available | claimed | completed
+    claimed_by text,
+    claimed_at timestamptz,
+    lease_expires_at timestamptz,
+    completed_at timestamptz,
+    enqueued_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_peer_review_queue_claimable
+    ON peer_review_queue (status, source_timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_peer_review_queue_claimed_by
+    ON peer_review_queue (claimed_by, status);
+
+CREATE OR REPLACE FUNCTION claim_peer_reviews(
+    p_reviewer_id text,
+    p_limit integer,
+    p_lease_seconds integer,
+    p_since timestamptz
+)
+RETURNS SETOF peer_review_queue
+LANGUAGE sql
+AS $$
+    WITH picked AS (
+        SELECT observation_id
+        FROM peer_review_queue
+        WHERE author_id <> p_reviewer_id
+          AND source_timestamp >= p_since
+          AND (status = 'available' OR (status = 'claimed' AND lease_expires_at < now()))
+        ORDER BY source_timestamp DESC
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE peer_review_queue q
+    SET status = 'claimed',
+        claimed_by = p_reviewer_id,
+        claimed_at = now(),
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    FROM picked
+    WHERE q.observation_id = picked.observation_id
+    RETURNING q.*;
+$$;
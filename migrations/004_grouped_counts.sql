@@ -0,0 +1,45 @@
+-- Grouped row counts in one round trip (count_rows_grouped in models/database.py).
+--
+--   select * from grouped_counts('observations', 'username', 'processed_by_admin', '{}'::jsonb);
+--
+-- returns one row per (group_key, split_key) with its row count. Keys are
+-- returned as text; p_filters is a jsonb object of column = value equality
+-- filters. Only whitelisted tables can be counted, and identifiers are quoted,
+-- so the function is safe to expose through PostgREST.
+
+CREATE OR REPLACE FUNCTION grouped_counts(
+    p_table text,
+    p_group_by text,
+    p_split_by text DEFAULT NULL,
+    p_filters jsonb DEFAULT '{}'::jsonb
+)
+RETURNS TABLE (group_key text, split_key text, row_count bigint)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_where text := '';
+    v_filter record;
+BEGIN
+    IF p_table NOT IN ('observations', 'users', 'children', 'goals', 'messages',
+                       'peer_reviews', 'observer_peer_reviews', 'observer_child_mappings') THEN
+        RAISE EXCEPTION 'grouped_counts: table % is not allowed', p_table;
+    END IF;
+
+    FOR v_filter IN SELECT key, value FROM jsonb_each_text(COALESCE(p_filters, '{}'::jsonb)) LOOP
+        v_where := v_where || format(' AND %I::text = %L', v_filter.key, v_filter.value);
+    END LOOP;
+
+    RETURN QUERY EXECUTE format(
+        'SELECT %I::text, %s, count(*) FROM %I WHERE true%s GROUP BY 1, 2',
+        p_group_by,
+        CASE WHEN p_split_by IS NULL THEN 'NULL::text' ELSE format('%I::text', p_split_by) END,
+        p_table,
+        v_where
+    );
+END;
+$$;
+
+-- Observer report counts group observations by (username, processed_by_admin)
+CREATE INDEX IF NOT EXISTS idx_observations_username_processed
+    ON observations (username, processed_by_admin);
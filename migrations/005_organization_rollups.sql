@@ -0,0 +1,293 @@
+-- Per-organization counters (get_organization_rollups in models/database.py).
+--
+-- organization_rollups holds user counts by role, children, observations and
+-- observations still waiting for an AI communication review; observations per
+-- day live in organization_daily_observations. Both are kept current by
+-- triggers on users, children and observations, and can be recomputed with
+--
+--   select rebuild_organization_rollups();          -- every organization
+--   select rebuild_organization_rollups('<org id>'); -- one organization
+--
+-- Observations belong to the organization of the observer in observations.username.
+-- When an observer moves to another organization, their observations (and
+-- the per-day counts) move with them.
+
+CREATE TABLE IF NOT EXISTS organization_rollups (
+    organization_id text PRIMARY KEY,
+    total_users integer NOT NULL DEFAULT 0,
+    observers integer NOT NULL DEFAULT 0,
+    parents integer NOT NULL DEFAULT 0,
+    principals integer NOT NULL DEFAULT 0,
+    children integer NOT NULL DEFAULT 0,
+    observations integer NOT NULL DEFAULT 0,
+    ai_reviews_pending integer NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS organization_daily_observations (
+    organization_id text NOT NULL,
+    day date NOT NULL,
+    observations integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, day)
+);
+
+-- Observation -> organization lookups in the triggers below
+CREATE INDEX IF NOT EXISTS idx_users_organization_role
+    ON users (organization_id, role);
+
+
+CREATE OR REPLACE FUNCTION observation_has_ai_review(p_full_data text)
+RETURNS boolean
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+BEGIN
+    RETURN nullif(btrim(p_full_data::jsonb ->> 'communication_review'), '') IS NOT NULL;
+EXCEPTION WHEN others THEN
+    RETURN false;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION observation_organization(p_username text)
+RETURNS text
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT organization_id::text FROM users WHERE id::text = p_username LIMIT 1;
+$$;
+
+-- STABLE, not IMMUTABLE: the text -> timestamptz cast depends on the session
+-- time zone and the fallback on current_date
+CREATE OR REPLACE FUNCTION observation_day(p_timestamp text)
+RETURNS date
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    RETURN coalesce(p_timestamp::timestamptz::date, current_date);
+EXCEPTION WHEN others THEN
+    RETURN current_date;
+END;
+$$;
+
+-- Add deltas to one organization's counters
+CREATE OR REPLACE FUNCTION bump_organization_rollup(
+    p_organization_id text,
+    p_users integer DEFAULT 0,
+    p_role text DEFAULT NULL,
+    p_children integer DEFAULT 0,
+    p_observations integer DEFAULT 0,
+    p_ai_reviews_pending integer DEFAULT 0
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_organization_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO organization_rollups (organization_id) VALUES (p_organization_id)
+    ON CONFLICT (organization_id) DO NOTHING;
+
+    UPDATE organization_rollups SET
+        total_users = total_users + p_users,
+        observers = observers + CASE WHEN p_role = 'Observer' THEN p_users ELSE 0 END,
+        parents = parents + CASE WHEN p_role = 'Parent' THEN p_users ELSE 0 END,
+        principals = principals + CASE WHEN p_role = 'Principal' THEN p_users ELSE 0 END,
+        children = children + p_children,
+        observations = observations + p_observations,
+        ai_reviews_pending = ai_reviews_pending + p_ai_reviews_pending,
+        updated_at = now()
+    WHERE organization_id = p_organization_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION bump_organization_day(p_organization_id text, p_day date, p_delta integer)
+RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO organization_daily_observations (organization_id, day, observations)
+    SELECT p_organization_id, p_day, p_delta
+    WHERE p_organization_id IS NOT NULL
+    ON CONFLICT (organization_id, day)
+    DO UPDATE SET observations = organization_daily_observations.observations + EXCLUDED.observations;
+$$;
+
+-- Move an observer's observation counts from one organization to another
+CREATE OR REPLACE FUNCTION move_observer_observations(p_username text, p_from text, p_to text)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_observations integer;
+    v_ai_reviews_pending integer;
+    v_day record;
+BEGIN
+    SELECT count(*), count(*) FILTER (WHERE NOT observation_has_ai_review(full_data::text))
+    INTO v_observations, v_ai_reviews_pending
+    FROM observations
+    WHERE username::text = p_username;
+
+    IF v_observations = 0 THEN
+        RETURN;
+    END IF;
+
+    PERFORM bump_organization_rollup(p_from, p_observations => -v_observations,
+                                     p_ai_reviews_pending => -v_ai_reviews_pending);
+    PERFORM bump_organization_rollup(p_to, p_observations => v_observations,
+                                     p_ai_reviews_pending => v_ai_reviews_pending);
+
+    FOR v_day IN
+        SELECT observation_day("timestamp"::text) AS day, count(*)::integer AS observations
+        FROM observations
+        WHERE username::text = p_username
+        GROUP BY 1
+    LOOP
+        PERFORM bump_organization_day(p_from, v_day.day, -v_day.observations);
+        PERFORM bump_organization_day(p_to, v_day.day, v_day.observations);
+    END LOOP;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION organization_rollup_users_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_organization_rollup(OLD.organization_id::text, p_users => -1, p_role => OLD.role);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_organization_rollup(NEW.organization_id::text, p_users => 1, p_role => NEW.role);
+    END IF;
+    IF TG_OP = 'UPDATE' AND OLD.organization_id IS DISTINCT FROM NEW.organization_id THEN
+        PERFORM move_observer_observations(NEW.id::text, OLD.organization_id::text,
+                                           NEW.organization_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION organization_rollup_children_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_organization_rollup(OLD.organization_id::text, p_children => -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_organization_rollup(NEW.organization_id::text, p_children => 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION organization_rollup_observations_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_org text;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_org := observation_organization(OLD.username::text);
+        PERFORM bump_organization_rollup(
+            v_org, p_observations => -1,
+            p_ai_reviews_pending => CASE WHEN observation_has_ai_review(OLD.full_data::text) THEN 0 ELSE -1 END);
+        PERFORM bump_organization_day(v_org, observation_day(OLD."timestamp"::text), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_org := observation_organization(NEW.username::text);
+        PERFORM bump_organization_rollup(
+            v_org, p_observations => 1,
+            p_ai_reviews_pending => CASE WHEN observation_has_ai_review(NEW.full_data::text) THEN 0 ELSE 1 END);
+        PERFORM bump_organization_day(v_org, observation_day(NEW."timestamp"::text), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS organization_rollup_users ON users;
+CREATE TRIGGER organization_rollup_users
+    AFTER INSERT OR DELETE OR UPDATE OF organization_id, role ON users
+    FOR EACH ROW EXECUTE FUNCTION organization_rollup_users_trigger();
+
+DROP TRIGGER IF EXISTS organization_rollup_children ON children;
+CREATE TRIGGER organization_rollup_children
+    AFTER INSERT OR DELETE OR UPDATE OF organization_id ON children
+    FOR EACH ROW EXECUTE FUNCTION organization_rollup_children_trigger();
+
+DROP TRIGGER IF EXISTS organization_rollup_observations ON observations;
+CREATE TRIGGER organization_rollup_observations
+    AFTER INSERT OR DELETE OR UPDATE OF username, full_data, "timestamp" ON observations
+    FOR EACH ROW EXECUTE FUNCTION organization_rollup_observations_trigger();
+
+
+CREATE OR REPLACE FUNCTION rebuild_organization_rollups(p_organization_id text DEFAULT NULL)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows integer;
+BEGIN
+    DELETE FROM organization_rollups
+    WHERE p_organization_id IS NULL OR organization_id = p_organization_id;
+    DELETE FROM organization_daily_observations
+    WHERE p_organization_id IS NULL OR organization_id = p_organization_id;
+
+    WITH org_users AS (
+        SELECT organization_id::text AS organization_id,
+               count(*) AS total_users,
+               count(*) FILTER (WHERE role = 'Observer') AS observers,
+               count(*) FILTER (WHERE role = 'Parent') AS parents,
+               count(*) FILTER (WHERE role = 'Principal') AS principals
+        FROM users
+        WHERE organization_id IS NOT NULL
+        GROUP BY 1
+    ), org_children AS (
+        SELECT organization_id::text AS organization_id, count(*) AS children
+        FROM children
+        WHERE organization_id IS NOT NULL
+        GROUP BY 1
+    ), org_observations AS (
+        SELECT u.organization_id::text AS organization_id,
+               count(*) AS observations,
+               count(*) FILTER (WHERE NOT observation_has_ai_review(o.full_data::text)) AS ai_reviews_pending
+        FROM observations o
+        JOIN users u ON u.id::text = o.username::text
+        WHERE u.organization_id IS NOT NULL
+        GROUP BY 1
+    ), orgs AS (
+        SELECT organization_id FROM org_users
+        UNION SELECT organization_id FROM org_children
+        UNION SELECT organization_id FROM org_observations
+    )
+    INSERT INTO organization_rollups (organization_id, total_users, observers, parents, principals,
+                                      children, observations, ai_reviews_pending)
+    SELECT orgs.organization_id,
+           coalesce(u.total_users, 0), coalesce(u.observers, 0), coalesce(u.parents, 0),
+           coalesce(u.principals, 0), coalesce(c.children, 0), coalesce(o.observations, 0),
+           coalesce(o.ai_reviews_pending, 0)
+    FROM orgs
+    LEFT JOIN org_users u USING (organization_id)
+    LEFT JOIN org_children c USING (organization_id)
+    LEFT JOIN org_observations o USING (organization_id)
+    WHERE p_organization_id IS NULL OR orgs.organization_id = p_organization_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    INSERT INTO organization_daily_observations (organization_id, day, observations)
+    SELECT u.organization_id::text, observation_day(o."timestamp"::text), count(*)
+    FROM observations o
+    JOIN users u ON u.id::text = o.username::text
+    WHERE u.organization_id IS NOT NULL
+      AND (p_organization_id IS NULL OR u.organization_id::text = p_organization_id)
+    GROUP BY 1, 2;
+
+    RETURN v_rows;
+END;
+$$;
+
+SELECT rebuild_organization_rollups();
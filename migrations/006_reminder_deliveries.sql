@@ -0,0 +1,12 @@
+-- One reminder per schedule per session day (models/reminder_engine.py).
+-- The engine inserts (schedule_id, session_date) before sending; a conflict
+-- means another worker or an earlier run already sent it.
+
+CREATE TABLE IF NOT EXISTS reminder_deliveries (
+    schedule_id text NOT NULL,
+    session_date date NOT NULL,
+    observer_id text,
+    child_id text,
+    sent_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (schedule_id, session_date)
+);
@@ -0,0 +1,37 @@
+-- Cluster-wide scheduler leader lease (SCHEDULER_LEADER_BACKEND=database,
+-- models/scheduler_leader.py). A worker holds the lease while it keeps
+-- renewing it; once it lapses any other worker can take over.
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name text PRIMARY KEY,
+    holder text NOT NULL,
+    acquired_at timestamptz NOT NULL DEFAULT now(),
+    renewed_at timestamptz NOT NULL DEFAULT now(),
+    expires_at timestamptz NOT NULL
+);
+
+-- Take or renew the lease; returns the current holder row either way
+CREATE OR REPLACE FUNCTION acquire_scheduler_lease(p_name text, p_holder text, p_lease_seconds int)
+RETURNS SETOF scheduler_leases
+LANGUAGE sql
+AS $$
+    INSERT INTO scheduler_leases (name, holder, acquired_at, renewed_at, expires_at)
+    VALUES (p_name, p_holder, now(), now(), now() + make_interval(secs => p_lease_seconds))
+    ON CONFLICT (name) DO UPDATE SET
+        holder = EXCLUDED.holder,
+        acquired_at = CASE WHEN scheduler_leases.holder = EXCLUDED.holder
+                           THEN scheduler_leases.acquired_at ELSE now() END,
+        renewed_at = now(),
+        expires_at = EXCLUDED.expires_at
+    WHERE scheduler_leases.holder = EXCLUDED.holder OR scheduler_leases.expires_at < now();
+
+    SELECT * FROM scheduler_leases WHERE name = p_name;
+$$;
+
+-- Give the lease up on clean shutdown so another worker takes over immediately
+CREATE OR REPLACE FUNCTION release_scheduler_lease(p_name text, p_holder text)
+RETURNS void
+LANGUAGE sql
+AS $$
+    DELETE FROM scheduler_leases WHERE name = p_name AND holder = p_holder;
+$$;
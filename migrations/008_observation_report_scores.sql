@@ -0,0 +1,12 @@
+-- Scores parsed from the formatted report at save time (models/report_scores.py):
+--   {"v": 2, "growth": {"Intellectual": "excellent", "Social": "needs work", ...},
+--    "communication": {"confidence": "strong", ...}, "curiosity_index": 7, "growth_score": 5}
+-- Growth ratings are excellent | good | fair | needs work; "v" is SCORES_VERSION.
+-- Existing rows are filled by tools/backfill_report_scores.py.
+-- Required: every observation insert writes report_scores.
+
+ALTER TABLE observations ADD COLUMN IF NOT EXISTS report_scores jsonb;
+
+-- Backfill scans for rows still missing scores
+CREATE INDEX IF NOT EXISTS idx_observations_report_scores_missing
+    ON observations (id) WHERE report_scores IS NULL;
@@ -12,6 +12,7 @@ from .database import (
     init_supabase,
     get_supabase_client,
     get_user_by_id,
+    get_cached_user,
     authenticate_user,
     create_user,
     get_children,
@@ -42,6 +43,7 @@ __all__ = [
     'init_supabase',
     'get_supabase_client',
     'get_user_by_id',
+    'get_cached_user',
     'authenticate_user',
     'create_user',
     'get_children',
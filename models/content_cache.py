@@ -0,0 +1,224 @@
+"""
+Content-addressed cache for OCR, transcription and Groq structuring results.
+
+Observers often re-upload the same sheet or recording after a timeout. Results
+are keyed by the SHA-256 of the input plus the parameters that affect the
+output, and kept in a local SQLite file shared by all workers on the host.
+The total stored size is bounded; the least recently used entries are evicted.
+Entries may also carry a TTL and invalidation tags (see ``models.generation_cache``).
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(file_obj):
+    """SHA-256 of a binary file object, read in chunks; the file position is restored"""
+    position = file_obj.tell()
+    file_obj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file_obj.seek(position)
+    return digest.hexdigest()
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ContentCache:
+    def __init__(self, db_path=None, max_bytes=None, enabled=None):
+        self.db_path = db_path or Config.CONTENT_CACHE_PATH
+        self.max_bytes = max_bytes or Config.CONTENT_CACHE_MAX_BYTES
+        self.enabled = Config.CONTENT_CACHE_ENABLED if enabled is None else enabled
+        self._init_lock = threading.Lock()
+        self._schema_ready = False
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self):
+        with self._init_lock:
+            if self._schema_ready:
+                return
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entries (
+                        key TEXT PRIMARY KEY,
+                        namespace TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL,
+                        expires_at REAL
+                    )
+                """)
+                columns = {row['name'] for row in conn.execute('PRAGMA table_info(entries)')}
+                if 'expires_at' not in columns:
+                    conn.execute('ALTER TABLE entries ADD COLUMN expires_at REAL')
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entry_tags (
+                        key TEXT NOT NULL,
+                        tag TEXT NOT NULL,
+                        PRIMARY KEY (key, tag)
+                    )
+                """)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used_at)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_entry_tags_tag ON entry_tags (tag)')
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    @staticmethod
+    def make_key(namespace, digest, **params):
+        """Cache key for ``digest`` under ``namespace``, qualified by the parameters that shape the result"""
+        qualifiers = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return f"{namespace}:{digest}:{hashlib.sha256(qualifiers.encode('utf-8')).hexdigest()[:16]}"
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None"""
+        if not self.enabled:
+            return None
+        try:
+            self._ensure_schema()
+            conn = self._connect()
+            try:
+                now = time.time()
+                row = conn.execute(
+                    'SELECT value FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                    (key, now)
+                ).fetchone()
+                if row:
+                    conn.execute('UPDATE entries SET last_used_at = ? WHERE key = ?', (now, key))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Content cache lookup failed: {e}")
+            return None
+
+        if not row:
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        logger.info(f"Content cache hit for {key.split(':')[0]}")
+        return json.loads(row['value'])
+
+    def set(self, key, value, ttl=None, tags=None):
+        """Store a JSON-serialisable value and evict least recently used entries over the size cap.
+
+        ``ttl`` (seconds) bounds how long the entry is served; ``tags`` lets
+        ``invalidate_tag`` drop it early.
+        """
+        if not self.enabled:
+            return
+        encoded = json.dumps(value)
+        now = time.time()
+        try:
+            self._ensure_schema()
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, namespace, value, size, created_at, last_used_at, '
+                    'expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, key.split(':')[0], encoded, len(encoded), now, now, now + ttl if ttl else None)
+                )
+                conn.execute('DELETE FROM entry_tags WHERE key = ?', (key,))
+                conn.executemany('INSERT INTO entry_tags (key, tag) VALUES (?, ?)',
+                                 [(key, tag) for tag in set(tags or ())])
+                self._evict(conn)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Content cache store failed: {e}")
+
+    @staticmethod
+    def _delete(conn, keys):
+        conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in keys])
+        conn.executemany('DELETE FROM entry_tags WHERE key = ?', [(key,) for key in keys])
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Expired entries go first, then least recently used
+        evicted = []
+        rows = conn.execute(
+            'SELECT key, size FROM entries ORDER BY (expires_at IS NOT NULL AND expires_at <= ?) DESC, last_used_at',
+            (time.time(),)
+        ).fetchall()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append(row['key'])
+            total -= row['size']
+        self._delete(conn, evicted)
+
+        self._count('evictions', len(evicted))
+        logger.info(f"Content cache evicted {len(evicted)} entries")
+
+    def invalidate_tag(self, tag):
+        """Drop every entry stored with ``tag``; returns how many were removed"""
+        if not self.enabled:
+            return 0
+        try:
+            self._ensure_schema()
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                keys = [row['key'] for row in conn.execute('SELECT key FROM entry_tags WHERE tag = ?', (tag,))]
+                self._delete(conn, keys)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Content cache invalidation failed for {tag}: {e}")
+            return 0
+
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cache entries tagged {tag}")
+        return len(keys)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+# Process-wide cache used by ObservationExtractor
+content_cache = ContentCache()
@@ -10,14 +10,23 @@ import base64
 from werkzeug.security import generate_password_hash
 import secrets
 import time as time_module
+import threading
 import socket
 import requests
 from urllib.parse import urlparse
+from models.generation_cache import invalidate_child as invalidate_child_generations
+from models.generation_cache import invalidate_observer as invalidate_observer_generations
+from models.user_cache import user_cache, invalidate_user
+from models.signed_urls import signed_url_cache
 
 logger = logging.getLogger(__name__)
 
 # Global supabase client
 supabase = None
+_client_lock = threading.Lock()
+
+# Result of the last connectivity diagnostics run (see run_supabase_diagnostics)
+supabase_diagnostics = {'status': 'not_run'}
 
 
 def get_observer_suggestion_data(observer_id, child_id=None, limit=10):
@@ -153,15 +162,63 @@ def init_supabase():
                 raise Exception(f"Failed to initialize Supabase after {max_retries} attempts: {str(e)}")
 
 
-def get_supabase_client():
-    """Get the initialized supabase client with retry logic"""
+def create_supabase_client():
+    """Create the client without any network round trip (SUPABASE_INIT_MODE='lazy')"""
     global supabase
+    with _client_lock:
+        if supabase is None:
+            if not Config.SUPABASE_URL or not Config.SUPABASE_KEY:
+                raise Exception("Supabase URL or KEY not found in configuration")
+            supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+            logger.info(f"Supabase client created for {Config.SUPABASE_URL}")
+    return supabase
+
+
+def get_supabase_client():
+    """Get the supabase client, creating it on first use"""
     if supabase is None:
-        logger.info("Supabase client not initialized, attempting initialization...")
-        init_supabase()
+        if Config.SUPABASE_INIT_MODE == 'eager':
+            logger.info("Supabase client not initialized, attempting initialization...")
+            init_supabase()
+        else:
+            create_supabase_client()
     return supabase
 
 
+def run_supabase_diagnostics():
+    """Network, Supabase reachability and query checks, once and without retries.
+
+    The result is kept in ``supabase_diagnostics`` for /health.
+    """
+    global supabase_diagnostics
+    started = time_module.perf_counter()
+    result = {'started_at': datetime.now().isoformat()}
+    result['network'] = test_network_connectivity()
+    result['supabase_reachable'] = bool(Config.SUPABASE_URL) and test_supabase_connectivity(Config.SUPABASE_URL)
+    try:
+        test = get_supabase_client().table('users').select("count", count="exact").execute()
+        result['query'] = True
+        result['users'] = test.count
+    except Exception as e:
+        result['query'] = False
+        result['error'] = str(e)
+    result['status'] = 'healthy' if result['query'] else 'unhealthy'
+    result['duration_seconds'] = round(time_module.perf_counter() - started, 3)
+
+    supabase_diagnostics = result
+    log = logger.info if result['query'] else logger.error
+    log(f"Supabase diagnostics: {result['status']} in {result['duration_seconds']}s "
+        f"(network={result['network']}, reachable={result['supabase_reachable']})")
+    return result
+
+
+def start_supabase_diagnostics():
+    """Run the connectivity diagnostics in a background thread"""
+    thread = threading.Thread(target=run_supabase_diagnostics, name='supabase-diagnostics', daemon=True)
+    thread.start()
+    return thread
+
+
 # Test function to verify connection
 def test_supabase_connection():
     """Test Supabase connection and return status"""
@@ -174,6 +231,9 @@ def test_supabase_connection():
 
 
 class User(UserMixin):
+    # Compact instances: one per logged-in user is kept in models.user_cache
+    __slots__ = ('id', 'email', 'name', 'role', 'child_id', 'organization_id')
+
     def __init__(self, id, email, name, role, child_id=None, organization_id=None):
         self.id = id
         self.email = email
@@ -203,6 +263,11 @@ def get_user_by_id(user_id):
     return None
 
 
+def get_cached_user(user_id):
+    """User for Flask-Login's user_loader, served from the identity cache when fresh"""
+    return user_cache.get_or_load(user_id, get_user_by_id)
+
+
 def authenticate_user(email, password):
     try:
         client = get_supabase_client()
@@ -295,6 +360,8 @@ def save_observation(observation_data):
     try:
         client = get_supabase_client()
         response = client.table('observations').insert(observation_data).execute()
+        invalidate_child_generations(observation_data.get('student_id'))
+        invalidate_observer_generations(observation_data.get('username'))
         return response.data[0] if response.data else None
     except Exception as e:
         logger.error(f"Error saving observation: {str(e)}")
@@ -305,6 +372,8 @@ def save_processed_data(processed_data):
     try:
         client = get_supabase_client()
         response = client.table('processed_observations').insert(processed_data).execute()
+        invalidate_child_generations(processed_data.get('child_id'))
+        invalidate_observer_generations(processed_data.get('observer_id'))
         return response.data[0] if response.data else None
     except Exception as e:
         logger.error(f"Error saving processed data: {str(e)}")
@@ -368,28 +437,209 @@ def save_message(message_data):
         return None
 
 
-def get_signed_audio_url(file_path, bucket_name="audio-files"):
-    """Get signed URL for better audio compatibility"""
+# ---- Batched lookups ----
+# ``in_()`` filters are split into chunks so the PostgREST query string stays
+# well under URL length limits; a page costs ceil(n / IN_FILTER_CHUNK_SIZE)
+# round trips per table instead of one per row.
+
+IN_FILTER_CHUNK_SIZE = 150
+
+
+def select_in(table, columns, column, values, filters=None, client=None):
+    """Rows of ``table`` whose ``column`` is one of ``values``, plus optional equality ``filters``"""
+    values = list(dict.fromkeys(v for v in values if v is not None))
+    if not values:
+        return []
+
+    client = client or get_supabase_client()
+    rows = []
+    for start in range(0, len(values), IN_FILTER_CHUNK_SIZE):
+        query = client.table(table).select(columns).in_(column, values[start:start + IN_FILTER_CHUNK_SIZE])
+        for key, value in (filters or {}).items():
+            query = query.eq(key, value)
+        rows.extend(query.execute().data or [])
+    return rows
+
+
+def group_rows_by(rows, key):
+    """``{row[key]: [rows...]}`` preserving row order"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.get(key), []).append(row)
+    return grouped
+
+
+COUNT_PAGE_SIZE = 1000
+
+
+def _count_key(value):
+    """Text form of a group value, matching what the grouped_counts RPC returns"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def count_rows_grouped(table, group_by, split_by=None, filters=None, client=None):
+    """Row counts of ``table`` grouped by ``group_by`` (and optionally ``split_by``).
+
+    Returns ``{group: count}``, or ``{group: {split: count}}`` when ``split_by``
+    is given; keys are text (booleans as 'true'/'false'). Uses the
+    ``grouped_counts`` RPC (migrations/004) so only the counts cross the wire;
+    without it, falls back to paging through just the grouping columns.
+    """
+    client = client or get_supabase_client()
+    try:
+        rows = client.rpc('grouped_counts', {
+            'p_table': table,
+            'p_group_by': group_by,
+            'p_split_by': split_by,
+            'p_filters': {key: _count_key(value) for key, value in (filters or {}).items()}
+        }).execute().data or []
+        counted = [(row['group_key'], row['split_key'], row['row_count']) for row in rows]
+    except Exception as e:
+        logger.warning(f"grouped_counts RPC unavailable, counting {table} client-side: {e}")
+        columns = group_by if not split_by else f"{group_by}, {split_by}"
+        tally = {}
+        start = 0
+        while True:
+            query = client.table(table).select(columns)
+            for key, value in (filters or {}).items():
+                query = query.eq(key, value)
+            page = query.range(start, start + COUNT_PAGE_SIZE - 1).execute().data or []
+            for row in page:
+                key = (_count_key(row.get(group_by)), _count_key(row.get(split_by)) if split_by else None)
+                tally[key] = tally.get(key, 0) + 1
+            if len(page) < COUNT_PAGE_SIZE:
+                break
+            start += COUNT_PAGE_SIZE
+        counted = [(group, split, count) for (group, split), count in tally.items()]
+
+    counts = {}
+    for group, split, count in counted:
+        if split_by:
+            counts.setdefault(group, {})[split] = count
+        else:
+            counts[group] = count
+    return counts
+
+
+def get_parents_by_child_ids(child_ids, columns="*"):
+    """Parent users for many children at once, as ``{child_id: [parents]}``"""
+    try:
+        parents = select_in('users', columns, 'child_id', child_ids, filters={'role': 'Parent'})
+        return group_rows_by(parents, 'child_id')
+    except Exception as e:
+        logger.error(f"Error getting parents for children: {str(e)}")
+        return {}
+
+
+def get_user_names_by_ids(user_ids):
+    """``{user_id: name}`` for many users in batched queries"""
+    try:
+        return {user['id']: user.get('name') for user in select_in('users', 'id, name', 'id', user_ids)}
+    except Exception as e:
+        logger.error(f"Error getting user names: {str(e)}")
+        return {}
+
+
+def get_observer_feedback_threads(observer_id, parents_by_child=None):
+    """Parent feedback on an observer's reports with parent info and the observer's response.
+
+    Uses one query for the reports, then batched ``in_()`` queries for the
+    feedback, responses and (unless ``parents_by_child`` is given) parents,
+    joined in memory. Newest feedback first.
+    """
     try:
         client = get_supabase_client()
-        # Create signed URL with longer expiry for audio streaming
-        response = client.storage.from_(bucket_name).create_signed_url(
-            file_path,
-            expires_in=3600  # 1 hour
+        reports = client.table('observations').select("id, student_name, date, student_id").eq(
+            'username', observer_id).execute().data or []
+        reports_by_id = {report['id']: report for report in reports}
+
+        feedback = select_in('parent_feedback', '*', 'report_id', reports_by_id.keys(), client=client)
+        responses = group_rows_by(
+            select_in('feedback_responses', '*', 'feedback_id', [fb['id'] for fb in feedback], client=client),
+            'feedback_id'
         )
 
-        if response.get('error'):
-            logger.error(f"Signed URL error: {response['error']}")
-            return None
+        if parents_by_child is None:
+            parents_by_child = get_parents_by_child_ids([report['student_id'] for report in reports])
+        else:
+            missing = {report['student_id'] for report in reports} - set(parents_by_child)
+            if missing:
+                parents_by_child = {**parents_by_child, **get_parents_by_child_ids(missing)}
+
+        feedback_data = []
+        for fb in feedback:
+            report = reports_by_id[fb['report_id']]
+            parents = parents_by_child.get(report['student_id'])
+            fb['parent_info'] = ({'name': parents[0].get('name'), 'email': parents[0].get('email')} if parents
+                                 else {'name': 'Unknown Parent', 'email': ''})
+            fb['report_info'] = report
+            fb_responses = responses.get(fb['id'])
+            fb['observer_response'] = fb_responses[0] if fb_responses else None
+            feedback_data.append(fb)
+
+        feedback_data.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        return feedback_data
+    except Exception as e:
+        logger.error(f"Error loading feedback threads: {str(e)}")
+        return []
 
-        return response['signedURL']
+
+def get_principal_feedback_with_names(observer_id):
+    """Principal feedback for an observer, newest first, each with ``principal_name``"""
+    try:
+        client = get_supabase_client()
+        principal_feedback = client.table('principal_feedback').select(
+            "id, feedback_text, feedback_type, created_at, principal_id"
+        ).eq('observer_id', observer_id).order('created_at', desc=True).execute().data or []
+
+        names = get_user_names_by_ids([fb['principal_id'] for fb in principal_feedback])
+        for fb in principal_feedback:
+            fb['principal_name'] = names.get(fb['principal_id']) or "Unknown Principal"
+        return principal_feedback
     except Exception as e:
-        logger.error(f"Signed URL creation error: {e}")
-        return None
+        logger.error(f"Error loading principal feedback: {str(e)}")
+        return []
+
+
+def _create_signed_urls(bucket_name, file_paths, expires_in):
+    """Sign ``file_paths`` with one storage API call; returns ``{path: url}``"""
+    try:
+        client = get_supabase_client()
+        response = client.storage.from_(bucket_name).create_signed_urls(file_paths, expires_in)
+    except Exception as e:
+        logger.error(f"Signed URL creation error for {len(file_paths)} files: {e}")
+        return {}
+
+    urls = {}
+    for item in response or []:
+        url = item.get('signedURL') or item.get('signedUrl')
+        if item.get('error') or not url:
+            logger.error(f"Signed URL error for {item.get('path')}: {item.get('error')}")
+            continue
+        urls[item['path']] = url
+    return urls
+
+
+def get_signed_audio_urls(file_paths, bucket_name="audio-files"):
+    """Signed URLs for many audio files as ``{path: url}``, batched and cached in models.signed_urls"""
+    return signed_url_cache.get_many(bucket_name, file_paths, _create_signed_urls)
+
+
+def get_signed_audio_url(file_path, bucket_name="audio-files"):
+    """Get signed URL for better audio compatibility"""
+    return get_signed_audio_urls([file_path], bucket_name).get(file_path)
 
 
 def upload_file_to_storage(file_data, file_name, file_type):
-    """Upload file to Supabase storage with enhanced audio compatibility"""
+    """Upload file to Supabase storage with enhanced audio compatibility
+
+    ``file_data`` is either bytes or a binary file opened with ``open(path, 'rb')``;
+    files are streamed to storage in chunks instead of being read into memory.
+    """
     try:
         client = get_supabase_client()
 
@@ -569,6 +819,10 @@ def save_scheduled_report(observer_id, child_id, scheduled_time):
             }) \
                 .execute()
 
+        if response.data:
+            from models.reminder_engine import reminder_engine
+            reminder_engine.update_schedule(response.data[0])
+
         return response.data if response.data else None
     except Exception as e:
         logger.error(f"Error saving scheduled report: {e}")
@@ -576,10 +830,20 @@ def save_scheduled_report(observer_id, child_id, scheduled_time):
 
 
 def log_report_processing(child_id, observer_id, observation_id=None, report_type='scheduled'):
-    """Log when a report was processed"""
+    """Log when a report was processed
+
+    An observation is logged once: a job that re-runs after saving its
+    observation does not add a second entry.
+    """
     try:
         client = get_supabase_client()
 
+        if observation_id:
+            existing = client.table('report_processing_log').select('*') \
+                .eq('observation_id', observation_id).limit(1).execute().data
+            if existing:
+                return existing
+
         log_data = {
             'child_id': child_id,
             'observer_id': observer_id,
@@ -789,9 +1053,15 @@ def create_observer_from_application(application_data):
 
 
 def send_observer_welcome_email(email, name, temp_password):
-    """Send welcome email to new observer"""
-    # Implement email sending logic here
-    logger.info(f"Welcome email sent to {email} with password: {temp_password}")
+    """Queue the welcome email for a new observer"""
+    from models.email_outbox import email_outbox
+    body = (
+        f"Dear {name},\n\n"
+        f"Your observer account has been created.\n"
+        f"Temporary Password: {temp_password}\n\n"
+        f"Please log in and change your password immediately."
+    )
+    email_outbox.enqueue(email, 'Welcome to the Learning Observer platform', body, kind='welcome')
 
 
 # MISSING PEER REVIEW FUNCTIONS - ADDED
@@ -809,45 +1079,154 @@ def get_observer_review_assignments(observer_id):
         return []
 
 
+def refill_peer_review_queue(batch_size=None):
+    """Add observations created since the last refill to ``peer_review_queue``.
+
+    Incremental: only observations newer than the newest queued one are read,
+    and they are inserted in one bulk upsert (existing rows are left alone).
+    Returns the number of observations offered to the queue.
+    """
+    batch_size = batch_size or Config.PEER_REVIEW_REFILL_BATCH
+    try:
+        client = get_supabase_client()
+        newest = client.table('peer_review_queue').select('source_timestamp') \
+            .order('source_timestamp', desc=True).limit(1).execute().data
+        since = newest[0]['source_timestamp'] if newest else \
+            (datetime.now() - timedelta(days=Config.PEER_REVIEW_WINDOW_DAYS)).isoformat()
+
+        observations = client.table('observations').select('id, username, timestamp, peer_reviews!left(id)') \
+            .gt('timestamp', since) \
+            .is_('peer_reviews', 'null') \
+            .order('timestamp') \
+            .limit(batch_size) \
+            .execute().data or []
+
+        rows = [{
+            'observation_id': obs['id'],
+            'author_id': obs['username'],
+            'source_timestamp': obs['timestamp'],
+            'status': 'available'
+        } for obs in observations if obs.get('username') and obs.get('timestamp')]
+
+        if rows:
+            client.table('peer_review_queue').upsert(rows, on_conflict='observation_id',
+                                                     ignore_duplicates=True).execute()
+            logger.info(f"Queued {len(rows)} observations for peer review")
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Error refilling peer review queue: {e}")
+        return 0
+
+
 def assign_peer_reviews():
-    """Assign peer reviews based on completed observations"""
+    """Assign peer reviews based on completed observations.
+
+    Observers now claim work from ``peer_review_queue`` themselves (see
+    ``claim_peer_reviews``); assigning only means topping up the queue.
+    """
+    return refill_peer_review_queue()
+
+
+def get_active_peer_review_claims(reviewer_id):
+    """Queue rows currently claimed by ``reviewer_id`` whose lease has not expired"""
     try:
         client = get_supabase_client()
-        # Get observers who need to do reviews
-        observers = client.table('users').select('id, organization_id').eq('role', 'Observer').execute()
+        result = client.table('peer_review_queue').select('*') \
+            .eq('claimed_by', reviewer_id) \
+            .eq('status', 'claimed') \
+            .gt('lease_expires_at', datetime.now(pytz.utc).isoformat()) \
+            .order('source_timestamp', desc=True) \
+            .execute()
+        return result.data or []
+    except Exception as e:
+        logger.error(f"Error getting peer review claims: {e}")
+        raise
 
-        for observer in observers.data:
-            observer_id = observer['id']
-            org_id = observer['organization_id']
 
-            # Count completed observations by this observer
-            completed_obs = client.table('observations').select('id').eq('username', observer_id).execute()
-            completed_count = len(completed_obs.data)
+def claim_peer_reviews(reviewer_id, count, lease_seconds=None):
+    """Atomically claim up to ``count`` observations for ``reviewer_id``.
 
-            # Count pending review assignments
-            pending_reviews = client.table('observer_review_assignments').select('id').eq('observer_id',
-                                                                                          observer_id).eq(
-                'is_completed', False).execute()
-            pending_count = len(pending_reviews.data)
+    Runs the ``claim_peer_reviews`` database function, which skips rows locked
+    by concurrent claimers, so no two observers receive the same observation.
+    Returns the claimed queue rows.
+    """
+    if count <= 0:
+        return []
+    client = get_supabase_client()
+    since = datetime.now(pytz.utc) - timedelta(days=Config.PEER_REVIEW_WINDOW_DAYS)
+    result = client.rpc('claim_peer_reviews', {
+        'p_reviewer_id': reviewer_id,
+        'p_limit': count,
+        'p_lease_seconds': lease_seconds or Config.PEER_REVIEW_LEASE_SECONDS,
+        'p_since': since.isoformat()
+    }).execute()
+    return result.data or []
+
+
+def release_peer_review_claims(reviewer_id, observation_ids):
+    """Hand claims held by ``reviewer_id`` back to the queue so other observers can claim them"""
+    if not observation_ids:
+        return
+    try:
+        client = get_supabase_client()
+        client.table('peer_review_queue').update({
+            'status': 'available',
+            'claimed_by': None,
+            'claimed_at': None,
+            'lease_expires_at': None
+        }).eq('claimed_by', reviewer_id) \
+            .eq('status', 'claimed') \
+            .in_('observation_id', observation_ids) \
+            .execute()
+    except Exception as e:
+        logger.error(f"Error releasing peer review claims for {reviewer_id}: {e}")
+
+
+def complete_peer_review_claim(observation_id):
+    """Take a reviewed observation out of the queue for good"""
+    try:
+        client = get_supabase_client()
+        client.table('peer_review_queue').update({
+            'status': 'completed',
+            'completed_at': datetime.now(pytz.utc).isoformat(),
+            'lease_expires_at': None
+        }).eq('observation_id', observation_id).execute()
+    except Exception as e:
+        logger.error(f"Error completing peer review claim for {observation_id}: {e}")
 
-            # Calculate how many more reviews needed
-            reviews_needed = completed_count - pending_count
 
-            if reviews_needed > 0:
-                # Get observations from other observers in the same org that need review
-                available_obs = client.table('observations').select('id').neq('username', observer_id).eq(
-                    'peer_review_status', 'pending').limit(reviews_needed).execute()
+def get_peer_review_candidates(reviewer_id, limit, window_days=None):
+    """Recent, not-yet-reviewed observations by other observers, newest first.
 
-                # Assign reviews
-                for obs in available_obs.data:
-                    assignment_data = {
-                        'observer_id': observer_id,
-                        'observation_to_review_id': obs['id']
-                    }
-                    client.table('observer_review_assignments').insert(assignment_data).execute()
+    The date window, the anti-join against ``peer_reviews`` (left embed
+    filtered to rows with no review) and the limit all run in PostgREST, so
+    only the rows that will be shown are transferred. Indexes are in
+    migrations/002_peer_review_candidates.sql.
+    """
+    if limit <= 0:
+        return []
 
+    window_days = window_days or Config.PEER_REVIEW_WINDOW_DAYS
+    since = (datetime.now() - timedelta(days=window_days)).isoformat()
+    try:
+        client = get_supabase_client()
+        response = client.table('observations').select(
+            "id, student_name, observer_name, date, timestamp, filename, file_url, username, "
+            "processed_by_admin, has_formatted_report, peer_reviews!left(id)"
+        ).neq('username', reviewer_id) \
+            .gte('timestamp', since) \
+            .is_('peer_reviews', 'null') \
+            .order('timestamp', desc=True) \
+            .limit(limit) \
+            .execute()
+
+        candidates = response.data or []
+        for candidate in candidates:
+            candidate.pop('peer_reviews', None)
+        return candidates
     except Exception as e:
-        logger.error(f"Error assigning peer reviews: {e}")
+        logger.error(f"Error getting peer review candidates: {e}")
+        return []
 
 
 def submit_peer_review(reviewer_id, observation_id, review_score, review_comments,
@@ -865,6 +1244,7 @@ def submit_peer_review(reviewer_id, observation_id, review_score, review_comment
         }
 
         result = client.table('observer_peer_reviews').insert(review_data).execute()
+        complete_peer_review_claim(observation_id)
 
         # Mark assignment as completed
         client.table('observer_review_assignments').update({
@@ -907,6 +1287,110 @@ def get_users_by_organization(organization_id, role=None):
         return []
 
 
+ORGANIZATION_ROLLUP_FIELDS = ('total_users', 'observers', 'parents', 'principals', 'children',
+                              'observations', 'ai_reviews_pending')
+
+
+def _empty_organization_rollup(organization_id):
+    rollup = dict.fromkeys(ORGANIZATION_ROLLUP_FIELDS, 0)
+    rollup['organization_id'] = organization_id
+    return rollup
+
+
+def _count_organization_rollups(client):
+    """Rollups computed from the base tables, for databases without migrations/005.
+
+    Pending AI reviews need full_data and are reported as None here.
+    """
+    users_by_org = count_rows_grouped('users', 'organization_id', split_by='role', client=client)
+    children_by_org = count_rows_grouped('children', 'organization_id', client=client)
+    observations_by_user = count_rows_grouped('observations', 'username', client=client)
+
+    user_orgs = {}
+    if observations_by_user:
+        for user in select_in('users', 'id, organization_id', 'id', list(observations_by_user), client=client):
+            user_orgs[user['id']] = user.get('organization_id')
+
+    rollups = {}
+    for org_id, by_role in users_by_org.items():
+        rollup = rollups.setdefault(org_id, _empty_organization_rollup(org_id))
+        rollup['total_users'] = sum(by_role.values())
+        rollup['observers'] = by_role.get('Observer', 0)
+        rollup['parents'] = by_role.get('Parent', 0)
+        rollup['principals'] = by_role.get('Principal', 0)
+    for org_id, count in children_by_org.items():
+        rollups.setdefault(org_id, _empty_organization_rollup(org_id))['children'] = count
+    for user_id, count in observations_by_user.items():
+        org_id = user_orgs.get(user_id)
+        if org_id:
+            rollups.setdefault(org_id, _empty_organization_rollup(org_id))['observations'] += count
+    for rollup in rollups.values():
+        rollup['ai_reviews_pending'] = None
+    rollups.pop(None, None)
+    return rollups
+
+
+def get_organization_rollups(organization_ids=None):
+    """Per-organization counters as ``{organization_id: rollup}``.
+
+    Each rollup has total_users, observers, parents, principals, children,
+    observations and ai_reviews_pending, read from ``organization_rollups``
+    (kept current by triggers, see migrations/005). Organizations with no rows
+    yet get zeroes. Falls back to grouped counts if the table is missing.
+    """
+    client = get_supabase_client()
+    try:
+        if organization_ids is None:
+            rows = client.table('organization_rollups').select('*').execute().data or []
+        else:
+            rows = select_in('organization_rollups', '*', 'organization_id', organization_ids, client=client)
+        rollups = {row['organization_id']: row for row in rows}
+    except Exception as e:
+        logger.warning(f"organization_rollups unavailable, counting from base tables: {e}")
+        try:
+            rollups = _count_organization_rollups(client)
+        except Exception as e:
+            logger.error(f"Error counting organization rollups: {e}")
+            rollups = {}
+
+    for org_id in organization_ids or ():
+        rollups.setdefault(org_id, _empty_organization_rollup(org_id))
+    return rollups
+
+
+def get_organization_rollup(organization_id):
+    """Counters for one organization (see ``get_organization_rollups``)"""
+    return get_organization_rollups([organization_id])[organization_id]
+
+
+def get_organization_daily_observations(organization_ids, days=30):
+    """``{organization_id: {'YYYY-MM-DD': count}}`` for the last ``days`` days"""
+    since = (datetime.now() - timedelta(days=days)).date().isoformat()
+    try:
+        client = get_supabase_client()
+        rows = []
+        for start in range(0, len(organization_ids), IN_FILTER_CHUNK_SIZE):
+            rows.extend(client.table('organization_daily_observations').select('*')
+                        .in_('organization_id', organization_ids[start:start + IN_FILTER_CHUNK_SIZE])
+                        .gte('day', since).order('day').execute().data or [])
+    except Exception as e:
+        logger.warning(f"Error getting daily observation counts: {e}")
+        return {}
+
+    daily = {}
+    for row in rows:
+        daily.setdefault(row['organization_id'], {})[row['day']] = row['observations']
+    return daily
+
+
+def rebuild_organization_rollups(organization_id=None):
+    """Recompute rollups from the base tables (all organizations by default); returns rows written"""
+    client = get_supabase_client()
+    result = client.rpc('rebuild_organization_rollups', {'p_organization_id': organization_id}).execute()
+    logger.info(f"Rebuilt organization rollups for {organization_id or 'all organizations'}")
+    return result.data
+
+
 def create_principal_feedback(principal_id, observer_id, feedback_text, feedback_type):
     """Create feedback from principal to observer"""
     try:
@@ -1059,6 +1543,7 @@ def auto_assign_parent_to_organization(child_id, organization_id):
                     update_result = client.table('users').update({
                         'organization_id': organization_id
                     }).eq('id', parent['id']).execute()
+                    invalidate_user(parent['id'])
 
                     if update_result.data:
                         logger.info(
@@ -1092,12 +1577,14 @@ def check_database_health():
         return {
             'status': 'healthy',
             'message': 'Database connection is working',
+            'diagnostics': supabase_diagnostics,
             'timestamp': datetime.now().isoformat()
         }
     except Exception as e:
         return {
             'status': 'unhealthy',
             'message': f'Database connection failed: {str(e)}',
+            'diagnostics': supabase_diagnostics,
             'timestamp': datetime.now().isoformat()
         }
 
@@ -0,0 +1,325 @@
+"""
+Durable outbox for outgoing email.
+
+Request handlers and scheduled jobs call ``email_outbox.enqueue`` and return
+immediately. Messages are persisted in a SQLite file shared by every worker on
+the host. A sender thread in each process claims them in batches and sends
+them over one authenticated SMTP connection, which stays open between batches
+until it has been idle for EMAIL_SMTP_IDLE_SECONDS. Temporary failures are
+retried with exponential backoff; permanent rejections (5xx) fail at once.
+
+For local testing, point MAIL_SERVER/MAIL_PORT at ``tools/smtp_sink.py`` with
+MAIL_USE_TLS=False.
+"""
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+
+class SMTPConnection:
+    """One lazily opened, reusable, authenticated SMTP connection"""
+
+    def __init__(self, host=None, port=None, use_tls=None, username=None, password=None, timeout=None):
+        self.host = host or Config.MAIL_SERVER
+        self.port = port or Config.MAIL_PORT
+        self.use_tls = Config.MAIL_USE_TLS if use_tls is None else use_tls
+        self.username = username if username is not None else Config.MAIL_USERNAME
+        self.password = password if password is not None else Config.MAIL_PASSWORD
+        self.timeout = timeout or Config.EMAIL_SMTP_TIMEOUT
+        self._smtp = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def get(self):
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.connects += 1
+        logger.info(f"Opened SMTP connection to {self.host}:{self.port}")
+        return smtp
+
+    def send(self, message):
+        self.get().send_message(message)
+        self.last_used = time.time()
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    def close_if_idle(self, idle_seconds):
+        if self._smtp is not None and time.time() - self.last_used > idle_seconds:
+            self.close()
+
+
+def _is_permanent(error):
+    """5xx replies about the message or its recipients will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return error.smtp_code >= 500
+    return False
+
+
+def _connection_usable_after(error):
+    """Whether the server merely rejected this message and the connection can carry on"""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+
+
+class EmailOutbox:
+    def __init__(self, db_path=None, connection=None):
+        self.db_path = db_path or Config.EMAIL_OUTBOX_PATH
+        self.batch_size = Config.EMAIL_OUTBOX_BATCH_SIZE
+        self.max_attempts = Config.EMAIL_OUTBOX_MAX_ATTEMPTS
+        self.lease_seconds = Config.EMAIL_OUTBOX_LEASE_SECONDS
+        self.poll_interval = Config.EMAIL_OUTBOX_POLL_INTERVAL
+        self.connection = connection or SMTPConnection()
+        self._thread = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+        self._init_lock = threading.Lock()
+        self._schema_ready = False
+
+    # ---- storage ----
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self):
+        with self._init_lock:
+            if self._schema_ready:
+                return
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS outbox (
+                        id TEXT PRIMARY KEY,
+                        kind TEXT,
+                        recipient TEXT NOT NULL,
+                        subject TEXT NOT NULL,
+                        body TEXT NOT NULL,
+                        subtype TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        last_error TEXT,
+                        created_at REAL NOT NULL,
+                        next_attempt_at REAL NOT NULL,
+                        lease_expires_at REAL,
+                        sent_at REAL
+                    )
+                """)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_status_next ON outbox (status, next_attempt_at)')
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    # ---- producer API ----
+
+    def enqueue(self, recipient, subject, body, html=False, kind=None):
+        """Persist a message for sending and return its id"""
+        self._ensure_schema()
+        message_id = str(uuid.uuid4())
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO outbox (id, kind, recipient, subject, body, subtype, status, created_at, '
+                'next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (message_id, kind, recipient, subject, body, 'html' if html else 'plain', STATUS_QUEUED, now, now)
+            )
+        finally:
+            conn.close()
+
+        logger.info(f"Queued {kind or 'email'} for {recipient}")
+        with self._wakeup:
+            self._wakeup.notify()
+        return message_id
+
+    def get(self, message_id):
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM outbox WHERE id = ?', (message_id,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def stats(self):
+        """Message counts by status"""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            counts = {row['status']: row['n'] for row in
+                      conn.execute('SELECT status, COUNT(*) AS n FROM outbox GROUP BY status')}
+        finally:
+            conn.close()
+        counts['smtp_connects'] = self.connection.connects
+        return counts
+
+    # ---- sender side ----
+
+    def _claim_batch(self):
+        """Atomically move up to ``batch_size`` due messages to ``sending``"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                'SELECT * FROM outbox WHERE (status = ? AND next_attempt_at <= ?) '
+                'OR (status = ? AND lease_expires_at < ?) ORDER BY next_attempt_at LIMIT ?',
+                (STATUS_QUEUED, now, STATUS_SENDING, now, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE outbox SET status = ?, lease_expires_at = ?, attempts = attempts + 1 WHERE id = ?',
+                [(STATUS_SENDING, now + self.lease_seconds, row['id']) for row in rows]
+            )
+            conn.execute('COMMIT')
+            return [dict(row, attempts=row['attempts'] + 1) for row in rows]
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _mark(self, message_id, status, error=None, next_attempt_at=None):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'UPDATE outbox SET status = ?, last_error = ?, lease_expires_at = NULL, '
+                'next_attempt_at = COALESCE(?, next_attempt_at), sent_at = ? WHERE id = ?',
+                (status, error, next_attempt_at, time.time() if status == STATUS_SENT else None, message_id)
+            )
+        finally:
+            conn.close()
+
+    def _backoff(self, attempts):
+        delay = min(Config.EMAIL_OUTBOX_BACKOFF_CAP, Config.EMAIL_OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def build_message(row):
+        message = EmailMessage()
+        message['From'] = Config.MAIL_DEFAULT_SENDER or Config.MAIL_USERNAME
+        message['To'] = row['recipient']
+        message['Subject'] = row['subject']
+        message.set_content(row['body'], subtype=row['subtype'], charset='utf-8')
+        return message
+
+    def _send_batch(self, rows):
+        for row in rows:
+            try:
+                self.connection.send(self.build_message(row))
+            except Exception as e:
+                if not _connection_usable_after(e):
+                    self.connection.close()
+                if _is_permanent(e) or row['attempts'] >= self.max_attempts:
+                    self._mark(row['id'], STATUS_FAILED, error=str(e))
+                    logger.error(f"Giving up on email to {row['recipient']} after {row['attempts']} attempts: {e}")
+                else:
+                    retry_at = time.time() + self._backoff(row['attempts'])
+                    self._mark(row['id'], STATUS_QUEUED, error=str(e), next_attempt_at=retry_at)
+                    logger.warning(f"Email to {row['recipient']} failed (attempt {row['attempts']}), will retry: {e}")
+                continue
+            self._mark(row['id'], STATUS_SENT)
+            logger.info(f"[MAIL] Sent {row['kind'] or 'email'} to {row['recipient']}")
+
+    def process_once(self):
+        """Send one batch of due messages; returns how many were claimed"""
+        rows = self._claim_batch()
+        if rows:
+            self._send_batch(rows)
+        return len(rows)
+
+    def _sender_loop(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.process_once()
+            except Exception as e:
+                logger.error(f"Email outbox batch failed: {e}")
+                claimed = 0
+
+            if claimed < self.batch_size:
+                self.connection.close_if_idle(Config.EMAIL_SMTP_IDLE_SECONDS)
+                with self._wakeup:
+                    self._wakeup.wait(timeout=self.poll_interval)
+        self.connection.close()
+
+    def start(self):
+        """Start the sender thread for this process (idempotent)"""
+        if self._thread:
+            return
+        self._ensure_schema()
+        self.purge_sent()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sender_loop, name='email-outbox', daemon=True)
+        self._thread.start()
+        logger.info(f"Email outbox started ({self.db_path})")
+
+    def stop(self):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def purge_sent(self, older_than_seconds=None):
+        """Delete sent and failed messages past the retention window"""
+        self._ensure_schema()
+        retention = older_than_seconds if older_than_seconds is not None else Config.EMAIL_OUTBOX_RETENTION_SECONDS
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'DELETE FROM outbox WHERE status IN (?, ?) AND created_at < ?',
+                (STATUS_SENT, STATUS_FAILED, time.time() - retention)
+            )
+            if cursor.rowcount:
+                logger.info(f"Purged {cursor.rowcount} old outbox messages")
+        finally:
+            conn.close()
+
+
+# Process-wide outbox shared by routes, scheduled jobs and app startup
+email_outbox = EmailOutbox()
@@ -0,0 +1,94 @@
+"""
+Response cache for Gemini generations.
+
+Topic suggestions, custom/monthly reports and chatbot answers are regenerated
+for identical inputs (e.g. every observer dashboard refresh). Responses are
+cached by model name, generation config and a whitespace-normalised prompt
+hash, with a TTL per feature. Entries built from a child's data are tagged with
+the child id and dropped when a new observation is saved for that child.
+Topic suggestions also draw on the observer's observations of other children,
+so they are tagged with the observer id as well and dropped whenever that
+observer saves an observation.
+"""
+import logging
+import re
+
+from config import Config
+from models.content_cache import ContentCache, sha256_text
+
+logger = logging.getLogger(__name__)
+
+FEATURE_TTLS = {
+    'topic_suggestions': Config.GENERATION_CACHE_TTL_TOPIC_SUGGESTIONS,
+    'custom_report': Config.GENERATION_CACHE_TTL_CUSTOM_REPORT,
+    'monthly_report': Config.GENERATION_CACHE_TTL_MONTHLY_REPORT,
+    'chatbot': Config.GENERATION_CACHE_TTL_CHATBOT,
+}
+
+generation_cache = ContentCache(
+    db_path=Config.GENERATION_CACHE_PATH,
+    max_bytes=Config.GENERATION_CACHE_MAX_BYTES,
+    enabled=Config.GENERATION_CACHE_ENABLED,
+)
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so indentation-only differences share a cache entry"""
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+def _child_tag(child_id):
+    return f"child:{child_id}"
+
+
+def _observer_tag(observer_id):
+    return f"observer:{observer_id}"
+
+
+def generate_cached(feature, model, prompt, generation_config=None, child_id=None, refresh=False,
+                    observer_id=None):
+    """Return Gemini's response text for ``prompt``, served from the cache when possible.
+
+    ``refresh`` skips the lookup (the new response still replaces the cached
+    one). Empty responses are not cached. Returns None if Gemini gave no text.
+    """
+    key = ContentCache.make_key(
+        feature,
+        sha256_text(normalize_prompt(prompt)),
+        model=getattr(model, 'model_name', str(model)),
+        generation_config=generation_config or {},
+    )
+
+    if not refresh:
+        cached_text = generation_cache.get(key)
+        if cached_text is not None:
+            return cached_text
+
+    response = model.generate_content(
+        [{"role": "user", "parts": [{"text": prompt}]}],
+        generation_config=generation_config,
+    )
+    text = response.text if response else None
+
+    if text:
+        tags = []
+        if child_id:
+            tags.append(_child_tag(child_id))
+        if observer_id:
+            tags.append(_observer_tag(observer_id))
+        generation_cache.set(key, text, ttl=FEATURE_TTLS.get(feature), tags=tags or None)
+    return text
+
+
+def invalidate_child(child_id):
+    """Drop cached generations built from ``child_id``'s observations"""
+    if not child_id:
+        return 0
+    return generation_cache.invalidate_tag(_child_tag(child_id))
+
+
+def invalidate_observer(observer_id):
+    """Drop cached generations built from ``observer_id``'s observations"""
+    if not observer_id:
+        return 0
+    return generation_cache.invalidate_tag(_observer_tag(observer_id))
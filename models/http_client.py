@@ -0,0 +1,164 @@
+"""
+Pooled HTTP clients for the external AI/OCR/ASR providers.
+
+Each provider gets one keep-alive ``requests.Session`` per process, with a
+bounded connection pool, default timeouts, retry with jittered exponential
+backoff on 429/5xx and transport errors, and a cap on concurrent requests.
+Non-idempotent requests (POST) are only retried after a transport error when
+the connection was never established; after a read timeout or a dropped
+connection the provider may already have acted on the request (created a
+transcript, billed a completion), so the error is raised instead.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+def _request_not_sent(error):
+    """True if a transport error happened before the request reached the server"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class ProviderHTTPClient:
+    def __init__(self, name, max_concurrency, pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_base=None, backoff_cap=None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = (connect_timeout or Config.HTTP_CONNECT_TIMEOUT,
+                        read_timeout or Config.HTTP_READ_TIMEOUT)
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or Config.HTTP_BACKOFF_BASE
+        self.backoff_cap = backoff_cap or Config.HTTP_BACKOFF_CAP
+
+        pool_size = pool_size or max_concurrency
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _backoff(self, attempt, response=None):
+        """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the pooled session.
+
+        Returns the final ``requests.Response``; a retryable status that is still
+        failing after the last attempt is returned as-is for the caller to handle.
+        Transport errors are re-raised once retries are exhausted, or at once for
+        a non-idempotent request that may already have been received.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+
+        # Streamed file bodies are rewound so a retry re-sends the whole file
+        body = kwargs.get('data')
+        body_start = body.tell() if hasattr(body, 'seek') and hasattr(body, 'tell') else None
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if attempt and body_start is not None:
+                body.seek(body_start)
+            self._count('requests')
+            try:
+                with self._semaphore:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._count('errors')
+                if attempt >= self.max_retries or not (idempotent or _request_not_sent(e)):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"[{self.name}] {method} {url} failed ({e}); retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.warning(f"[{self.name}] {method} {url} returned {response.status_code}; "
+                               f"retrying in {delay:.1f}s")
+                response.close()
+
+            self._count('retries')
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Request/retry counters plus urllib3 connection reuse figures"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        connections_opened = 0
+        pooled_requests = 0
+        for pool in list(self._adapter.poolmanager.pools._container.values()):
+            connections_opened += getattr(pool, 'num_connections', 0)
+            pooled_requests += getattr(pool, 'num_requests', 0)
+
+        stats.update({
+            'max_concurrency': self.max_concurrency,
+            'connections_opened': connections_opened,
+            'connection_reuses': max(pooled_requests - connections_opened, 0),
+        })
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _provider_settings():
+    return {
+        'ocr': {'max_concurrency': Config.OCR_MAX_CONCURRENCY},
+        'groq': {'max_concurrency': Config.GROQ_MAX_CONCURRENCY},
+        'assemblyai': {'max_concurrency': Config.ASSEMBLYAI_MAX_CONCURRENCY,
+                       'read_timeout': Config.ASSEMBLYAI_UPLOAD_TIMEOUT},
+    }
+
+
+def get_http_client(provider):
+    """Return the process-wide client for ``provider`` ('ocr', 'groq' or 'assemblyai')"""
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        if provider not in _clients:
+            settings = _provider_settings().get(provider, {'max_concurrency': 4})
+            _clients[provider] = ProviderHTTPClient(provider, **settings)
+        return _clients[provider]
+
+
+def http_client_stats():
+    """Counters for every provider client created in this process"""
+    return {name: client.stats() for name, client in list(_clients.items())}
@@ -0,0 +1,634 @@
+"""
+Local background job queue for long-running observation processing.
+
+Jobs are persisted in a SQLite database so that every gunicorn worker on the
+host shares the same queue without an external broker. Each process runs a
+small pool of worker threads that claim jobs atomically. A claim carries a
+token and a lease that a heartbeat renews while the handler runs; only the
+holder of the current token can finish or suspend the job, so a job re-claimed
+after its worker died cannot be completed twice.
+"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import Request
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_WAITING = 'waiting'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+# Request bodies above this size are written to disk by werkzeug instead of memory
+SPOOL_MEMORY_LIMIT = 500 * 1024
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class JobFailed(Exception):
+    """Raised by a job handler to fail a job with a user-facing message"""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.message = message
+        self.details = details or {}
+
+
+class JobSuspended(Exception):
+    """Raised by a job handler to park a job until an external event arrives.
+
+    The job is resumed by ``JobQueue.resume(wait_key, ...)`` (e.g. from a
+    webhook) or, failing that, re-run after ``resume_after`` seconds so the
+    handler can poll. ``state`` is merged into the payload for the next run.
+    """
+
+    def __init__(self, wait_key, resume_after, state=None):
+        super().__init__(wait_key)
+        self.wait_key = wait_key
+        self.resume_after = resume_after
+        self.state = state or {}
+
+
+def _current_rss():
+    """Resident set size of this process in bytes, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class MemorySampler:
+    """Tracks the peak resident memory of the process while a job runs.
+
+    RSS is process-wide, so with several workers busy the figure includes
+    their concurrent jobs; ``rss_growth_mb`` is the rise over the level at
+    job start and is the closer per-job estimate.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or Config.JOB_MEMORY_SAMPLE_INTERVAL
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_rss = None
+        self._peak_rss = None
+        self._started = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = _current_rss()
+            if rss is not None and rss > self._peak_rss:
+                self._peak_rss = rss
+
+    def start(self):
+        self._started = time.time()
+        self._start_rss = self._peak_rss = _current_rss()
+        if self._start_rss is not None:
+            self._thread = threading.Thread(target=self._sample, name='job-memory-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self, previous=None):
+        """Stop sampling and return the metrics dict, folded into ``previous`` runs of the job"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            rss = _current_rss()
+            if rss is not None and rss > self._peak_rss:
+                self._peak_rss = rss
+
+        metrics = {'runs': 1, 'run_seconds': round(time.time() - self._started, 2)}
+        if self._start_rss is not None:
+            metrics['peak_rss_mb'] = round(self._peak_rss / (1024 * 1024), 1)
+            metrics['rss_growth_mb'] = round((self._peak_rss - self._start_rss) / (1024 * 1024), 1)
+
+        if previous:
+            metrics['runs'] += previous.get('runs', 0)
+            metrics['run_seconds'] = round(metrics['run_seconds'] + previous.get('run_seconds', 0), 2)
+            for key in ('peak_rss_mb', 'rss_growth_mb'):
+                if key in previous:
+                    metrics[key] = max(metrics.get(key, 0), previous[key])
+        return metrics
+
+
+class LeaseHeartbeat:
+    """Renews a running job's lease every JOB_HEARTBEAT_SECONDS until stopped"""
+
+    def __init__(self, queue, job_id, claim_token, interval=None):
+        self.queue = queue
+        self.job_id = job_id
+        self.claim_token = claim_token
+        self.interval = interval or min(Config.JOB_HEARTBEAT_SECONDS, queue.lease_seconds / 3)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue._renew_lease(self.job_id, self.claim_token):
+                    self.lost = True
+                    logger.warning(f"Job {self.job_id} lost its lease to another worker")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew lease of job {self.job_id}: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._beat, name='job-lease-heartbeat', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class SpoolingRequest(Request):
+    """Request class that buffers large uploads in the job queue directory.
+
+    werkzeug already writes big multipart bodies to an anonymous temp file;
+    putting that file next to the spool lets ``JobQueue.spool_upload`` link
+    it into place instead of copying the upload a second time.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= SPOOL_MEMORY_LIMIT:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        incoming = os.path.join(Config.JOB_QUEUE_DIR, 'incoming')
+        os.makedirs(incoming, exist_ok=True)
+        return tempfile.NamedTemporaryFile('wb+', dir=incoming, prefix='upload-')
+
+
+class JobQueue:
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self.lease_seconds = Config.JOB_LEASE_SECONDS
+        self.max_attempts = Config.JOB_MAX_ATTEMPTS
+        self.poll_interval = Config.JOB_POLL_INTERVAL
+        self._handlers = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+        self._init_lock = threading.Lock()
+        self._schema_ready = False
+
+    # ---- storage ----
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self):
+        with self._init_lock:
+            if self._schema_ready:
+                return
+            if self.db_path is None:
+                os.makedirs(Config.JOB_QUEUE_DIR, exist_ok=True)
+                self.db_path = os.path.join(Config.JOB_QUEUE_DIR, 'jobs.sqlite3')
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        job_type TEXT NOT NULL,
+                        owner_id TEXT,
+                        status TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        result TEXT,
+                        error TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        created_at REAL NOT NULL,
+                        started_at REAL,
+                        finished_at REAL,
+                        lease_expires_at REAL,
+                        wait_key TEXT,
+                        metrics TEXT,
+                        claim_token TEXT
+                    )
+                """)
+                columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+                if 'wait_key' not in columns:
+                    conn.execute('ALTER TABLE jobs ADD COLUMN wait_key TEXT')
+                if 'metrics' not in columns:
+                    conn.execute('ALTER TABLE jobs ADD COLUMN metrics TEXT')
+                if 'claim_token' not in columns:
+                    conn.execute('ALTER TABLE jobs ADD COLUMN claim_token TEXT')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_wait_key ON jobs (wait_key)')
+                # Events that arrived before their job was parked (see resume)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS pending_wakeups (
+                        wait_key TEXT PRIMARY KEY,
+                        state TEXT,
+                        created_at REAL NOT NULL
+                    )
+                """)
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def spool_dir(self, job_id):
+        """Directory where request files for a job are kept until it finishes"""
+        path = os.path.join(Config.JOB_QUEUE_DIR, 'spool', job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def spool_upload(self, file_storage, job_id):
+        """Move an uploaded file into the job's spool directory and return its path.
+
+        Uploads received through ``SpoolingRequest`` are already on disk in the
+        queue directory, so they are hard-linked instead of copied; anything
+        else is copied in fixed-size chunks.
+        """
+        path = os.path.join(self.spool_dir(job_id), 'upload')
+        source = getattr(file_storage.stream, 'name', None)
+        if isinstance(source, str) and os.path.isfile(source):
+            try:
+                file_storage.stream.flush()
+                os.link(source, path)
+                return path
+            except OSError as e:
+                logger.debug(f"Could not link spooled upload {source}: {e}")
+
+        file_storage.save(path, buffer_size=SPOOL_CHUNK_SIZE)
+        return path
+
+    # ---- producer API ----
+
+    def register(self, job_type, handler):
+        """Register the callable that runs jobs of ``job_type``.
+
+        The handler is called as ``handler(payload, job_id)`` and returns a
+        JSON-serialisable result dict, raises ``JobFailed`` to fail the job,
+        or raises ``JobSuspended`` to wait for an external event.
+        """
+        self._handlers[job_type] = handler
+
+    def new_job_id(self):
+        return str(uuid.uuid4())
+
+    def enqueue(self, job_type, payload, owner_id=None, job_id=None):
+        """Persist a job and return its id"""
+        self._ensure_schema()
+        job_id = job_id or self.new_job_id()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, job_type, owner_id, status, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, job_type, owner_id, STATUS_QUEUED, json.dumps(payload), time.time())
+            )
+        finally:
+            conn.close()
+
+        logger.info(f"Enqueued {job_type} job {job_id}")
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it does not exist"""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if not row:
+            return None
+
+        job = dict(row)
+        job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['error'] = json.loads(job['error']) if job['error'] else None
+        job['metrics'] = json.loads(job['metrics']) if job['metrics'] else None
+        return job
+
+    # ---- worker side ----
+
+    def _claim_next(self):
+        """Atomically move the oldest runnable job to ``running``"""
+        job_types = list(self._handlers.keys())
+        if not job_types:
+            return None
+
+        now = time.time()
+        placeholders = ','.join('?' for _ in job_types)
+        abandoned = []
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+
+            # Jobs whose worker died mid-run are failed once they run out of attempts
+            abandoned = [r['id'] for r in conn.execute(
+                'SELECT id FROM jobs WHERE status = ? AND lease_expires_at < ? AND attempts >= ?',
+                (STATUS_RUNNING, now, self.max_attempts)
+            )]
+            conn.executemany(
+                'UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_expires_at = NULL, '
+                'claim_token = NULL WHERE id = ?',
+                [(STATUS_FAILED, now, json.dumps({'message': 'Job was abandoned by its worker'}), job_id)
+                 for job_id in abandoned]
+            )
+
+            # Waiting jobs whose timer is due are re-run so the handler can poll
+            row = conn.execute(
+                f'SELECT id FROM jobs WHERE job_type IN ({placeholders}) '
+                'AND (status = ? OR (status IN (?, ?) AND lease_expires_at < ?)) '
+                'ORDER BY created_at LIMIT 1',
+                (*job_types, STATUS_QUEUED, STATUS_RUNNING, STATUS_WAITING, now)
+            ).fetchone()
+
+            if not row:
+                conn.execute('COMMIT')
+                return None
+
+            conn.execute(
+                'UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?), lease_expires_at = ?, '
+                'attempts = attempts + 1, claim_token = ? WHERE id = ?',
+                (STATUS_RUNNING, now, now + self.lease_seconds, str(uuid.uuid4()), row['id'])
+            )
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+            conn.execute('COMMIT')
+            return dict(job)
+        except Exception:
+            conn.execute('ROLLBACK')
+            abandoned = []
+            raise
+        finally:
+            conn.close()
+            # Nothing will read the uploads of jobs that have just failed for good
+            for job_id in abandoned:
+                logger.warning(f"Job {job_id} was abandoned by its worker")
+                self.remove_spool(job_id)
+
+    def _renew_lease(self, job_id, claim_token):
+        """Extend the lease of a running job; False if this claim no longer holds it"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = ? AND claim_token = ?',
+                (time.time() + self.lease_seconds, job_id, STATUS_RUNNING, claim_token)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, claim_token, status, result=None, error=None, metrics=None):
+        """Record the outcome of a run; False (nothing written) if the claim was lost"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, metrics = ?, finished_at = ?, '
+                'lease_expires_at = NULL, claim_token = NULL WHERE id = ? AND status = ? AND claim_token = ?',
+                (status,
+                 json.dumps(result) if result is not None else None,
+                 json.dumps(error) if error is not None else None,
+                 json.dumps(metrics) if metrics is not None else None,
+                 time.time(), job_id, STATUS_RUNNING, claim_token)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def _suspend(self, job_id, claim_token, payload, suspended, metrics=None):
+        """Park a job on its wait key, or requeue it at once if the event already arrived"""
+        payload = {**payload, **suspended.state}
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            wakeup = conn.execute('SELECT state FROM pending_wakeups WHERE wait_key = ?',
+                                  (suspended.wait_key,)).fetchone()
+            if wakeup:
+                payload = {**payload, **json.loads(wakeup['state'] or '{}')}
+            # attempts is reset: a parked job has not been abandoned by a worker
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, payload = ?, wait_key = ?, lease_expires_at = ?, attempts = 0, '
+                'metrics = ?, claim_token = NULL WHERE id = ? AND status = ? AND claim_token = ?',
+                (STATUS_QUEUED if wakeup else STATUS_WAITING, json.dumps(payload), suspended.wait_key,
+                 None if wakeup else time.time() + suspended.resume_after,
+                 json.dumps(metrics) if metrics is not None else None,
+                 job_id, STATUS_RUNNING, claim_token)
+            )
+            if wakeup and cursor.rowcount == 1:
+                conn.execute('DELETE FROM pending_wakeups WHERE wait_key = ?', (suspended.wait_key,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        if wakeup and cursor.rowcount == 1:
+            logger.info(f"Job {job_id} requeued: {suspended.wait_key} arrived before it was parked")
+            with self._wakeup:
+                self._wakeup.notify()
+        return cursor.rowcount == 1
+
+    def resume(self, wait_key, state=None):
+        """Requeue the job parked on ``wait_key``; returns the job id or None.
+
+        An event for a job that is not parked yet (e.g. a webhook that beats the
+        storage upload) is kept in ``pending_wakeups`` and applied when the job
+        suspends on that key.
+        """
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT id, payload FROM jobs WHERE wait_key = ? AND status = ?',
+                (wait_key, STATUS_WAITING)
+            ).fetchone()
+            if not row:
+                conn.execute(
+                    'INSERT OR REPLACE INTO pending_wakeups (wait_key, state, created_at) VALUES (?, ?, ?)',
+                    (wait_key, json.dumps(state or {}), time.time())
+                )
+                conn.execute('COMMIT')
+                logger.info(f"No job parked on {wait_key} yet; wakeup kept for when it suspends")
+                return None
+
+            payload = {**json.loads(row['payload']), **(state or {})}
+            conn.execute(
+                'UPDATE jobs SET status = ?, payload = ?, lease_expires_at = NULL WHERE id = ?',
+                (STATUS_QUEUED, json.dumps(payload), row['id'])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        logger.info(f"Resumed job {row['id']} ({wait_key})")
+        with self._wakeup:
+            self._wakeup.notify()
+        return row['id']
+
+    def remove_spool(self, job_id):
+        shutil.rmtree(os.path.join(Config.JOB_QUEUE_DIR, 'spool', job_id), ignore_errors=True)
+
+    def _run_job(self, job):
+        job_id = job['id']
+        token = job['claim_token']
+        handler = self._handlers[job['job_type']]
+        payload = json.loads(job['payload'])
+
+        logger.info(f"Running {job['job_type']} job {job_id} (attempt {job['attempts']})")
+        started = time.time()
+        previous_metrics = json.loads(job['metrics']) if job.get('metrics') else None
+        sampler = MemorySampler()
+        sampler.start()
+        heartbeat = LeaseHeartbeat(self, job_id, token)
+        heartbeat.start()
+        try:
+            result = handler(payload, job_id)
+            heartbeat.stop()
+            metrics = sampler.stop(previous_metrics)
+            finished = self._finish(job_id, token, STATUS_COMPLETED, result=result, metrics=metrics)
+            if finished:
+                logger.info(f"Job {job_id} completed in {time.time() - started:.1f}s "
+                            f"(peak RSS {metrics.get('peak_rss_mb')} MB)")
+        except JobSuspended as e:
+            heartbeat.stop()
+            finished = None
+            if self._suspend(job_id, token, payload, e, metrics=sampler.stop(previous_metrics)):
+                logger.info(f"Job {job_id} waiting on {e.wait_key} (fallback in {e.resume_after:.0f}s)")
+            else:
+                finished = False
+        except JobFailed as e:
+            heartbeat.stop()
+            finished = self._finish(job_id, token, STATUS_FAILED, error={'message': e.message, 'details': e.details},
+                                    metrics=sampler.stop(previous_metrics))
+            if finished:
+                logger.warning(f"Job {job_id} failed: {e.message}")
+        except Exception as e:
+            heartbeat.stop()
+            finished = self._finish(job_id, token, STATUS_FAILED, error={'message': str(e)},
+                                    metrics=sampler.stop(previous_metrics))
+            if finished:
+                logger.error(f"Job {job_id} crashed: {e}", exc_info=True)
+
+        if finished is False:
+            # Another worker re-claimed the job; its run owns the outcome and the spooled files
+            logger.warning(f"Discarded the outcome of job {job_id}: its lease had been lost")
+        elif finished:
+            self.remove_spool(job_id)
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                logger.error(f"Job queue claim failed: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=self.poll_interval)
+                continue
+
+            self._run_job(job)
+
+    def start(self, num_workers=None):
+        """Start the worker threads for this process (idempotent)"""
+        if self._threads:
+            return
+        self._ensure_schema()
+        self.purge_finished()
+        self.purge_stale_spool()
+
+        num_workers = num_workers or Config.JOB_WORKERS
+        self._stop.clear()
+        for i in range(num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job queue started with {num_workers} workers ({self.db_path})")
+
+    def stop(self):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def purge_finished(self, older_than_seconds=None):
+        """Delete completed and failed jobs past the retention window"""
+        self._ensure_schema()
+        retention = older_than_seconds if older_than_seconds is not None else Config.JOB_RETENTION_SECONDS
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                (STATUS_COMPLETED, STATUS_FAILED, time.time() - retention)
+            )
+            if cursor.rowcount:
+                logger.info(f"Purged {cursor.rowcount} finished jobs")
+            # Wakeups for keys no job ever suspended on (e.g. transcripts finished by polling)
+            conn.execute('DELETE FROM pending_wakeups WHERE created_at < ?', (time.time() - retention,))
+        finally:
+            conn.close()
+
+    def purge_stale_spool(self, orphan_seconds=None):
+        """Delete spooled uploads that no queued, running or waiting job will read again.
+
+        Spool directories of completed and failed jobs go at once; directories
+        with no job row (purged jobs, uploads whose enqueue never happened) and
+        leftover ``incoming`` request files once they are ``orphan_seconds`` old.
+        """
+        self._ensure_schema()
+        orphan_seconds = orphan_seconds if orphan_seconds is not None else Config.JOB_SPOOL_ORPHAN_SECONDS
+        conn = self._connect()
+        try:
+            statuses = dict(conn.execute('SELECT id, status FROM jobs').fetchall())
+        finally:
+            conn.close()
+
+        cutoff = time.time() - orphan_seconds
+        removed = 0
+        spool_root = os.path.join(Config.JOB_QUEUE_DIR, 'spool')
+        for job_id in (os.listdir(spool_root) if os.path.isdir(spool_root) else []):
+            status = statuses.get(job_id)
+            if status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_WAITING):
+                continue
+            path = os.path.join(spool_root, job_id)
+            try:
+                if status is None and os.path.getmtime(path) > cutoff:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+
+        incoming = os.path.join(Config.JOB_QUEUE_DIR, 'incoming')
+        for name in (os.listdir(incoming) if os.path.isdir(incoming) else []):
+            path = os.path.join(incoming, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+
+        if removed:
+            logger.info(f"Purged {removed} stale spooled uploads")
+        return removed
+
+
+# Process-wide queue shared by routes and app startup
+job_queue = JobQueue()
@@ -0,0 +1,96 @@
+"""
+Deferred imports for heavy third-party libraries.
+
+pandas, plotly, matplotlib, python-docx and google.generativeai together add
+seconds and tens of MB to every worker at boot, although only report, upload
+and AI code paths use them. ``lazy_import`` returns a stand-in module that
+imports the real one on first attribute access:
+
+    pd = lazy_import('pandas')
+    ...
+    df = pd.DataFrame(rows)   # pandas is imported here, once
+
+How long each deferred import took, and when, is kept for /health and
+``tools/startup_benchmark.py``.
+"""
+import importlib
+import logging
+import threading
+import time
+import types
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_loaded = {}  # module name -> {'seconds', 'loaded_at'}
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports ``name`` on first attribute access"""
+
+    def __init__(self, name, setup=None):
+        super().__init__(name)
+        self.__dict__['_lazy_setup'] = setup
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is not None:
+            return module
+        with _lock:
+            module = self.__dict__['_lazy_module']
+            if module is None:
+                started = time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                setup = self.__dict__['_lazy_setup']
+                if setup:
+                    setup(module)
+                seconds = time.perf_counter() - started
+                _loaded[self.__name__] = {'seconds': round(seconds, 3), 'loaded_at': time.time()}
+                logger.info(f"Deferred import of {self.__name__} took {seconds:.2f}s")
+                self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name, setup=None):
+    """Stand-in for ``import name``; ``setup(module)`` runs once after the real import"""
+    return LazyModule(name, setup)
+
+
+def _configure_gemini(module):
+    module.configure(api_key=Config.GOOGLE_API_KEY)
+
+
+# Shared stand-in for ``import google.generativeai as genai``, configured with
+# GOOGLE_API_KEY the first time it is used
+genai = lazy_import('google.generativeai', setup=_configure_gemini)
+
+
+def loaded_lazy_modules():
+    """Deferred modules imported so far in this process, with their import time"""
+    with _lock:
+        return dict(_loaded)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux only, None elsewhere)"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
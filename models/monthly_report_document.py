@@ -0,0 +1,230 @@
+"""
+Layout model for monthly reports, rendered to Word or PDF in memory.
+
+The monthly report builders describe a report once as a ``MonthlyReportLayout``
+(headings, bullet lists, tables, chart images) and render it with ``to_docx``
+or ``to_pdf``. Charts are drawn once with matplotlib and the same PNG bytes
+are embedded in both formats. The PDF is built with reportlab, so it no longer
+needs Word (docx2pdf) or temporary files.
+"""
+import io
+import re
+from datetime import datetime
+
+# Standard PDF fonts have no emoji glyphs; headings drop them in the PDF
+EMOJI_PATTERN = re.compile('[\u200d\u2190-\u21ff\u2300-\u23ff\u2600-\u27bf\u2b00-\u2bff\ufe0f\U0001f000-\U0001faff]')
+
+CHART_WIDTH_INCHES = 5.5
+
+
+def _pdf_text(text):
+    from xml.sax.saxutils import escape
+    return escape(EMOJI_PATTERN.sub('', str(text)).strip())
+
+
+def line_chart_png(x, y, title, xlabel, ylabel, color=None):
+    """PNG bytes for a line chart of ``y`` over ``x``"""
+    return _chart_png('line', x, y, title, xlabel, ylabel, color)
+
+
+def bar_chart_png(x, y, title, xlabel, ylabel, color=None):
+    """PNG bytes for a bar chart of ``y`` over ``x``"""
+    return _chart_png('bar', x, y, title, xlabel, ylabel, color)
+
+
+def _chart_png(kind, x, y, title, xlabel, ylabel, color):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import MaxNLocator
+
+    fig, ax = plt.subplots()
+    try:
+        if kind == 'bar':
+            ax.bar(x, y, color=color)
+        else:
+            ax.plot(x, y, marker='o', color=color)
+            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        fig.tight_layout()
+        stream = io.BytesIO()
+        fig.savefig(stream, format='png', dpi=150)
+        return stream.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class MonthlyReportLayout:
+    """Ordered blocks of a monthly report; every builder method returns ``self``"""
+
+    def __init__(self, font_name='Segoe UI', font_size=11):
+        self.font_name = font_name
+        self.font_size = font_size
+        self.blocks = []
+
+    def _add(self, kind, **block):
+        self.blocks.append({'kind': kind, **block})
+        return self
+
+    def title(self, text, centered=False):
+        return self._add('title', text=text, centered=centered)
+
+    def info(self, lines, centered=False):
+        """Short header lines; the first is emphasised"""
+        return self._add('info', lines=list(lines), centered=centered)
+
+    def heading(self, text, level=1):
+        return self._add('heading', text=text, level=level)
+
+    def paragraph(self, text):
+        return self._add('paragraph', text=text)
+
+    def bullets(self, items):
+        return self._add('bullets', items=[item for item in items if item])
+
+    def table(self, header, rows):
+        return self._add('table', header=list(header), rows=[list(row) for row in rows])
+
+    def image(self, png_bytes, caption=None):
+        return self._add('image', png=png_bytes, caption=caption)
+
+    def spacer(self):
+        return self._add('spacer')
+
+    def footer(self, text=None):
+        text = text or f"Report generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        return self._add('footer', text=text)
+
+    # ---- renderers ----
+
+    def to_docx(self):
+        """Word document as a BytesIO positioned at the start"""
+        import docx
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Inches, Pt
+
+        doc = docx.Document()
+        font = doc.styles['Normal'].font
+        font.name = self.font_name
+        font.size = Pt(self.font_size)
+
+        for block in self.blocks:
+            kind = block['kind']
+            if kind == 'title':
+                heading = doc.add_heading(block['text'], 0)
+                if block['centered']:
+                    heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            elif kind == 'info':
+                para = doc.add_paragraph()
+                if block['centered']:
+                    para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                for i, line in enumerate(block['lines']):
+                    if i:
+                        para.add_run('\n')
+                    run = para.add_run(line)
+                    run.bold = i == 0
+                    run.font.size = Pt(self.font_size + 1 if i == 0 else self.font_size)
+            elif kind == 'heading':
+                doc.add_heading(block['text'], level=block['level'])
+            elif kind == 'paragraph':
+                doc.add_paragraph(block['text'])
+            elif kind == 'bullets':
+                for item in block['items']:
+                    doc.add_paragraph(item, style='List Bullet')
+            elif kind == 'table':
+                table = doc.add_table(rows=1, cols=len(block['header']))
+                table.style = 'Light Grid Accent 1'
+                for cell, text in zip(table.rows[0].cells, block['header']):
+                    cell.paragraphs[0].add_run(text).bold = True
+                for row in block['rows']:
+                    for cell, text in zip(table.add_row().cells, row):
+                        cell.text = str(text)
+            elif kind == 'image':
+                doc.add_picture(io.BytesIO(block['png']), width=Inches(CHART_WIDTH_INCHES))
+                if block['caption']:
+                    doc.add_paragraph(block['caption'])
+            elif kind == 'spacer':
+                doc.add_paragraph('')
+            elif kind == 'footer':
+                para = doc.add_paragraph()
+                para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                run = para.add_run(block['text'])
+                run.font.size = Pt(9)
+                run.italic = True
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        return buffer
+
+    def to_pdf(self):
+        """PDF built with reportlab as a BytesIO positioned at the start"""
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+                                        Image, ListFlowable, ListItem)
+
+        styles = getSampleStyleSheet()
+        normal = ParagraphStyle('MonthlyNormal', parent=styles['Normal'], fontSize=self.font_size - 1,
+                                leading=(self.font_size - 1) * 1.3, spaceAfter=4)
+        centered = ParagraphStyle('MonthlyCentered', parent=normal, alignment=1)
+        title_style = ParagraphStyle('MonthlyTitle', parent=styles['Title'], fontSize=18)
+        heading_styles = {1: styles['Heading2'], 2: styles['Heading3'], 3: styles['Heading4']}
+        footer_style = ParagraphStyle('MonthlyFooter', parent=normal, fontSize=8,
+                                      fontName='Helvetica-Oblique', alignment=1)
+        page_width = A4[0] - 2 * 54
+
+        story = []
+        for block in self.blocks:
+            kind = block['kind']
+            if kind == 'title':
+                story.append(Paragraph(_pdf_text(block['text']), title_style))
+            elif kind == 'info':
+                lines = [_pdf_text(line) for line in block['lines']]
+                lines[0] = f"<b>{lines[0]}</b>"
+                story.append(Paragraph('<br/>'.join(lines), centered if block['centered'] else normal))
+            elif kind == 'heading':
+                story.append(Paragraph(_pdf_text(block['text']), heading_styles.get(block['level'], styles['Heading4'])))
+            elif kind == 'paragraph':
+                if block['text']:
+                    story.append(Paragraph(_pdf_text(block['text']).replace('\n', '<br/>'), normal))
+            elif kind == 'bullets':
+                if block['items']:
+                    story.append(ListFlowable(
+                        [ListItem(Paragraph(_pdf_text(item), normal), leftIndent=12) for item in block['items']],
+                        bulletType='bullet', start='•', leftIndent=12,
+                    ))
+            elif kind == 'table':
+                rows = [[Paragraph(f"<b>{_pdf_text(text)}</b>", normal) for text in block['header']]]
+                rows += [[Paragraph(_pdf_text(text), normal) for text in row] for row in block['rows']]
+                table = Table(rows, colWidths=[page_width / len(block['header'])] * len(block['header']),
+                              repeatRows=1)
+                table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#dbe5f1')),
+                    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#95b3d7')),
+                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ]))
+                story.append(table)
+            elif kind == 'image':
+                image = Image(io.BytesIO(block['png']))
+                scale = CHART_WIDTH_INCHES * inch / image.imageWidth
+                image.drawWidth, image.drawHeight = image.imageWidth * scale, image.imageHeight * scale
+                story.append(image)
+                if block['caption']:
+                    story.append(Paragraph(_pdf_text(block['caption']), normal))
+            elif kind == 'spacer':
+                story.append(Spacer(1, 8))
+            elif kind == 'footer':
+                story.append(Spacer(1, 16))
+                story.append(Paragraph(_pdf_text(block['text']), footer_style))
+
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4, leftMargin=54, rightMargin=54,
+                          topMargin=54, bottomMargin=54).build(story)
+        buffer.seek(0)
+        return buffer
@@ -1,26 +1,21 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import json
 import calendar
 from datetime import datetime
 import io
-import google.generativeai as genai
-from config import Config
-import re
-import docx
-from docx.shared import Inches, Pt
-from io import BytesIO
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
-from docx2pdf import convert
+from models.database import select_in, group_rows_by
+from models.report_scores import get_report_scores
+from models.monthly_report_document import MonthlyReportLayout
+from models.lazy_imports import genai, lazy_import
+
+# Imported on first use so workers do not load them at boot (models/lazy_imports)
+pd = lazy_import('pandas')
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
 class MonthlyReportGenerator:
     def __init__(self, supabase_client):
         self.supabase = supabase_client
-        # Initialize Gemini AI for report generation
-        genai.configure(api_key=Config.GOOGLE_API_KEY)
+        # Gemini is configured when google.generativeai is first used
 
     def get_month_data(self, child_id, year, month):
         """Fetch all observations for a specific child in a given month"""
@@ -52,25 +47,26 @@ class MonthlyReportGenerator:
             goals_response = self.supabase.table('goals').select("*") \
                 .eq("child_id", child_id) \
                 .execute()
-            goals = goals_response.data
+            goals = goals_response.data or []
+
+            # Two bulk queries: every alignment for these goals, then the dates of the reports they reference
+            alignments_by_goal = group_rows_by(
+                select_in('goal_alignments', '*', 'goal_id', [goal['id'] for goal in goals], client=self.supabase),
+                'goal_id'
+            )
+            report_ids = [a['report_id'] for alignments in alignments_by_goal.values() for a in alignments]
+            report_dates = {
+                report['id']: report['date']
+                for report in select_in('observations', 'id, date', 'id', report_ids, client=self.supabase)
+            }
 
             goal_progress = []
             for goal in goals:
-                alignments_response = self.supabase.table('goal_alignments').select("*") \
-                    .eq("goal_id", goal['id']) \
-                    .execute()
-                alignments = alignments_response.data
-
-                relevant_alignments = []
-                for alignment in alignments:
-                    report_response = self.supabase.table('observations').select("date") \
-                        .eq("id", alignment['report_id']) \
-                        .execute()
-
-                    if report_response.data:
-                        report_date = report_response.data[0]['date']
-                        if start_date <= report_date < end_date:
-                            relevant_alignments.append(alignment)
+                relevant_alignments = [
+                    alignment for alignment in alignments_by_goal.get(goal['id'], [])
+                    if report_dates.get(alignment['report_id'])
+                    and start_date <= report_dates[alignment['report_id']] < end_date
+                ]
 
                 if relevant_alignments:
                     avg_score = sum(a['alignment_score'] for a in relevant_alignments) / len(relevant_alignments)
@@ -128,38 +124,10 @@ class MonthlyReportGenerator:
             'sequencing': []
         }
 
+        # Levels were parsed from the report when the observation was saved
         for obs in observations:
-            try:
-                full_data = json.loads(obs.get('full_data', '{}'))
-                report = full_data.get('formatted_report', '')
-
-                # Extract confidence level
-                confidence_match = re.search(r'Confidence level:.*?(Strong|Moderate|Weak)', report, re.IGNORECASE)
-                if confidence_match:
-                    level = confidence_match.group(1).lower()
-                    comm_skills['confidence'].append(level)
-
-                # Extract clarity of thought
-                clarity_match = re.search(r'Clarity of thought:.*?(Clear|Moderate|Unclear)', report, re.IGNORECASE)
-                if clarity_match:
-                    level = clarity_match.group(1).lower()
-                    comm_skills['clarity'].append(level)
-
-                # Extract participation
-                participation_match = re.search(r'Participation.*?:.*?(Active|Moderate|Passive)', report, re.IGNORECASE)
-                if participation_match:
-                    level = participation_match.group(1).lower()
-                    comm_skills['participation'].append(level)
-
-                # Extract sequence of explanation
-                sequence_match = re.search(r'Sequence of explanation:.*?(Logical|Moderate|Disorganized)', report,
-                                           re.IGNORECASE)
-                if sequence_match:
-                    level = sequence_match.group(1).lower()
-                    comm_skills['sequencing'].append(level)
-
-            except Exception as e:
-                continue
+            for skill, level in get_report_scores(obs)['communication'].items():
+                comm_skills[skill].append(level)
 
         # Calculate most common values
         comm_summary = {}
@@ -183,21 +151,10 @@ class MonthlyReportGenerator:
             'Planning/Independence': []
         }
 
+        # Ratings were parsed from the report when the observation was saved
         for obs in observations:
-            try:
-                full_data = json.loads(obs.get('full_data', '{}'))
-                report = full_data.get('formatted_report', '')
-
-                # Extract growth area ratings
-                for area in growth_areas.keys():
-                    pattern = re.compile(rf'{area}.*?\|.*?(\w+)\s*\|', re.IGNORECASE)
-                    match = pattern.search(report)
-                    if match:
-                        rating = match.group(1).lower()
-                        growth_areas[area].append(rating)
-
-            except Exception as e:
-                continue
+            for area, rating in get_report_scores(obs)['growth'].items():
+                growth_areas[area].append(rating)
 
         # Calculate most common ratings
         growth_summary = {}
@@ -290,6 +247,8 @@ class MonthlyReportGenerator:
         if not goal_progress:
             return None
 
+        from plotly.subplots import make_subplots
+
         fig = make_subplots(rows=len(goal_progress), cols=1,
                             subplot_titles=[g['goal_text'][:50] + '...' for g in goal_progress],
                             vertical_spacing=0.1)
@@ -725,38 +684,13 @@ class MonthlyReportGenerator:
         comm_skills_by_date = {}
         for obs in observations:
             date = obs.get('date')
-            try:
-                full_data = json.loads(obs.get('full_data', '{}'))
-                report = full_data.get('formatted_report', '')
-            except Exception:
-                report = ''
-            # Extract curiosity score
-            curiosity_match = re.search(r'🌈 Curiosity Response Index: (\d{1,2}) ?/ ?10', report)
-            if curiosity_match:
-                curiosity_score = int(curiosity_match.group(1))
-                curiosity_by_date[date] = curiosity_score
-            # Extract growth score (X/7)
-            growth_match = re.search(r'Overall Growth Score.*?(\d)\s*/\s*7', report)
-            if growth_match:
-                growth_score = int(growth_match.group(1))
-                growth_by_date[date] = growth_score
-            # Extract communication skills
-            comm_skills = {}
-            confidence_match = re.search(r'Confidence level:.*?(Strong|Moderate|Weak)', report, re.IGNORECASE)
-            if confidence_match:
-                comm_skills['confidence'] = confidence_match.group(1)
-            clarity_match = re.search(r'Clarity of thought:.*?(Clear|Moderate|Unclear)', report, re.IGNORECASE)
-            if clarity_match:
-                comm_skills['clarity'] = clarity_match.group(1)
-            participation_match = re.search(r'Participation.*?:.*?(Active|Moderate|Passive)', report, re.IGNORECASE)
-            if participation_match:
-                comm_skills['participation'] = participation_match.group(1)
-            sequence_match = re.search(r'Sequence of explanation:.*?(Logical|Moderate|Disorganized)', report,
-                                       re.IGNORECASE)
-            if sequence_match:
-                comm_skills['sequencing'] = sequence_match.group(1)
-            if comm_skills:
-                comm_skills_by_date[date] = comm_skills
+            scores = get_report_scores(obs)
+            if scores['curiosity_index'] is not None:
+                curiosity_by_date[date] = scores['curiosity_index']
+            if scores['growth_score'] is not None:
+                growth_by_date[date] = scores['growth_score']
+            if scores['communication']:
+                comm_skills_by_date[date] = {skill: level.title() for skill, level in scores['communication'].items()}
 
         # Sort by date
         curiosity_dates = sorted(curiosity_by_date.keys())
@@ -858,137 +792,60 @@ class MonthlyReportGenerator:
         buffer.seek(0)
         return buffer
 
-    def generate_monthly_docx_report(self, observations, goal_progress, strength_counts, development_counts,
-                                     summary_json):
-        """
-        Generate a comprehensive monthly report as a Word document matching the application format.
-        """
-        import docx
-        from docx.shared import Inches, Pt
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        from docx.oxml.shared import OxmlElement, qn
-        from io import BytesIO
-        import json
-        import calendar
-        from datetime import datetime
-
-        doc = docx.Document()
-
-        # Set document style
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = 'Segoe UI'
-        font.size = Pt(11)
-
+    def build_monthly_layout(self, summary_json):
+        """Monthly report layout shared by the Word and PDF downloads"""
         # Parse summary_json if it's a string
         if isinstance(summary_json, str):
             try:
                 summary_data = json.loads(summary_json)
-            except:
+            except ValueError:
                 summary_data = {}
         else:
             summary_data = summary_json
 
+        layout = MonthlyReportLayout(font_name='Segoe UI', font_size=11)
+
         # --- HEADER SECTION ---
-        header = doc.add_heading("📋 Monthly Learning Progress Report", 0)
-        header.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        # Student Information Section
-        info_para = doc.add_paragraph()
-        info_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        info_run1 = info_para.add_run(f"👧 Student: {summary_data.get('studentName', 'N/A')}")
-        info_run1.bold = True
-        info_run1.font.size = Pt(12)
-        info_para.add_run("\n")
-        info_run2 = info_para.add_run(f"📅 Period: {summary_data.get('date', 'N/A')}")
-        info_run2.font.size = Pt(11)
-        info_para.add_run("\n")
-        info_run3 = info_para.add_run(f"📋 Report Type: {summary_data.get('className', 'Monthly Progress Summary')}")
-        info_run3.font.size = Pt(11)
-
-        doc.add_paragraph("")
+        layout.title("📋 Monthly Learning Progress Report", centered=True)
+        layout.info([
+            f"👧 Student: {summary_data.get('studentName', 'N/A')}",
+            f"📅 Period: {summary_data.get('date', 'N/A')}",
+            f"📋 Report Type: {summary_data.get('className', 'Monthly Progress Summary')}",
+        ], centered=True)
+        layout.spacer()
 
         # --- PROGRESS INSIGHTS SECTION (Replacing Monthly Summary) ---
-        progress_insights = summary_data.get('progressInsights', [])
-        if progress_insights:
-            doc.add_heading("🔍 Progress Insights", level=1)
-            for insight in progress_insights:
-                doc.add_paragraph(f"• {insight}", style='List Bullet')
-            doc.add_paragraph("")
-        else:
-            doc.add_heading("🔍 Progress Insights", level=1)
-            doc.add_paragraph("• Consistent engagement observed throughout the month")
-            doc.add_paragraph("• Learning patterns show steady development")
-            doc.add_paragraph("• Areas of strength continue to flourish")
-            doc.add_paragraph("")
+        layout.heading("🔍 Progress Insights")
+        layout.bullets(summary_data.get('progressInsights') or [
+            "Consistent engagement observed throughout the month",
+            "Learning patterns show steady development",
+            "Areas of strength continue to flourish",
+        ])
+        layout.spacer()
 
         # --- STRENGTHS SECTION ---
-        doc.add_heading("⭐ Strengths Observed", level=1)
-        strengths = summary_data.get('strengths', [])
-        if strengths:
-            for strength in strengths:
-                doc.add_paragraph(f"• {strength}", style='List Bullet')
-        else:
-            doc.add_paragraph("• No specific strengths documented for this period")
-        doc.add_paragraph("")
+        layout.heading("⭐ Strengths Observed")
+        layout.bullets(summary_data.get('strengths') or ["No specific strengths documented for this period"])
+        layout.spacer()
 
         # --- COMMUNICATION SKILLS TABLE ---
         comm_skills = summary_data.get('communicationSkills', {})
         if comm_skills and any(v != 'no data' for v in comm_skills.values()):
-            doc.add_heading("🗣️ Communication Skills Assessment", level=1)
-
-            # Create communication skills table
-            comm_table = doc.add_table(rows=1, cols=2)
-            comm_table.style = 'Light Grid Accent 1'
-
-            # Header row
-            hdr_cells = comm_table.rows[0].cells
-            hdr_cells[0].text = 'Communication Skill'
-            hdr_cells[1].text = 'Assessment'
-
-            # Make header bold
-            for cell in hdr_cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.bold = True
-
-            # Add communication data
+            layout.heading("🗣️ Communication Skills Assessment")
             comm_data = [
                 ("Confidence Level", comm_skills.get('confidence', 'No data').title()),
                 ("Clarity of Thought", comm_skills.get('clarity', 'No data').title()),
                 ("Participation & Engagement", comm_skills.get('participation', 'No data').title()),
                 ("Sequence of Explanation", comm_skills.get('sequencing', 'No data').title())
             ]
-
-            for skill, assessment in comm_data:
-                if assessment != 'No Data':
-                    row_cells = comm_table.add_row().cells
-                    row_cells[0].text = skill
-                    row_cells[1].text = assessment
-
-            doc.add_paragraph("")
+            layout.table(['Communication Skill', 'Assessment'],
+                         [row for row in comm_data if row[1] != 'No Data'])
+            layout.spacer()
 
         # --- GROWTH METRICS TABLE ---
         growth_metrics = summary_data.get('growthMetrics', {})
         if growth_metrics and any(v != 'no data' for v in growth_metrics.values()):
-            doc.add_heading("📊 Growth Metrics", level=1)
-
-            # Create growth metrics table
-            growth_table = doc.add_table(rows=1, cols=2)
-            growth_table.style = 'Light Grid Accent 1'
-
-            # Header row
-            hdr_cells = growth_table.rows[0].cells
-            hdr_cells[0].text = 'Growth Area'
-            hdr_cells[1].text = 'Assessment'
-
-            # Make header bold
-            for cell in hdr_cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.bold = True
-
-            # Add growth data
+            layout.heading("📊 Growth Metrics")
             growth_areas = [
                 ("🧠 Intellectual", growth_metrics.get('Intellectual', 'No data').title()),
                 ("😊 Emotional", growth_metrics.get('Emotional', 'No data').title()),
@@ -998,89 +855,38 @@ class MonthlyReportGenerator:
                 ("🧭 Character/Values", growth_metrics.get('Character/Values', 'No data').title()),
                 ("🚀 Planning/Independence", growth_metrics.get('Planning/Independence', 'No data').title())
             ]
-
-            for area, assessment in growth_areas:
-                if assessment != 'No Data':
-                    row_cells = growth_table.add_row().cells
-                    row_cells[0].text = area
-                    row_cells[1].text = assessment
-
-            doc.add_paragraph("")
+            layout.table(['Growth Area', 'Assessment'],
+                         [row for row in growth_areas if row[1] != 'No Data'])
+            layout.spacer()
 
         # --- AREAS FOR DEVELOPMENT ---
-        doc.add_heading("📈 Areas for Development", level=1)
-        development_areas = summary_data.get('areasOfDevelopment', [])
-        if development_areas:
-            for area in development_areas:
-                doc.add_paragraph(f"• {area}", style='List Bullet')
-        else:
-            doc.add_paragraph("• No specific development areas identified for this period")
-        doc.add_paragraph("")
+        layout.heading("📈 Areas for Development")
+        layout.bullets(summary_data.get('areasOfDevelopment') or
+                       ["No specific development areas identified for this period"])
+        layout.spacer()
 
         # --- RECOMMENDATIONS (Changed heading as requested) ---
-        doc.add_heading("💡 Recommendations", level=1)
-        recommendations = summary_data.get('recommendations', [])
-        if recommendations:
-            for rec in recommendations:
-                doc.add_paragraph(f"• {rec}", style='List Bullet')
-        else:
-            doc.add_paragraph("• Continue current learning trajectory")
-            doc.add_paragraph("• Maintain engagement in observed strength areas")
-            doc.add_paragraph("• Focus on identified development areas")
-        doc.add_paragraph("")
+        layout.heading("💡 Recommendations")
+        layout.bullets(summary_data.get('recommendations') or [
+            "Continue current learning trajectory",
+            "Maintain engagement in observed strength areas",
+            "Focus on identified development areas",
+        ])
 
         # --- FOOTER SECTION ---
-        doc.add_paragraph("")
-        footer_para = doc.add_paragraph()
-        footer_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        footer_run = footer_para.add_run("Report generated on: " + datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        footer_run.font.size = Pt(9)
-        footer_run.italic = True
-
-        # Convert to BytesIO
-        docx_bytes = BytesIO()
-        doc.save(docx_bytes)
-        docx_bytes.seek(0)
-        return docx_bytes
+        layout.footer()
+        return layout
+
+    def generate_monthly_docx_report(self, observations, goal_progress, strength_counts, development_counts,
+                                     summary_json):
+        """
+        Generate a comprehensive monthly report as a Word document matching the application format.
+        """
+        return self.build_monthly_layout(summary_json).to_docx()
 
     def generate_monthly_pdf_report(self, observations, goal_progress, strength_counts, development_counts,
                                     summary_json):
         """
-        Generate a PDF version of the monthly report by converting the Word doc.
+        Generate the monthly report as a PDF, rendered in memory from the same layout as the Word document.
         """
-        import tempfile
-        import os
-        from io import BytesIO
-        
-        try:
-            # Generate the Word document first
-            docx_bytes = self.generate_monthly_docx_report(
-                observations, goal_progress, strength_counts, development_counts, summary_json
-            )
-            
-            # Create temporary files for conversion
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_docx:
-                tmp_docx.write(docx_bytes.read())
-                tmp_docx_path = tmp_docx.name
-            
-            tmp_pdf_path = tmp_docx_path.replace('.docx', '.pdf')
-            
-            # Convert docx to pdf
-            convert(tmp_docx_path, tmp_pdf_path)
-            
-            # Read the PDF file
-            with open(tmp_pdf_path, 'rb') as f:
-                pdf_bytes = f.read()
-            
-            # Clean up temporary files
-            try:
-                os.remove(tmp_docx_path)
-                os.remove(tmp_pdf_path)
-            except OSError:
-                pass  # Ignore cleanup errors
-            
-            return BytesIO(pdf_bytes)
-            
-        except Exception as e:
-            # If PDF conversion fails, raise the error with more context
-            raise Exception(f"PDF conversion failed: {str(e)}. This might be due to missing docx2pdf dependencies or system limitations.")
+        return self.build_monthly_layout(summary_json).to_pdf()
@@ -1,28 +1,44 @@
-import requests
 import base64
 import json
-import google.generativeai as genai
-import docx
 import io
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 import time
 import re
 from datetime import datetime
 from config import Config
+from models.http_client import get_http_client
+from models.content_cache import content_cache, sha256_file, sha256_text
+from models.ocr_image import prepare_ocr_image, ocr_stats
+from models.generation_cache import generate_cached
+from models.email_outbox import email_outbox
+from models.report_scores import get_report_scores
+from models.lazy_imports import genai, lazy_import
+from models.monthly_report_document import MonthlyReportLayout, line_chart_png, bar_chart_png
+from models.report_renderer import (REPORT_SCHEMA, schema_outline, parse_report_json, normalize_report,
+                                    render_text, render_docx, render_pdf)
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# python-docx is only needed for the legacy text-to-DOCX conversion
+docx = lazy_import("docx")
+
+
+class TranscriptPending(Exception):
+    """A transcript is still processing when the caller's inline wait runs out"""
+
+    def __init__(self, transcript_id, submitted_at):
+        super().__init__(transcript_id)
+        self.transcript_id = transcript_id
+        self.submitted_at = submitted_at
+
 
 class ObservationExtractor:
     def __init__(self):
         self.ocr_api_key = Config.OCR_API_KEY
         self.groq_api_key = Config.GROQ_API_KEY
         self.gemini_api_key = Config.GOOGLE_API_KEY
-        genai.configure(api_key=self.gemini_api_key)
+        # Gemini is configured when google.generativeai is first used (models/lazy_imports)
 
     def get_pronouns(self, gender):
         """Get appropriate pronouns based on gender"""
@@ -45,10 +61,16 @@ class ObservationExtractor:
             if file_type == "jpeg":
                 file_type = "jpg"
 
-            # Convert image to base64
-            image_file.seek(0)  # Reset file pointer
-            base64_image = self.image_to_base64(image_file)
-            base64_image_with_prefix = f"data:image/{file_type};base64,{base64_image}"
+            # Re-uploaded sheets are answered from the cache without calling OCR.space
+            cache_key = content_cache.make_key(
+                "ocr", sha256_file(image_file), engine="ocr.space", language="eng", ocr_engine=2
+            )
+            cached_text = content_cache.get(cache_key)
+            if cached_text:
+                return cached_text
+
+            # Upright, downscaled JPEG sent as a multipart file instead of a base64 field
+            prepared = prepare_ocr_image(image_file)
 
             # Prepare request payload
             payload = {
@@ -60,15 +82,24 @@ class ObservationExtractor:
                 "OCREngine": 2,
                 "detectOrientation": True,
                 "scale": True,
-                "base64Image": base64_image_with_prefix,
+                "filetype": prepared.filetype or file_type.upper(),
             }
 
             # Send request to OCR API
-            response = requests.post(
+            started = time.perf_counter()
+            response = get_http_client("ocr").post(
                 "https://api.ocr.space/parse/image",
                 data=payload,
+                files={"file": (prepared.filename, prepared.data, prepared.content_type)},
                 headers={"apikey": self.ocr_api_key},
             )
+            ocr_seconds = time.perf_counter() - started
+            ocr_stats.record(prepared, ocr_seconds)
+            logger.info(
+                f"OCR upload {prepared.original_bytes // 1024} KB -> {len(prepared.data) // 1024} KB "
+                f"({prepared.original_size} -> {prepared.size}), prepared in {prepared.seconds:.2f}s, "
+                f"OCR {ocr_seconds:.2f}s"
+            )
 
             response.raise_for_status()
             data = response.json()
@@ -87,6 +118,7 @@ class ObservationExtractor:
             if not extracted_text or not extracted_text.strip():
                 raise Exception("No text was detected in the image")
 
+            content_cache.set(cache_key, extracted_text)
             return extracted_text
 
         except Exception as e:
@@ -131,15 +163,24 @@ For observations, provide full detailed descriptions like:
 
 IMPORTANT: Never use gender-specific language or names from the observation text. Always refer to 'the student' in descriptions."""
 
+            model = "llama-3.3-70b-versatile"
+            cache_key = content_cache.make_key(
+                "groq", sha256_text(extracted_text), model=model, temperature=0.2,
+                prompt=sha256_text(system_prompt)
+            )
+            cached_data = content_cache.get(cache_key)
+            if cached_data is not None:
+                return cached_data
+
             # Send request to Groq API
-            response = requests.post(
+            response = get_http_client("groq").post(
                 "https://api.groq.com/openai/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.groq_api_key}",
                     "Content-Type": "application/json",
                 },
                 json={
-                    "model": "llama-3.3-70b-versatile",
+                    "model": model,
                     "messages": [
                         {"role": "system", "content": system_prompt},
                         {
@@ -157,78 +198,139 @@ IMPORTANT: Never use gender-specific language or names from the observation text
 
             # Extract the JSON content
             ai_response = data["choices"][0]["message"]["content"]
-            return json.loads(ai_response)
+            structured_data = json.loads(ai_response)
+            content_cache.set(cache_key, structured_data)
+            return structured_data
 
         except Exception as e:
             raise Exception(f"Groq API Error: {str(e)}")
 
-    def transcribe_with_assemblyai(self, audio_file, language_code="en"):
-        """Transcribe audio using AssemblyAI API with English, Hindi, Marathi, or Punjabi."""
-        if not Config.ASSEMBLYAI_API_KEY:
-            return "Error: AssemblyAI API key is not configured."
+    def _assemblyai_url(self, path):
+        return f"{Config.ASSEMBLYAI_BASE_URL.rstrip('/')}{path}"
+
+    def submit_assemblyai_transcription(self, audio_file, language_code="en", webhook_url=None):
+        """Upload audio to AssemblyAI and request a transcript. Returns the transcript id.
+
+        When ``webhook_url`` is given AssemblyAI calls it once the transcript is
+        ready, authenticated with the configured webhook secret header.
+        """
+        client = get_http_client("assemblyai")
+
+        # Upload the audio file, streamed from disk rather than read into memory
+        audio_file.seek(0)
+        upload_response = client.post(
+            self._assemblyai_url("/v2/upload"),
+            headers={"authorization": Config.ASSEMBLYAI_API_KEY},
+            data=getattr(audio_file, "stream", audio_file),
+        )
 
-        headers = {
-            "authorization": Config.ASSEMBLYAI_API_KEY,
-            "content-type": "application/json",
+        if upload_response.status_code != 200:
+            raise Exception(f"Error uploading audio: {upload_response.text}")
+
+        upload_url = upload_response.json()["upload_url"]
+
+        # Prepare transcription request
+        transcript_request = {
+            "audio_url": upload_url,
+            "language_code": language_code,  # 'en', 'hi', 'mr', or 'pa'
         }
+        if webhook_url:
+            transcript_request["webhook_url"] = webhook_url
+            if Config.ASSEMBLYAI_WEBHOOK_SECRET:
+                transcript_request["webhook_auth_header_name"] = "X-Webhook-Secret"
+                transcript_request["webhook_auth_header_value"] = Config.ASSEMBLYAI_WEBHOOK_SECRET
+
+        transcript_response = client.post(
+            self._assemblyai_url("/v2/transcript"),
+            json=transcript_request,
+            headers={
+                "authorization": Config.ASSEMBLYAI_API_KEY,
+                "content-type": "application/json",
+            },
+        )
 
-        try:
-            # Upload the audio file
-            audio_file.seek(0)
-            upload_response = requests.post(
-                "https://api.assemblyai.com/v2/upload",
-                headers={"authorization": Config.ASSEMBLYAI_API_KEY},
-                data=audio_file.read(),
-            )
+        if transcript_response.status_code != 200:
+            raise Exception(f"Error requesting transcription: {transcript_response.text}")
 
-            if upload_response.status_code != 200:
-                return f"Error uploading audio: {upload_response.text}"
+        return transcript_response.json()["id"]
 
-            upload_url = upload_response.json()["upload_url"]
+    def get_assemblyai_transcript(self, transcript_id):
+        """Fetch the current transcript record ({'status': ..., 'text': ..., 'error': ...})"""
+        polling_response = get_http_client("assemblyai").get(
+            self._assemblyai_url(f"/v2/transcript/{transcript_id}"),
+            headers={"authorization": Config.ASSEMBLYAI_API_KEY},
+        )
 
-            # Prepare transcription request
-            transcript_request = {
-                "audio_url": upload_url,
-                "language_code": language_code,  # 'en', 'hi', 'mr', or 'pa'
-            }
+        if polling_response.status_code != 200:
+            raise Exception(f"Error checking transcription status: {polling_response.text}")
 
-            transcript_response = requests.post(
-                "https://api.assemblyai.com/v2/transcript",
-                json=transcript_request,
-                headers=headers,
-            )
+        return polling_response.json()
 
-            if transcript_response.status_code != 200:
-                return f"Error requesting transcription: {transcript_response.text}"
+    def wait_for_assemblyai_transcript(self, transcript_id, deadline_seconds=None, pending_after=None):
+        """Poll a transcript with exponential backoff until it finishes or the deadline passes
 
-            transcript_id = transcript_response.json()["id"]
+        With ``pending_after`` the wait stops early and raises ``TranscriptPending``
+        once that many seconds have gone by, so a job can park instead of blocking.
+        """
+        started = time.time()
+        deadline = started + (deadline_seconds or Config.ASSEMBLYAI_TRANSCRIPT_DEADLINE)
+        interval = Config.ASSEMBLYAI_POLL_INITIAL
 
-            status = "processing"
-            while status != "completed" and status != "error":
-                polling_response = requests.get(
-                    f"https://api.assemblyai.com/v2/transcript/{transcript_id}",
-                    headers=headers,
-                )
+        while True:
+            polling_data = self.get_assemblyai_transcript(transcript_id)
+            status = polling_data["status"]
 
-                if polling_response.status_code != 200:
-                    return (
-                        f"Error checking transcription status: {polling_response.text}"
-                    )
+            if status == "completed":
+                return polling_data["text"]
+            elif status == "error":
+                return f"Transcription error: {polling_data.get('error', 'Unknown error')}"
+
+            if time.time() + interval > deadline:
+                return "Error: Transcription timed out or failed."
+            if pending_after is not None and time.time() + interval > started + pending_after:
+                raise TranscriptPending(transcript_id, started)
+
+            time.sleep(interval)
+            interval = min(interval * 2, Config.ASSEMBLYAI_POLL_MAX_INTERVAL)
+
+    def _transcript_cache_key(self, audio_file, language_code):
+        return content_cache.make_key("transcript", sha256_file(audio_file), engine="assemblyai",
+                                      language=language_code)
+
+    def get_cached_transcript(self, audio_file, language_code="en"):
+        """Transcript of an identical, previously transcribed recording, or None"""
+        return content_cache.get(self._transcript_cache_key(audio_file, language_code))
+
+    def cache_transcript(self, audio_file, transcript, language_code="en"):
+        """Remember a successful transcript for the recording's content hash"""
+        if transcript and transcript.strip():
+            content_cache.set(self._transcript_cache_key(audio_file, language_code), transcript)
 
-                polling_data = polling_response.json()
-                status = polling_data["status"]
+    def transcribe_with_assemblyai(self, audio_file, language_code="en", pending_after=None):
+        """Transcribe audio using AssemblyAI API with English, Hindi, Marathi, or Punjabi.
 
-                if status == "completed":
-                    return polling_data["text"]
-                elif status == "error":
-                    return f"Transcription error: {polling_data.get('error', 'Unknown error')}"
+        ``pending_after`` limits the inline wait (see ``wait_for_assemblyai_transcript``).
+        """
+        cached_transcript = self.get_cached_transcript(audio_file, language_code)
+        if cached_transcript:
+            return cached_transcript
 
-                time.sleep(2)
+        if not Config.ASSEMBLYAI_API_KEY:
+            return "Error: AssemblyAI API key is not configured."
 
-            return "Error: Transcription timed out or failed."
+        try:
+            transcript_id = self.submit_assemblyai_transcription(audio_file, language_code)
+            transcript = self.wait_for_assemblyai_transcript(transcript_id, pending_after=pending_after)
+        except TranscriptPending:
+            raise
         except Exception as e:
             return f"Error during transcription: {str(e)}"
 
+        # Error and timeout messages are returned as text; only real transcripts are cached
+        if not transcript.startswith(("Error", "Transcription error")):
+            self.cache_transcript(audio_file, transcript, language_code)
+        return transcript
+
     def generate_conversational_transcript(self, raw_text):
         """Convert raw observations/transcript into conversational format using Gemini API"""
         try:
@@ -308,8 +410,8 @@ Format it as a natural dialogue where:
 
         return "\n".join(formatted_lines)
 
-    def generate_report_from_text(self, text_content, user_info):
-        """Generate a structured report from text using Google Gemini"""
+    def _resolve_report_student(self, user_info):
+        """Display name and pronouns for the child a report is about"""
         # Get child information with gender
         from models.database import get_child_by_id
 
@@ -348,103 +450,56 @@ Format it as a natural dialogue where:
         if not student_name or student_name == "Student":
             student_name = child["name"] if child and child.get("name") else "Student"
 
-        prompt = f"""
-        You are an educational observer tasked with generating a comprehensive and accurate Daily Insights based on the following observational notes from a student session. Pay special attention to any achievements, learning moments, and areas for growth. The report should be structured, insightful, and easy to understand for parents. Add postives and negatives based on the text content provided.
-
-        CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
-        - NEVER extract or use any name from the audio transcription or text content
-        - ALWAYS use the exact name provided: {student_name}
-        - Use these pronouns for the student throughout the report: subject = {pronouns["subject"]}, object = {pronouns["object"]}, possessive = {pronouns["possessive"]}
-        - When referring to the student, use "{student_name}" or the appropriate pronouns ({pronouns["subject"]}/{pronouns["object"]}/{pronouns["possessive"]})
-        - Make sure the report is grammatically correct and adheres to proper English syntax and semantics.
-        Please carefully analyze the given text and complete the report using the exact format, emojis, section titles, and scoring rubrics as described below. The student should be referred to consistently using their provided name "{student_name}" and the appropriate pronouns - never use names from the audio/text content.
-
-        📌 Important Instructions for the Report:
-        - Follow the format exactly as shown below.
-        - Make reasonable inferences for items not explicitly stated in the text.
-        - Ensure that the final Overall Growth Score and category (🟢/💚/⚠️/📈) accurately reflects the number of active areas, according to:
-        🟢 Excellent (7/7 areas) – Clear growth with strong evidence
-        💚 Good (5-6 areas) – Solid engagement with positive trends
-        ⚠️ Fair (3-4 areas) – Some engagement, needs encouragement
-        📈 Needs Work (1-2 areas) – Area not activated or underperforming today
-        - Include the new Communication Skills & Thought Clarity section.
-        - The tone should be professional, warm, and insightful — aimed at helping parents understand their child's daily growth.
-        - REMEMBER: Always use "{user_info["student_name"]}" instead of any pronouns or names from the content
-
-        Instructions for Report Generation
-        Assign scores based on clear, evidence-backed observations for each area.
-
-        Explain each score with a specific reason—avoid generalizations or repeated points. Every score must be justified individually and precisely.
-
-        Use the following rating scale consistently:
-
-        Ratings Scale:
-         Excellent (7/7 areas) – Clear growth with strong evidence
-         Good (5-6 areas) – Solid engagement with positive trends
-         Fair (3-4 areas) – Some engagement, needs encouragement
-         Needs Work (1-2 areas) – Area not activated or underperforming today
-        Always include the complete legend in every report so the evaluator or reader can cross-check scores against the criteria.
-
-        Ensure the entire report strictly follows the legend and that scoring aligns accurately with the defined scale.
-
-        Do not use tables for the "Growth Metrics & Observations" section. Present the content in a well-spaced, structured paragraph format to preserve formatting integrity across platforms.
-        📝 TEXT CONTENT:
-        {text_content}
+        return student_name, pronouns
 
-        🧾 Daily Insights Format for Parents
-
-        🧒 Child's Name: {student_name}
-        📅 Date: [{user_info.get("session_date", "Today")}]
-        🌱 Curiosity Seed Explored: [Extract from text]
-
-        📊 Growth Metrics & Observations
-        Growth Area | Rating | Observation Summary
-        🧠 Intellectual | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        😊 Emotional | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        🤝 Social | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        🎨 Creativity | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        🏃 Physical | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        🚀 Planning/Independence | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        🧭 Character | [✅ Excellent/✅ Good/⚠️ Fair/📈 Needs Work] | [Brief summary]
-        
-        🌈 Curiosity Response Index: [1-10] / 10
-        [Brief explanation of {student_name}'s engagement with the curiosity seed]
+    def generate_report_data(self, text_content, user_info):
+        """Generate the daily report as structured data using Google Gemini
 
-        🗣️ Communication Skills & Thought Clarity: [Describe structure and coherence of thought process]
+        The model is asked for JSON shaped like ``REPORT_SCHEMA``; the reply is
+        parsed, checked and completed by ``normalize_report`` and rendered
+        locally (models/report_renderer). Raises if generation or validation fails.
+        """
+        student_name, pronouns = self._resolve_report_student(user_info)
 
-        🧠 Overall Growth Score:  
-        [🔵 Balanced Growth / 🟡 Moderate Growth / 🔴 Limited Growth] – [X/7] Areas Active 
-        [Brief recommendation for next steps or continued development for {student_name}]
+        prompt = f"""
+        You are an educational observer writing the Daily Insights for parents from the observational notes of a student session below. Note achievements, learning moments and areas for growth, both positives and negatives, in a professional, warm and insightful tone.
 
-        📣 Note for Parent:  
-        [Comprehensive summary for parents with actionable insights and encouragement based on today's session for {student_name}]
+        CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
+        - NEVER extract or use any name from the audio transcription or text content
+        - ALWAYS refer to the student as "{student_name}" or with these pronouns: subject = {pronouns["subject"]}, object = {pronouns["object"]}, possessive = {pronouns["possessive"]}
+        - Write grammatically correct English.
 
-        🟢 Legend
+        Rate each growth area (Intellectual, Emotional, Social, Creativity, Physical, Planning/Independence, Character/Values) as:
+         Excellent – Clear growth with strong evidence
+         Good – Solid engagement with positive trends
+         Fair – Some engagement, needs encouragement
+         Needs Work – Area not activated or underperforming today
+        Justify every rating with a specific, evidence-backed reason from the notes; avoid generalizations and do not repeat points. Make reasonable inferences for anything not stated explicitly.
 
-        ✅ Performance by Area
-        🟢 Excellent (7/7 areas) – Clear growth with strong evidence
-        💚 Good (5-6 areas) – Solid engagement with positive trends        
-        ⚠️ Fair (3-4 areas) – Some engagement, needs encouragement        
-        📈 Needs Work (1-2 areas) – Area not activated or underperforming today
+        Give the Curiosity Response Index from 1 to 10 for how {student_name} engaged with the curiosity seed, rate the communication levels, and describe the structure and coherence of {student_name}'s thought process.
+        Finish with a brief recommendation for next steps and a note for the parent with actionable insights and encouragement.
 
-        give the entire report such that its a direct send worthy item, so all things should always be there and no other unecessary words in the response. No repetation.
-        Also make sure each and every report generated always has the legend "🟢 Legend
+        Respond with a single JSON object and nothing else, in exactly this shape (use one of the listed values where options are separated by "|"; give one growth_metrics entry per growth area):
+        {schema_outline(REPORT_SCHEMA)}
 
-        ✅ Performance by Area
-        🟢 Excellent (7/7 areas) – Clear growth with strong evidence
-        💚 Good (5-6 areas) – Solid engagement with positive trends        
-        ⚠️ Fair (3-4 areas) – Some engagement, needs encouragement        
-        📈 Needs Work (1-2 areas) – Area not activated or underperforming today" at the bottom of each report as the format of the report specifies. 
+        📝 TEXT CONTENT:
+        {text_content}
         """
 
+        model = genai.GenerativeModel("gemini-2.0-flash")
+        config = genai.types.GenerationConfig(temperature=0.2)
+        response = model.generate_content(
+            [{"role": "user", "parts": [{"text": prompt}]}],
+            generation_config=config,
+        )
+        return normalize_report(
+            parse_report_json(response.text), student_name, user_info.get("session_date", "Today")
+        )
+
+    def generate_report_from_text(self, text_content, user_info):
+        """Generate the parent-facing daily report text using Google Gemini"""
         try:
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            config = genai.types.GenerationConfig(temperature=0.2)
-            response = model.generate_content(
-                [{"role": "user", "parts": [{"text": prompt}]}],
-                generation_config=config,
-            )
-            return response.text
+            return render_text(self.generate_report_data(text_content, user_info))
         except Exception as e:
             return f"Error generating report: {str(e)}"
 
@@ -531,7 +586,14 @@ Format it as a natural dialogue where:
             return f"Error generating AI communication review: {str(e)}"
 
     def create_word_document_with_emojis(self, report_content):
-        """Create a Word document from the report content with emoji support"""
+        """Create a Word document from the report content with emoji support
+
+        ``report_content`` is either structured report data, rendered directly,
+        or the formatted text of a report saved before the report schema.
+        """
+        if isinstance(report_content, dict):
+            return render_docx(report_content)
+
         doc = docx.Document()
 
         # Set document encoding and font for emoji support
@@ -597,7 +659,14 @@ Format it as a natural dialogue where:
         return docx_bytes
 
     def create_pdf_alternative(self, report_content):
-        """Create PDF using reportlab instead of WeasyPrint"""
+        """Create PDF using reportlab instead of WeasyPrint
+
+        Structured report data is rendered directly; formatted text from older
+        reports goes through the line-by-line conversion below.
+        """
+        if isinstance(report_content, dict):
+            return render_pdf(report_content)
+
         from reportlab.lib.pagesizes import letter, A4
         from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -747,21 +816,10 @@ Format it as a natural dialogue where:
         return self.create_word_document_with_emojis(report_content)
 
     def send_email(self, recipient_email, subject, message):
-        """Send email with the observation report"""
-        sender_email = Config.EMAIL_USER
-        sender_password = Config.EMAIL_PASSWORD
-
-        if not sender_password:
+        """Queue an email with the observation report"""
+        if not Config.EMAIL_PASSWORD:
             return False, "Email password not configured"
 
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-
-        msg = MIMEMultipart()
-        msg["From"] = sender_email
-        msg["To"] = recipient_email
-        msg["Subject"] = subject
-
         # Convert message to HTML format for better emoji display
         html_message = f"""
         <html>
@@ -778,19 +836,10 @@ Format it as a natural dialogue where:
         </html>
         """
 
-        msg.attach(MIMEText(html_message, "html", "utf-8"))
-
+        # Sent in the background by the outbox worker over a pooled SMTP connection
         try:
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-            server.quit()
-            return True, f"Email sent to {recipient_email}"
-        except smtplib.SMTPAuthenticationError:
-            return False, "Error: Authentication failed. Check your email and password."
-        except smtplib.SMTPException as e:
-            return False, f"Error: Failed to send email. {e}"
+            email_outbox.enqueue(recipient_email, subject, html_message, html=True, kind='report')
+            return True, f"Email queued for {recipient_email}"
         except Exception as e:
             return False, f"Error: {str(e)}"
 
@@ -865,14 +914,14 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
             """
 
             model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(
-                [{"role": "user", "parts": [{"text": custom_prompt}]}]
+            generated_text = generate_cached(
+                "custom_report", model, custom_prompt, child_id=child_id
             )
 
             # Try to parse as JSON and format nicely
             try:
                 # Clean the response text to extract JSON
-                response_text = response.text.strip()
+                response_text = generated_text.strip()
 
                 # Remove markdown code blocks if present
                 if response_text.startswith("```json"):
@@ -920,7 +969,7 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
             except (json.JSONDecodeError, ValueError) as e:
                 # If JSON parsing fails, try to extract and format manually
                 logger.error(f"JSON parsing failed: {str(e)}")
-                logger.error(f"Response text: {response.text}")
+                logger.error(f"Response text: {generated_text}")
 
                 # Fallback: return a formatted version of the raw response
                 return f"""
@@ -931,7 +980,7 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
 📝 Report Type: Custom Analysis
 
 📊 Analysis Results:
-{response.text}
+{generated_text}
 
 📋 Report Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                 """.strip()
@@ -1109,13 +1158,13 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
 
             # Generate the report using AI
             model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(
-                [{"role": "user", "parts": [{"text": monthly_prompt}]}]
+            generated_text = generate_cached(
+                "monthly_report", model, monthly_prompt, child_id=child_id
             )
 
             # Try to parse as JSON and format nicely
             try:
-                json_response = json.loads(response.text)
+                json_response = json.loads(generated_text)
 
                 # Format the JSON response into a readable report
                 formatted_report = f"""
@@ -1151,169 +1200,97 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
 
             except json.JSONDecodeError:
                 # If not valid JSON, return the raw response
-                return response.text
+                return generated_text
 
         except Exception as e:
             return f"Error generating monthly summary: {str(e)}"
 
-    def generate_monthly_docx_report(
-        self,
-        observations,
-        goal_progress,
-        strength_counts,
-        development_counts,
-        summary_json,
-    ):
-        """
-        Generate a narrative-rich monthly report as a Word document, with embedded charts.
-        """
-        import docx
-        from docx.shared import Inches, Pt
-        from io import BytesIO
-        import matplotlib.pyplot as plt
-        from matplotlib.ticker import MaxNLocator
-        import re
-        import json
-
-        doc = docx.Document()
-        style = doc.styles["Normal"]
-        font = style.font
-        font.name = "Segoe UI"
-        font.size = Pt(11)
+    def build_monthly_layout(self, observations, summary_json):
+        """Narrative monthly report with charts, shared by the Word and PDF versions"""
+        layout = MonthlyReportLayout(font_name="Segoe UI", font_size=11)
 
         # --- Narrative Section ---
-        doc.add_heading(f"Monthly Growth Report", 0)
-        doc.add_paragraph(f"{summary_json.get('date', '')}")
-        doc.add_paragraph(f"Student: {summary_json.get('studentName', '')}")
-        doc.add_paragraph("")
-        doc.add_paragraph(summary_json.get("observations", ""))
-        doc.add_paragraph("")
+        layout.title("Monthly Growth Report")
+        layout.paragraph(f"{summary_json.get('date', '')}")
+        layout.paragraph(f"Student: {summary_json.get('studentName', '')}")
+        layout.spacer()
+        layout.paragraph(summary_json.get("observations", ""))
+        layout.spacer()
 
         # --- Strengths ---
-        doc.add_heading("Strengths Observed", level=1)
-        for s in summary_json.get("strengths", []):
-            doc.add_paragraph(s, style="List Bullet")
-        doc.add_paragraph("")
+        layout.heading("Strengths Observed", level=1)
+        layout.bullets(summary_json.get("strengths", []))
+        layout.spacer()
 
         # --- Areas for Development ---
-        doc.add_heading("Areas for Development", level=1)
-        for a in summary_json.get("areasOfDevelopment", []):
-            doc.add_paragraph(a, style="List Bullet")
-        doc.add_paragraph("")
+        layout.heading("Areas for Development", level=1)
+        layout.bullets(summary_json.get("areasOfDevelopment", []))
+        layout.spacer()
 
         # --- Recommendations ---
-        doc.add_heading("Recommendations for Next Month", level=1)
-        for r in summary_json.get("recommendations", []):
-            doc.add_paragraph(r, style="List Bullet")
-        doc.add_paragraph("")
+        layout.heading("Recommendations for Next Month", level=1)
+        layout.bullets(summary_json.get("recommendations", []))
+        layout.spacer()
 
         # ---  Analytics ---
-        doc.add_heading("Learning Analytics", level=1)
+        layout.heading("Learning Analytics", level=1)
         analytics = summary_json.get("learningAnalytics", {})
         for k, v in analytics.items():
-            doc.add_paragraph(f"{k.replace('_', ' ').title()}: {v}")
-        doc.add_paragraph("")
+            layout.paragraph(f"{k.replace('_', ' ').title()}: {v}")
+        layout.spacer()
 
         # --- Progress Insights ---
-        doc.add_heading("Progress Insights", level=1)
-        for insight in summary_json.get("progressInsights", []):
-            doc.add_paragraph(insight, style="List Bullet")
-        doc.add_paragraph("")
+        layout.heading("Progress Insights", level=1)
+        layout.bullets(summary_json.get("progressInsights", []))
+        layout.spacer()
 
         # --- Graphs Section ---
-        doc.add_heading("Visual Analytics", level=1)
+        layout.heading("Visual Analytics", level=1)
 
-        # Curiosity and Growth scores by day (parse from observations)
+        # Curiosity and Growth scores by day (parsed when each observation was saved)
         curiosity_by_date = {}
         growth_by_date = {}
         for obs in observations:
             date = obs.get("date")
-            try:
-                full_data = json.loads(obs.get("full_data", "{}"))
-                report = full_data.get("formatted_report", "")
-            except Exception:
-                report = ""
-            curiosity_match = re.search(
-                r"🌈 Curiosity Response Index: (\\d{1,2}) ?/ ?10", report
-            )
-            if curiosity_match:
-                curiosity_score = int(curiosity_match.group(1))
-                curiosity_by_date[date] = curiosity_score
-            growth_match = re.search(r"Overall Growth Score.*?(\\d)\\s*/\\s*7", report)
-            if growth_match:
-                growth_score = int(growth_match.group(1))
-                growth_by_date[date] = growth_score
+            scores = get_report_scores(obs)
+            if scores["curiosity_index"] is not None:
+                curiosity_by_date[date] = scores["curiosity_index"]
+            if scores["growth_score"] is not None:
+                growth_by_date[date] = scores["growth_score"]
         # Sort by date
         curiosity_dates = sorted(curiosity_by_date.keys())
         growth_dates = sorted(growth_by_date.keys())
-        curiosity_scores = [curiosity_by_date[d] for d in curiosity_dates]
-        growth_scores = [growth_by_date[d] for d in growth_dates]
 
         # --- Curiosity Line Chart ---
         if curiosity_dates:
-            fig, ax = plt.subplots()
-            ax.plot(curiosity_dates, curiosity_scores, marker="o", color="blue")
-            ax.set_title("Curiosity Response Index by Day")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Curiosity Score")
-            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-            plt.xticks(rotation=45, ha="right")
-            plt.tight_layout()
-            img_stream = BytesIO()
-            plt.savefig(img_stream, format="png")
-            plt.close(fig)
-            img_stream.seek(0)
-            doc.add_picture(img_stream, width=Inches(5.5))
-            doc.add_paragraph("")
+            layout.image(line_chart_png(
+                curiosity_dates, [curiosity_by_date[d] for d in curiosity_dates],
+                "Curiosity Response Index by Day", "Date", "Curiosity Score", color="blue",
+            ))
+            layout.spacer()
 
         # --- Growth Line Chart ---
         if growth_dates:
-            fig, ax = plt.subplots()
-            ax.plot(growth_dates, growth_scores, marker="o", color="green")
-            ax.set_title("Overall Growth Score by Day")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Growth Score")
-            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-            plt.xticks(rotation=45, ha="right")
-            plt.tight_layout()
-            img_stream = BytesIO()
-            plt.savefig(img_stream, format="png")
-            plt.close(fig)
-            img_stream.seek(0)
-            doc.add_picture(img_stream, width=Inches(5.5))
-            doc.add_paragraph("")
+            layout.image(line_chart_png(
+                growth_dates, [growth_by_date[d] for d in growth_dates],
+                "Overall Growth Score by Day", "Date", "Growth Score", color="green",
+            ))
+            layout.spacer()
 
         # --- Other suggested graphs from summary_json ---
         for graph in summary_json.get("suggestedGraphs", []):
             if graph["type"] in ["line_chart", "bar_chart"]:
-                fig, ax = plt.subplots()
-                if graph["type"] == "line_chart":
-                    x = list(graph["data"].keys())
-                    y = list(graph["data"].values())
-                    ax.plot(x, y, marker="o")
-                elif graph["type"] == "bar_chart":
-                    x = list(graph["data"].keys())
-                    y = list(graph["data"].values())
-                    ax.bar(x, y)
-                ax.set_title(graph.get("title", ""))
-                ax.set_xlabel(graph.get("xAxis", ""))
-                ax.set_ylabel(graph.get("yAxis", ""))
-                plt.xticks(rotation=45, ha="right")
-                plt.tight_layout()
-                img_stream = BytesIO()
-                plt.savefig(img_stream, format="png")
-                plt.close(fig)
-                img_stream.seek(0)
-                doc.add_picture(img_stream, width=Inches(5.5))
-                doc.add_paragraph(graph.get("description", ""))
-                doc.add_paragraph("")
-
-        docx_bytes = BytesIO()
-        doc.save(docx_bytes)
-        docx_bytes.seek(0)
-        return docx_bytes
+                draw = line_chart_png if graph["type"] == "line_chart" else bar_chart_png
+                layout.image(
+                    draw(list(graph["data"].keys()), list(graph["data"].values()),
+                         graph.get("title", ""), graph.get("xAxis", ""), graph.get("yAxis", "")),
+                    caption=graph.get("description", ""),
+                )
+                layout.spacer()
 
-    def generate_monthly_pdf_report(
+        return layout
+
+    def generate_monthly_docx_report(
         self,
         observations,
         goal_progress,
@@ -1322,51 +1299,22 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
         summary_json,
     ):
         """
-        Generate a PDF version of the monthly report by converting the Word doc.
+        Generate a narrative-rich monthly report as a Word document, with embedded charts.
         """
-        from docx2pdf import convert
-        import tempfile
-        import os
-        from io import BytesIO
-
-        try:
-            # Generate the Word document first
-            docx_bytes = self.generate_monthly_docx_report(
-                observations,
-                goal_progress,
-                strength_counts,
-                development_counts,
-                summary_json,
-            )
-
-            # Create temporary files for conversion
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_docx:
-                tmp_docx.write(docx_bytes.read())
-                tmp_docx_path = tmp_docx.name
-
-            tmp_pdf_path = tmp_docx_path.replace(".docx", ".pdf")
+        return self.build_monthly_layout(observations, summary_json).to_docx()
 
-            # Convert docx to pdf
-            convert(tmp_docx_path, tmp_pdf_path)
-
-            # Read the PDF file
-            with open(tmp_pdf_path, "rb") as f:
-                pdf_bytes = f.read()
-
-            # Clean up temporary files
-            try:
-                os.remove(tmp_docx_path)
-                os.remove(tmp_pdf_path)
-            except OSError:
-                pass  # Ignore cleanup errors
-
-            return BytesIO(pdf_bytes)
-
-        except Exception as e:
-            # If PDF conversion fails, raise the error with more context
-            raise Exception(
-                f"PDF conversion failed: {str(e)}. This might be due to missing docx2pdf dependencies or system limitations."
-            )
+    def generate_monthly_pdf_report(
+        self,
+        observations,
+        goal_progress,
+        strength_counts,
+        development_counts,
+        summary_json,
+    ):
+        """
+        Generate the monthly report as a PDF, rendered in memory from the same layout and charts as the Word doc.
+        """
+        return self.build_monthly_layout(observations, summary_json).to_pdf()
 
     def preprocess_audio_for_student(self, file, student_id):
         """Preprocess audio for students with known issues"""
@@ -1387,9 +1335,14 @@ CRITICAL INSTRUCTIONS FOR NAME AND GENDER USAGE:
         raise NotImplementedError("Fallback transcription not implemented yet")
 
     def generate_topic_suggestions(
-        self, observer_data, child_data, child_name, child_id=None
+        self, observer_data, child_data, child_name, child_id=None, refresh=False,
+        observer_id=None,
     ):
-        """Generate topic suggestions using Gemini AI based on observation history"""
+        """Generate topic suggestions using Gemini AI based on observation history
+
+        Identical requests are served from the generation cache unless ``refresh`` is set.
+        Cached suggestions are dropped when ``observer_id`` saves a new observation.
+        """
         try:
             # Get child information with gender
             from models.database import get_child_by_id
@@ -1505,12 +1458,17 @@ Please provide suggestions in this exact format:
 
             # Generate suggestions using Gemini
             model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(
-                [{"role": "user", "parts": [{"text": prompt}]}]
+            generated_text = generate_cached(
+                "topic_suggestions",
+                model,
+                prompt,
+                child_id=child_id,
+                refresh=refresh,
+                observer_id=observer_id,
             )
 
-            if response and response.text:
-                return response.text.strip()
+            if generated_text:
+                return generated_text.strip()
             else:
                 return self._fallback_suggestions(child_name)
 
@@ -0,0 +1,131 @@
+"""
+Concurrent execution of the independent steps in observation processing.
+
+Storage upload does not depend on OCR/transcription, and the daily report and
+the AI communication review only depend on the extracted text, so each group
+is fanned out on a shared, bounded thread pool instead of running in sequence.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from models.database import upload_file_to_storage
+
+logger = logging.getLogger(__name__)
+
+
+class StageResult:
+    """Outcome of one pipeline stage"""
+
+    def __init__(self, name, value=None, error=None, duration=0.0):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def unwrap(self):
+        """Return the stage value, re-raising the stage's exception if it failed"""
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class PipelineExecutor:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or Config.PIPELINE_MAX_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='obs-pipeline')
+            return self._executor
+
+    def run(self, stages):
+        """Run ``{name: callable}`` concurrently and return ``{name: StageResult}``.
+
+        Stages must not depend on each other. Exceptions are captured per stage
+        so callers decide which failures are fatal.
+        """
+        executor = self._get_executor()
+
+        def timed(name, fn):
+            started = time.time()
+            try:
+                return StageResult(name, value=fn(), duration=time.time() - started)
+            except Exception as e:
+                return StageResult(name, error=e, duration=time.time() - started)
+
+        futures = {name: executor.submit(timed, name, fn) for name, fn in stages.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+        logger.info("Pipeline stages finished: " + ", ".join(
+            f"{name}={result.duration:.1f}s{'' if result.ok else ' (failed)'}" for name, result in results.items()
+        ))
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# Shared by all job worker threads in the process so total concurrency stays bounded
+pipeline_executor = PipelineExecutor()
+
+
+class ObservationPipeline:
+    """Groups ObservationExtractor calls into concurrently executed stages"""
+
+    def __init__(self, extractor, executor=None):
+        self.extractor = extractor
+        self.executor = executor or pipeline_executor
+
+    def extract_and_upload_image(self, ocr_file, upload_file, storage_content_type):
+        """OCR + Groq structuring alongside the storage upload.
+
+        Returns ``{'extract': StageResult(structured_data), 'upload': StageResult(file_url)}``.
+        """
+
+        def extract():
+            extracted_text = self.extractor.extract_text_with_ocr(ocr_file)
+            return self.extractor.process_with_groq(extracted_text)
+
+        def upload():
+            upload_file.seek(0)
+            return upload_file_to_storage(upload_file.stream, upload_file.filename, storage_content_type)
+
+        return self.executor.run({'extract': extract, 'upload': upload})
+
+    def transcribe_and_upload_audio(self, transcribe_fn, upload_file, storage_content_type):
+        """Transcription alongside the storage upload.
+
+        ``transcribe_fn`` is the (possibly fallback-wrapped) transcription step.
+        Returns ``{'transcribe': StageResult, 'upload': StageResult(file_url)}``.
+        """
+
+        def upload():
+            upload_file.seek(0)
+            return upload_file_to_storage(upload_file.stream, upload_file.filename, storage_content_type)
+
+        return self.executor.run({'transcribe': transcribe_fn, 'upload': upload})
+
+    def report_and_review(self, text_content, user_info):
+        """Daily report and AI communication review, both generated from the same text.
+
+        Returns ``{'report': StageResult, 'review': StageResult}``; the report is
+        structured report data (models/report_renderer).
+        """
+        return self.executor.run({
+            'report': lambda: self.extractor.generate_report_data(text_content, user_info),
+            'review': lambda: self.extractor.generate_ai_communication_review(text_content, user_info),
+        })
@@ -0,0 +1,114 @@
+"""
+Image preparation for OCR.space uploads.
+
+Phone photos of observation sheets were sent at full resolution as a base64
+form field, which is a third larger than the file itself. ``prepare_ocr_image``
+applies the EXIF orientation and downscales the long side to
+OCR_MAX_IMAGE_DIMENSION. It re-encodes the image as JPEG, and the bytes are
+sent as a multipart file. Files Pillow cannot read (e.g. PDFs) are sent
+unchanged.
+
+``ocr_stats`` records the uploaded size against the original and base64 sizes,
+plus preparation and OCR latency. /health reports these numbers.
+"""
+import io
+import threading
+import time
+
+from config import Config
+
+
+class OcrStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.original_bytes = 0
+        self.base64_bytes = 0  # what the base64 form field would have carried
+        self.sent_bytes = 0
+        self.prepare_seconds = 0.0
+        self.ocr_seconds = 0.0
+
+    def record(self, prepared, ocr_seconds):
+        with self._lock:
+            self.requests += 1
+            self.original_bytes += prepared.original_bytes
+            self.base64_bytes += base64_size(prepared.original_bytes)
+            self.sent_bytes += len(prepared.data)
+            self.prepare_seconds += prepared.seconds
+            self.ocr_seconds += ocr_seconds
+
+    def stats(self):
+        with self._lock:
+            count = self.requests or 1
+            return {
+                'requests': self.requests,
+                'avg_original_kb': round(self.original_bytes / count / 1024, 1),
+                'avg_base64_kb': round(self.base64_bytes / count / 1024, 1),
+                'avg_sent_kb': round(self.sent_bytes / count / 1024, 1),
+                'payload_ratio': round(self.sent_bytes / self.base64_bytes, 3) if self.base64_bytes else None,
+                'avg_prepare_seconds': round(self.prepare_seconds / count, 3),
+                'avg_ocr_seconds': round(self.ocr_seconds / count, 3),
+            }
+
+
+class PreparedImage:
+    __slots__ = ('data', 'filename', 'content_type', 'filetype', 'original_bytes',
+                 'original_size', 'size', 'seconds')
+
+    def __init__(self, data, filename, content_type, filetype, original_bytes,
+                 original_size=None, size=None, seconds=0.0):
+        self.data = data
+        self.filename = filename
+        self.content_type = content_type
+        self.filetype = filetype
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.size = size
+        self.seconds = seconds
+
+
+def base64_size(num_bytes):
+    return (num_bytes + 2) // 3 * 4
+
+
+def prepare_ocr_image(image_file, max_dimension=None, quality=None):
+    """Upright, downscaled JPEG bytes of an uploaded image, ready for OCR"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    started = time.perf_counter()
+    max_dimension = max_dimension or Config.OCR_MAX_IMAGE_DIMENSION
+    quality = quality or Config.OCR_JPEG_QUALITY
+
+    image_file.seek(0)
+    original = image_file.read()
+    image_file.seek(0)
+    name = image_file.filename or 'upload'
+    extension = name.rsplit('.', 1)[-1].upper() if '.' in name else ''
+
+    try:
+        with Image.open(io.BytesIO(original)) as image:
+            original_size = image.size
+            upright = image.getexif().get(0x0112, 1) == 1  # EXIF Orientation
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=quality, optimize=True)
+            size = image.size
+    except (UnidentifiedImageError, OSError):
+        # Not something Pillow can read; OCR.space gets the file as uploaded
+        return PreparedImage(original, name, getattr(image_file, 'mimetype', None) or 'application/octet-stream',
+                             extension, len(original), seconds=time.perf_counter() - started)
+
+    data = buffer.getvalue()
+    if upright and size == original_size and extension in ('JPG', 'JPEG') and len(data) >= len(original):
+        # Re-encoding would not make this photo any smaller
+        data = original
+    stem = name.rsplit('.', 1)[0]
+    return PreparedImage(data, f"{stem}.jpg", 'image/jpeg', 'JPG', len(original),
+                         original_size, size, time.perf_counter() - started)
+
+
+# Process-wide OCR upload statistics, reported by /health
+ocr_stats = OcrStats()
@@ -0,0 +1,319 @@
+"""
+Observer session reminders driven by a timer heap.
+
+Each active ``scheduled_reports`` row fires once a day, REMINDER_LEAD_MINUTES
+before its session time (in REMINDER_TIMEZONE). Next fire times are kept in a
+min-heap and a single APScheduler ``date`` job is armed for the earliest one,
+so nothing scans every schedule on an interval. ``save_scheduled_report``
+updates the heap in place, but only in the worker that handled the request.
+The scheduler leader sees changes saved in other workers at its next resync,
+up to REMINDER_RESYNC_MINUTES later; a reminder due sooner than that after
+such a change is sent the following day. Schedules that come due together are checked with batched lookups,
+and each (schedule, session day) is recorded in ``reminder_deliveries`` before
+the email goes out, so a reminder is never sent twice, even across restarts.
+"""
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from config import Config
+from models.database import get_supabase_client, select_in
+
+logger = logging.getLogger(__name__)
+
+ARM_JOB_ID = 'observer-reminder-next'
+
+
+def parse_session_time(value):
+    """``'19:00:00'`` -> ``time(19, 0)``"""
+    parts = str(value).split(':')
+    return time(int(parts[0]), int(parts[1]))
+
+
+class ReminderEngine:
+    def __init__(self):
+        self.tz = pytz.timezone(Config.REMINDER_TIMEZONE)
+        self.lead = timedelta(minutes=Config.REMINDER_LEAD_MINUTES)
+        self.grace = timedelta(seconds=Config.REMINDER_GRACE_SECONDS)
+        self._lock = threading.RLock()
+        # (fire_at, seq, schedule_id, session_at); entries whose seq is no longer
+        # current for their schedule are stale and skipped when popped
+        self._heap = []
+        self._current = {}
+        self._schedules = {}
+        self._seq = itertools.count()
+        self._scheduler = None
+        self._send = None
+        self._armed_for = None
+        self._local_deliveries = set()
+        self._stats = {'fired': 0, 'sent': 0, 'already_submitted': 0, 'duplicates': 0, 'failed': 0}
+
+    def start(self, scheduler, send_reminder):
+        """Attach the engine to ``scheduler``.
+
+        Schedules are loaded by ``rearm`` when this worker is elected scheduler
+        leader, so workers that never run jobs skip the query at start-up.
+        ``send_reminder(email, child_name, session_time_str)`` returns True on success.
+        """
+        self._scheduler = scheduler
+        self._send = send_reminder
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def _session_on(self, day, session_time):
+        return self.tz.localize(datetime.combine(day, session_time))
+
+    def next_fire(self, sched, now=None):
+        """``(fire_at, session_at)`` of the next reminder for ``sched``"""
+        now = now or self.now()
+        session_time = parse_session_time(sched['scheduled_time'])
+        day = now.date()
+        session_at = self._session_on(day, session_time)
+        while session_at - self.lead < now - self.grace:
+            day += timedelta(days=1)
+            session_at = self._session_on(day, session_time)
+        return session_at - self.lead, session_at
+
+    def _push(self, schedule_id, fire_at, session_at):
+        seq = next(self._seq)
+        self._current[schedule_id] = seq
+        heapq.heappush(self._heap, (fire_at, seq, schedule_id, session_at))
+
+    def _peek(self):
+        while self._heap:
+            fire_at, seq, schedule_id, session_at = self._heap[0]
+            if self._current.get(schedule_id) == seq:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def update_schedule(self, sched):
+        """Add or reschedule one ``scheduled_reports`` row (inactive rows are removed)"""
+        if sched.get('is_active') is False:
+            self.remove_schedule(sched['id'])
+            return
+        try:
+            fire_at, session_at = self.next_fire(sched)
+        except (KeyError, ValueError, IndexError) as e:
+            logger.warning(f"Ignoring schedule {sched.get('id')} with bad time {sched.get('scheduled_time')}: {e}")
+            return
+        with self._lock:
+            self._schedules[sched['id']] = sched
+            self._push(sched['id'], fire_at, session_at)
+        self._arm()
+
+    def remove_schedule(self, schedule_id):
+        with self._lock:
+            self._schedules.pop(schedule_id, None)
+            self._current.pop(schedule_id, None)
+        self._arm()
+
+    def resync(self):
+        """Reload active schedules; only new or changed ones are re-queued"""
+        try:
+            schedules = get_supabase_client().table('scheduled_reports') \
+                .select('*').eq('is_active', True).execute().data or []
+        except Exception as e:
+            logger.error(f"Error loading schedules for reminders: {e}")
+            return
+
+        now = self.now()
+        loaded = {sched['id']: sched for sched in schedules}
+        with self._lock:
+            for schedule_id in set(self._schedules) - set(loaded):
+                self._schedules.pop(schedule_id, None)
+                self._current.pop(schedule_id, None)
+            for schedule_id, sched in loaded.items():
+                known = self._schedules.get(schedule_id)
+                if known and known.get('scheduled_time') == sched.get('scheduled_time') \
+                        and schedule_id in self._current:
+                    self._schedules[schedule_id] = sched
+                    continue
+                try:
+                    fire_at, session_at = self.next_fire(sched, now)
+                except (KeyError, ValueError, IndexError) as e:
+                    logger.warning(f"Ignoring schedule {schedule_id} with bad time {sched.get('scheduled_time')}: {e}")
+                    continue
+                self._schedules[schedule_id] = sched
+                self._push(schedule_id, fire_at, session_at)
+        self._arm()
+
+    def rearm(self):
+        """Resync and re-arm unconditionally, e.g. when this worker becomes scheduler leader"""
+        with self._lock:
+            self._armed_for = None
+        self.resync()
+
+    def _arm(self):
+        """Point the single APScheduler date job at the earliest fire time"""
+        if not self._scheduler:
+            return
+        # APScheduler drops a date job that misfires by more than its grace time,
+        # so an unchanged fire time only counts as armed while the job still exists
+        job_exists = self._scheduler.get_job(ARM_JOB_ID) is not None
+        with self._lock:
+            top = self._peek()
+            fire_at = top[0] if top else None
+            if fire_at == self._armed_for and (fire_at is None or job_exists):
+                return
+            self._armed_for = fire_at
+
+        if fire_at is None:
+            try:
+                self._scheduler.remove_job(ARM_JOB_ID)
+            except Exception:
+                pass
+            return
+
+        self._scheduler.add_job(
+            id=ARM_JOB_ID,
+            func=self.fire_due,
+            trigger='date',
+            run_date=max(fire_at, self.now()),
+            replace_existing=True,
+            misfire_grace_time=Config.REMINDER_GRACE_SECONDS
+        )
+
+    def fire_due(self):
+        """Send every reminder whose fire time has arrived, then re-arm for the next one"""
+        now = self.now()
+        due = []
+        with self._lock:
+            self._armed_for = None
+            while True:
+                top = self._peek()
+                if not top or top[0] > now + timedelta(seconds=1):
+                    break
+                fire_at, seq, schedule_id, session_at = heapq.heappop(self._heap)
+                del self._current[schedule_id]
+                due.append((self._schedules[schedule_id], session_at))
+
+        if due:
+            self._stats['fired'] += len(due)
+            if self._scheduler and getattr(self._scheduler, 'app', None):
+                with self._scheduler.app.app_context():
+                    retries = self._deliver(due)
+            else:
+                retries = self._deliver(due)
+
+            with self._lock:
+                for sched, session_at in due:
+                    if sched['id'] not in self._schedules or sched['id'] in self._current:
+                        continue  # removed or rescheduled meanwhile
+                    if sched['id'] in retries:
+                        self._push(sched['id'], now + timedelta(seconds=Config.REMINDER_RETRY_SECONDS), session_at)
+                    else:
+                        next_session = self._session_on(session_at.date() + timedelta(days=1),
+                                                        parse_session_time(sched['scheduled_time']))
+                        self._push(sched['id'], next_session - self.lead, next_session)
+        self._arm()
+
+    def _deliver(self, due):
+        """Send reminders for ``due`` [(schedule, session_at)]; returns schedule ids to retry"""
+        try:
+            client = get_supabase_client()
+            child_ids = [sched['child_id'] for sched, _ in due]
+            observers = {user['id']: user for user in
+                         select_in('users', 'id, email, name', 'id', [sched['observer_id'] for sched, _ in due],
+                                   client=client)}
+            children = {child['id']: child for child in select_in('children', 'id, name', 'id', child_ids,
+                                                                  client=client)}
+            submitted = set()
+            for session_date in {session_at.date().isoformat() for _, session_at in due}:
+                for obs in select_in('observations', 'student_id, username', 'student_id', child_ids,
+                                     filters={'date': session_date}, client=client):
+                    submitted.add((obs['student_id'], obs['username'], session_date))
+        except Exception as e:
+            logger.error(f"Error loading reminder details: {e}")
+            return {sched['id'] for sched, session_at in due if self.now() < session_at}
+
+        pending = []
+        for sched, session_at in due:
+            if session_at <= self.now():
+                continue  # found too late, e.g. while no worker was running jobs
+            session_date = session_at.date().isoformat()
+            if (sched['child_id'], sched['observer_id'], session_date) in submitted:
+                self._stats['already_submitted'] += 1
+                continue
+            observer = observers.get(sched['observer_id'])
+            child = children.get(sched['child_id'])
+            if not observer or not child or not observer.get('email'):
+                logger.warning(f"Reminder skipped for schedule {sched['id']}: observer or child not found")
+                continue
+            pending.append((sched, session_at, observer, child))
+
+        claimed = self._claim(client, [(sched, session_at) for sched, session_at, _, _ in pending])
+        retries = set()
+        for sched, session_at, observer, child in pending:
+            if sched['id'] not in claimed:
+                self._stats['duplicates'] += 1
+                continue
+            if self._send(observer['email'], child['name'], session_at.strftime('%I:%M %p')):
+                self._stats['sent'] += 1
+                continue
+            self._stats['failed'] += 1
+            self._release(client, sched['id'], session_at.date().isoformat())
+            if self.now() + timedelta(seconds=Config.REMINDER_RETRY_SECONDS) < session_at:
+                retries.add(sched['id'])
+        return retries
+
+    def _claim(self, client, items):
+        """Record deliveries up front; returns the schedule ids this process may send"""
+        if not items:
+            return set()
+        rows = [{
+            'schedule_id': sched['id'],
+            'session_date': session_at.date().isoformat(),
+            'observer_id': sched['observer_id'],
+            'child_id': sched['child_id'],
+        } for sched, session_at in items]
+        try:
+            inserted = client.table('reminder_deliveries').upsert(
+                rows, on_conflict='schedule_id,session_date', ignore_duplicates=True
+            ).execute().data or []
+            return {row['schedule_id'] for row in inserted}
+        except Exception as e:
+            # Without migrations/006 only this process's memory prevents repeats
+            logger.warning(f"reminder_deliveries unavailable, de-duplicating in memory: {e}")
+            claimed = set()
+            for row in rows:
+                key = (row['schedule_id'], row['session_date'])
+                if key not in self._local_deliveries:
+                    self._local_deliveries.add(key)
+                    claimed.add(row['schedule_id'])
+            return claimed
+
+    def _release(self, client, schedule_id, session_date):
+        """Forget a failed delivery so it can be retried"""
+        self._local_deliveries.discard((schedule_id, session_date))
+        try:
+            client.table('reminder_deliveries').delete() \
+                .eq('schedule_id', schedule_id).eq('session_date', session_date).execute()
+        except Exception as e:
+            logger.warning(f"Could not release reminder delivery for schedule {schedule_id}: {e}")
+
+    def upcoming(self, limit=10):
+        """The next ``limit`` reminders, for /scheduler_status"""
+        with self._lock:
+            entries = sorted(entry for entry in self._heap if self._current.get(entry[2]) == entry[1])
+        return [{
+            'schedule_id': schedule_id,
+            'fire_at': fire_at.isoformat(),
+            'session_at': session_at.isoformat(),
+        } for fire_at, _, schedule_id, session_at in entries[:limit]]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['schedules'] = len(self._schedules)
+            stats['armed_for'] = self._armed_for.isoformat() if self._armed_for else None
+        return stats
+
+
+# Process-wide engine started by create_app
+reminder_engine = ReminderEngine()
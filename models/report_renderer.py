@@ -0,0 +1,369 @@
+"""
+Daily report schema and its local renderers.
+
+Gemini returns the daily report as JSON matching ``REPORT_SCHEMA`` (ratings,
+short summaries, the Curiosity Response Index, communication levels and the
+parent note). The pinned google-generativeai 0.3.2 has no JSON mode, so the
+prompt carries ``schema_outline(REPORT_SCHEMA)`` and the reply goes through
+``parse_report_json``. ``normalize_report`` checks it and derives the Overall Growth
+Score locally; the parent-facing text, the Word document and the PDF are all
+rendered here from that one dict. The rendered text keeps the emoji layout
+parents already receive, so email and reports saved before the schema read
+the same.
+"""
+import io
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = 1
+
+# (schema name, emoji) in report order; names match models/report_scores.GROWTH_AREAS
+GROWTH_AREAS = (
+    ('Intellectual', '🧠'),
+    ('Emotional', '😊'),
+    ('Social', '🤝'),
+    ('Creativity', '🎨'),
+    ('Physical', '🏃'),
+    ('Planning/Independence', '🚀'),
+    ('Character/Values', '🧭'),
+)
+
+RATINGS = ('Excellent', 'Good', 'Fair', 'Needs Work')
+RATING_EMOJI = {'Excellent': '✅', 'Good': '✅', 'Fair': '⚠️', 'Needs Work': '📈'}
+ACTIVE_RATINGS = ('Excellent', 'Good')
+
+COMMUNICATION_LEVELS = {
+    'confidence': ('Confidence level', ('Strong', 'Moderate', 'Weak')),
+    'clarity': ('Clarity of thought', ('Clear', 'Moderate', 'Unclear')),
+    'participation': ('Participation', ('Active', 'Moderate', 'Passive')),
+    'sequencing': ('Sequence of explanation', ('Logical', 'Moderate', 'Disorganized')),
+}
+
+GROWTH_CATEGORIES = (
+    # (minimum active areas, category, emoji)
+    (5, 'Balanced Growth', '🔵'),
+    (3, 'Moderate Growth', '🟡'),
+    (0, 'Limited Growth', '🔴'),
+)
+
+LEGEND = (
+    '🟢 Excellent (7/7 areas) – Clear growth with strong evidence',
+    '💚 Good (5-6 areas) – Solid engagement with positive trends',
+    '⚠️ Fair (3-4 areas) – Some engagement, needs encouragement',
+    '📈 Needs Work (1-2 areas) – Area not activated or underperforming today',
+)
+
+
+def _string(description):
+    return {'type': 'STRING', 'description': description}
+
+
+def _enum(values, description=None):
+    schema = {'type': 'STRING', 'enum': list(values)}
+    if description:
+        schema['description'] = description
+    return schema
+
+
+# Shape of the JSON Gemini is asked for. Name, date and the growth score are
+# filled in locally, so the model never generates them.
+REPORT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'curiosity_seed': _string('Curiosity seed explored in the session'),
+        'growth_metrics': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'area': _enum([name for name, _ in GROWTH_AREAS]),
+                    'rating': _enum(RATINGS),
+                    'summary': _string('One or two sentences of evidence for the rating'),
+                },
+                'required': ['area', 'rating', 'summary'],
+            },
+        },
+        'curiosity_index': {'type': 'INTEGER', 'description': 'Curiosity Response Index from 1 to 10'},
+        'curiosity_summary': _string('How the student engaged with the curiosity seed'),
+        'communication': {
+            'type': 'OBJECT',
+            'properties': {
+                **{skill: _enum(levels) for skill, (_, levels) in COMMUNICATION_LEVELS.items()},
+                'summary': _string('Structure and coherence of the thought process'),
+            },
+            'required': [*COMMUNICATION_LEVELS, 'summary'],
+        },
+        'recommendation': _string('Next steps for continued development'),
+        'parent_note': _string('Summary for parents with actionable insights and encouragement'),
+    },
+    'required': ['curiosity_seed', 'growth_metrics', 'curiosity_index', 'curiosity_summary',
+                 'communication', 'recommendation', 'parent_note'],
+}
+
+
+def schema_outline(schema):
+    """Example-shaped JSON skeleton of ``schema`` for the prompt"""
+    def outline(node):
+        kind = node['type']
+        if kind == 'OBJECT':
+            return {name: outline(child) for name, child in node['properties'].items()}
+        if kind == 'ARRAY':
+            return [outline(node['items'])]
+        if 'enum' in node:
+            return ' | '.join(node['enum'])
+        if kind == 'STRING':
+            return node.get('description') or 'string'
+        return f"{node.get('description', '')} ({kind.lower()})".strip()
+
+    return json.dumps(outline(schema), indent=1, ensure_ascii=False)
+
+
+_JSON_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def parse_report_json(text):
+    """Decode the model's JSON reply, tolerating a Markdown code fence around it"""
+    text = _JSON_FENCE.sub('', (text or '').strip())
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError('Report response is not JSON')
+    return json.loads(text[start:end + 1])
+
+
+def _pick(value, allowed, default):
+    """Case-insensitive match of ``value`` against ``allowed``"""
+    for option in allowed:
+        if str(value or '').strip().lower() == option.lower():
+            return option
+    return default
+
+
+def growth_category(active_areas):
+    for minimum, category, emoji in GROWTH_CATEGORIES:
+        if active_areas >= minimum:
+            return category, emoji
+
+
+def normalize_report(data, student_name, session_date):
+    """Validate a generated report and complete it with the locally derived fields.
+
+    Raises ValueError when the response is not a report at all; otherwise
+    unknown ratings become 'Fair', missing areas are filled in and the
+    curiosity index is clamped to 1-10.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('growth_metrics'), list):
+        raise ValueError('Report response does not match the report schema')
+
+    by_area = {}
+    for metric in data['growth_metrics']:
+        if not isinstance(metric, dict):
+            continue
+        area = _pick(metric.get('area'), [name for name, _ in GROWTH_AREAS], None)
+        if area and area not in by_area:
+            by_area[area] = {
+                'area': area,
+                'rating': _pick(metric.get('rating'), RATINGS, 'Fair'),
+                'summary': str(metric.get('summary') or '').strip(),
+            }
+    growth_metrics = [by_area.get(name) or {'area': name, 'rating': 'Needs Work', 'summary': 'Not observed today.'}
+                      for name, _ in GROWTH_AREAS]
+
+    try:
+        curiosity_index = min(10, max(1, int(data.get('curiosity_index'))))
+    except (TypeError, ValueError):
+        curiosity_index = None
+
+    raw_communication = data.get('communication') if isinstance(data.get('communication'), dict) else {}
+    communication = {skill: _pick(raw_communication.get(skill), levels, 'Moderate')
+                     for skill, (_, levels) in COMMUNICATION_LEVELS.items()}
+    communication['summary'] = str(raw_communication.get('summary') or '').strip()
+
+    active_areas = sum(1 for metric in growth_metrics if metric['rating'] in ACTIVE_RATINGS)
+    category, _ = growth_category(active_areas)
+
+    return {
+        'v': REPORT_VERSION,
+        'student_name': student_name,
+        'date': session_date,
+        'curiosity_seed': str(data.get('curiosity_seed') or '').strip(),
+        'growth_metrics': growth_metrics,
+        'curiosity_index': curiosity_index,
+        'curiosity_summary': str(data.get('curiosity_summary') or '').strip(),
+        'communication': communication,
+        'active_areas': active_areas,
+        'growth_category': category,
+        'recommendation': str(data.get('recommendation') or '').strip(),
+        'parent_note': str(data.get('parent_note') or '').strip(),
+    }
+
+
+def _area_emoji(area):
+    return dict(GROWTH_AREAS).get(area, '•')
+
+
+def _growth_score_line(report):
+    _, emoji = growth_category(report['active_areas'])
+    return f"{emoji} {report['growth_category']} – {report['active_areas']}/7 Areas Active"
+
+
+def _communication_lines(report):
+    communication = report['communication']
+    return [f"{label}: {communication[skill]}" for skill, (label, _) in COMMUNICATION_LEVELS.items()]
+
+
+def render_text(report):
+    """Parent-facing text in the emoji layout used for email and on-screen reports"""
+    lines = [
+        f"🧒 Child's Name: {report['student_name']}",
+        f"📅 Date: {report['date']}",
+        f"🌱 Curiosity Seed Explored: {report['curiosity_seed']}",
+        '',
+        '📊 Growth Metrics & Observations',
+    ]
+    for metric in report['growth_metrics']:
+        lines.append(f"{_area_emoji(metric['area'])} {metric['area']} | "
+                     f"{RATING_EMOJI[metric['rating']]} {metric['rating']} | {metric['summary']}")
+
+    curiosity = report['curiosity_index'] if report['curiosity_index'] is not None else '-'
+    lines += [
+        '',
+        f"🌈 Curiosity Response Index: {curiosity} / 10",
+        report['curiosity_summary'],
+        '',
+        f"🗣️ Communication Skills & Thought Clarity: {report['communication']['summary']}",
+        *_communication_lines(report),
+        '',
+        '🧠 Overall Growth Score:',
+        _growth_score_line(report),
+        report['recommendation'],
+        '',
+        '📣 Note for Parent:',
+        report['parent_note'],
+        '',
+        '🟢 Legend',
+        '',
+        '✅ Performance by Area',
+        *LEGEND,
+    ]
+    return '\n'.join(lines)
+
+
+def render_docx(report):
+    """Word document for the report; returns a BytesIO positioned at the start"""
+    import docx
+    from docx.shared import Pt
+
+    doc = docx.Document()
+    doc.styles['Normal'].font.name = 'Segoe UI Emoji'
+    doc.styles['Normal'].font.size = Pt(10)
+
+    doc.add_heading('📋 Daily Insights', 0)
+    for label, value in (("🧒 Child's Name", report['student_name']), ('📅 Date', report['date']),
+                         ('🌱 Curiosity Seed Explored', report['curiosity_seed'])):
+        p = doc.add_paragraph()
+        p.add_run(f"{label}: ").bold = True
+        p.add_run(str(value))
+
+    doc.add_heading('📊 Growth Metrics & Observations', level=1)
+    table = doc.add_table(rows=1, cols=3)
+    table.style = 'Table Grid'
+    for cell, text in zip(table.rows[0].cells, ('Growth Area', 'Rating', 'Observation Summary')):
+        cell.paragraphs[0].add_run(text).bold = True
+    for metric in report['growth_metrics']:
+        cells = table.add_row().cells
+        cells[0].text = f"{_area_emoji(metric['area'])} {metric['area']}"
+        cells[1].text = f"{RATING_EMOJI[metric['rating']]} {metric['rating']}"
+        cells[2].text = metric['summary']
+
+    curiosity = report['curiosity_index'] if report['curiosity_index'] is not None else '-'
+    doc.add_heading(f"🌈 Curiosity Response Index: {curiosity} / 10", level=2)
+    doc.add_paragraph(report['curiosity_summary'])
+
+    doc.add_heading('🗣️ Communication Skills & Thought Clarity', level=2)
+    doc.add_paragraph(report['communication']['summary'])
+    for line in _communication_lines(report):
+        doc.add_paragraph(line, style='List Bullet')
+
+    doc.add_heading('🧠 Overall Growth Score', level=2)
+    doc.add_paragraph().add_run(_growth_score_line(report)).bold = True
+    doc.add_paragraph(report['recommendation'])
+
+    doc.add_heading('📣 Note for Parent', level=2)
+    doc.add_paragraph(report['parent_note'])
+
+    doc.add_heading('🟢 Legend', level=3)
+    for line in LEGEND:
+        doc.add_paragraph(line, style='List Bullet')
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def render_pdf(report):
+    """PDF for the report built with reportlab; returns a BytesIO positioned at the start.
+
+    The standard PDF fonts have no emoji glyphs, so the PDF uses plain labels.
+    """
+    from xml.sax.saxutils import escape
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('ReportTitle', parent=styles['Heading1'], fontSize=16,
+                                 spaceAfter=20, textColor=colors.blue, alignment=1)
+    heading_style = ParagraphStyle('ReportHeading', parent=styles['Heading2'], fontSize=12,
+                                   spaceAfter=8, fontName='Helvetica-Bold')
+    normal_style = ParagraphStyle('ReportNormal', parent=styles['Normal'], fontSize=10, spaceAfter=4)
+    cell_style = ParagraphStyle('ReportCell', parent=normal_style, spaceAfter=0)
+
+    def para(text, style=normal_style):
+        return Paragraph(escape(str(text)), style)
+
+    curiosity = report['curiosity_index'] if report['curiosity_index'] is not None else '-'
+    story = [
+        Paragraph('Daily Insights', title_style),
+        Paragraph(f"<b>Child's Name:</b> {escape(str(report['student_name']))}", normal_style),
+        Paragraph(f"<b>Date:</b> {escape(str(report['date']))}", normal_style),
+        Paragraph(f"<b>Curiosity Seed Explored:</b> {escape(report['curiosity_seed'])}", normal_style),
+        Spacer(1, 12),
+        para('Growth Metrics & Observations', heading_style),
+    ]
+
+    rows = [[para('Growth Area', cell_style), para('Rating', cell_style), para('Observation Summary', cell_style)]]
+    rows += [[para(m['area'], cell_style), para(m['rating'], cell_style), para(m['summary'], cell_style)]
+             for m in report['growth_metrics']]
+    table = Table(rows, colWidths=[120, 70, 260], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    story += [table, Spacer(1, 12)]
+
+    story += [
+        para(f"Curiosity Response Index: {curiosity} / 10", heading_style),
+        para(report['curiosity_summary']),
+        para('Communication Skills & Thought Clarity', heading_style),
+        para(report['communication']['summary']),
+        *[para(f"• {line}") for line in _communication_lines(report)],
+        para('Overall Growth Score', heading_style),
+        para(f"{report['growth_category']} – {report['active_areas']}/7 Areas Active"),
+        para(report['recommendation']),
+        para('Note for Parent', heading_style),
+        para(report['parent_note']),
+        para('Legend', heading_style),
+        *[para(f"• {line.split(' ', 1)[1]}") for line in LEGEND],
+    ]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
+                      topMargin=72, bottomMargin=18).build(story)
+    buffer.seek(0)
+    return buffer
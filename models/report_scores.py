@@ -0,0 +1,100 @@
+"""
+Structured scores parsed from a generated daily report.
+
+The formatted report carries the seven growth-area ratings, the Curiosity
+Response Index, the Overall Growth Score and the communication levels as
+text. They are parsed once, when the observation is saved, and stored in the
+``observations.report_scores`` JSON column (migrations/008) so monthly
+analytics read them directly. Reports generated against the daily report
+schema (models/report_renderer) carry the values as fields, so
+``scores_from_report_data`` copies them without parsing.
+``tools/backfill_report_scores.py`` fills the column for older rows.
+"""
+import json
+import re
+
+SCORES_VERSION = 2
+
+GROWTH_AREAS = ('Intellectual', 'Emotional', 'Social', 'Creativity', 'Physical',
+                'Character/Values', 'Planning/Independence')
+
+COMMUNICATION_PATTERNS = {
+    'confidence': re.compile(r'Confidence level:.*?(Strong|Moderate|Weak)', re.IGNORECASE),
+    'clarity': re.compile(r'Clarity of thought:.*?(Clear|Moderate|Unclear)', re.IGNORECASE),
+    'participation': re.compile(r'Participation.*?:.*?(Active|Moderate|Passive)', re.IGNORECASE),
+    'sequencing': re.compile(r'Sequence of explanation:.*?(Logical|Moderate|Disorganized)', re.IGNORECASE),
+}
+
+GROWTH_PATTERNS = {area: re.compile(rf'{re.escape(area)}.*?\|.*?(Excellent|Good|Fair|Needs Work)\s*\|', re.IGNORECASE)
+                   for area in GROWTH_AREAS}
+
+CURIOSITY_PATTERN = re.compile(r'🌈 Curiosity Response Index: (\d{1,2}) ?/ ?10')
+GROWTH_SCORE_PATTERN = re.compile(r'Overall Growth Score.*?(\d)\s*/\s*7', re.DOTALL)  # score is on the next line
+
+
+def extract_report_scores(formatted_report):
+    """Parse a formatted report into ``{'v', 'growth', 'communication', 'curiosity_index', 'growth_score'}``.
+
+    Ratings and levels are lower-cased; anything not found is left out (or None
+    for the two numeric scores).
+    """
+    report = formatted_report or ''
+
+    growth = {}
+    for area, pattern in GROWTH_PATTERNS.items():
+        match = pattern.search(report)
+        if match:
+            growth[area] = match.group(1).lower()
+
+    communication = {}
+    for skill, pattern in COMMUNICATION_PATTERNS.items():
+        match = pattern.search(report)
+        if match:
+            communication[skill] = match.group(1).lower()
+
+    curiosity_match = CURIOSITY_PATTERN.search(report)
+    growth_score_match = GROWTH_SCORE_PATTERN.search(report)
+
+    return {
+        'v': SCORES_VERSION,
+        'growth': growth,
+        'communication': communication,
+        'curiosity_index': int(curiosity_match.group(1)) if curiosity_match else None,
+        'growth_score': int(growth_score_match.group(1)) if growth_score_match else None,
+    }
+
+
+def scores_from_report_data(report_data):
+    """Scores for a structured daily report (see models/report_renderer)"""
+    return {
+        'v': SCORES_VERSION,
+        'growth': {metric['area']: metric['rating'].lower() for metric in report_data.get('growth_metrics', [])},
+        'communication': {skill: level.lower() for skill, level in report_data.get('communication', {}).items()
+                          if skill in COMMUNICATION_PATTERNS},
+        'curiosity_index': report_data.get('curiosity_index'),
+        'growth_score': report_data.get('active_areas'),
+    }
+
+
+def scores_from_full_data(full_data):
+    """Scores for an observation's ``full_data`` (JSON string or dict)"""
+    try:
+        data = json.loads(full_data or '{}') if isinstance(full_data, str) else (full_data or {})
+    except ValueError:
+        data = {}
+    if data.get('report_data'):
+        return scores_from_report_data(data['report_data'])
+    return extract_report_scores(data.get('formatted_report', ''))
+
+
+def get_report_scores(observation):
+    """Stored scores for an observation row, parsing ``full_data`` only for rows not yet backfilled"""
+    scores = observation.get('report_scores')
+    if isinstance(scores, str):
+        try:
+            scores = json.loads(scores)
+        except ValueError:
+            scores = None
+    if scores and scores.get('v') == SCORES_VERSION:
+        return scores
+    return scores_from_full_data(observation.get('full_data'))
@@ -0,0 +1,184 @@
+"""
+Leader election for APScheduler jobs.
+
+Every gunicorn worker builds the app and its scheduler, but only the leader
+runs jobs; the others keep their scheduler paused. With the 'file' backend the
+leader is whichever worker on the host holds an exclusive lock on
+SCHEDULER_LOCK_PATH. The OS drops the lock when that process exits, so another
+worker takes over at its next renewal tick. The 'database' backend uses a
+renewable lease row (migrations/007) for one leader across hosts.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'apscheduler'
+
+
+class SchedulerLeader:
+    def __init__(self, backend=None, lock_path=None, lease_seconds=None, renew_seconds=None):
+        self.backend = backend or Config.SCHEDULER_LEADER_BACKEND
+        self.lock_path = lock_path or Config.SCHEDULER_LOCK_PATH
+        self.lease_seconds = lease_seconds or Config.SCHEDULER_LEASE_SECONDS
+        self.renew_seconds = renew_seconds or Config.SCHEDULER_LEASE_RENEW_SECONDS
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.leader = None
+        self.elected_at = None
+        self._lock_file = None
+        self._scheduler = None
+        self._on_elected = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, scheduler, on_elected=None):
+        """Start ``scheduler`` paused and resume it whenever this worker is leader.
+
+        ``on_elected`` callbacks run each time leadership is gained.
+        """
+        self._scheduler = scheduler
+        if on_elected:
+            self._on_elected.append(on_elected)
+
+        if self.backend == 'none':
+            scheduler.start()
+            self._become_leader({'holder': self.identity})
+            return
+
+        scheduler.start(paused=True)
+        self.renew()
+        self._thread = threading.Thread(target=self._run, name='scheduler-leader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            self._release()
+            self._step_down()
+
+    def _run(self):
+        while not self._stop.wait(self.renew_seconds):
+            self.renew()
+
+    def renew(self):
+        """Acquire or renew leadership and pause/resume the scheduler to match"""
+        try:
+            holder = self._acquire_database() if self.backend == 'database' else self._acquire_file()
+        except Exception as e:
+            logger.error(f"Scheduler leader election failed: {e}")
+            holder = None
+
+        if holder and holder.get('holder') == self.identity:
+            if not self.is_leader:
+                self._become_leader(holder)
+            self.leader = holder
+        else:
+            self.leader = holder
+            if self.is_leader:
+                self._step_down()
+
+    def _become_leader(self, holder):
+        self.is_leader = True
+        self.leader = holder
+        self.elected_at = datetime.now().isoformat()
+        logger.info(f"Worker {self.identity} is now the scheduler leader")
+        if self.backend != 'none':
+            self._scheduler.resume()
+        for callback in self._on_elected:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Scheduler leader callback failed: {e}")
+
+    def _step_down(self):
+        self.is_leader = False
+        self.elected_at = None
+        logger.warning(f"Worker {self.identity} lost scheduler leadership; pausing jobs")
+        self._scheduler.pause()
+
+    def _acquire_file(self):
+        if fcntl is None:
+            logger.warning("File locks unavailable on this platform; every worker runs scheduled jobs")
+            return {'holder': self.identity, 'backend': 'file'}
+
+        if self._lock_file is None:
+            directory = os.path.dirname(self.lock_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lock_file = open(self.lock_path, 'a+')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return self._read_lock_holder()
+            self._lock_file = lock_file
+            self._write_lock_holder(acquired_at=datetime.now().isoformat())
+        else:
+            self._write_lock_holder()
+        return self._read_lock_holder()
+
+    def _write_lock_holder(self, acquired_at=None):
+        previous = self._read_lock_holder() or {}
+        holder = {
+            'holder': self.identity,
+            'acquired_at': acquired_at or previous.get('acquired_at'),
+            'renewed_at': datetime.now().isoformat(),
+        }
+        self._lock_file.seek(0)
+        self._lock_file.truncate()
+        self._lock_file.write(json.dumps(holder))
+        self._lock_file.flush()
+
+    def _read_lock_holder(self):
+        try:
+            with open(self.lock_path) as f:
+                return json.loads(f.read() or 'null')
+        except (OSError, ValueError):
+            return None
+
+    def _acquire_database(self):
+        from models.database import get_supabase_client
+        rows = get_supabase_client().rpc('acquire_scheduler_lease', {
+            'p_name': LEASE_NAME,
+            'p_holder': self.identity,
+            'p_lease_seconds': self.lease_seconds,
+        }).execute().data or []
+        return rows[0] if rows else None
+
+    def _release(self):
+        try:
+            if self.backend == 'database':
+                from models.database import get_supabase_client
+                get_supabase_client().rpc('release_scheduler_lease', {
+                    'p_name': LEASE_NAME, 'p_holder': self.identity
+                }).execute()
+            elif self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+        except Exception as e:
+            logger.warning(f"Could not release scheduler leadership: {e}")
+
+    def status(self):
+        return {
+            'backend': self.backend,
+            'worker': self.identity,
+            'is_leader': self.is_leader,
+            'elected_at': self.elected_at,
+            'leader': self.leader,
+        }
+
+
+# Process-wide election used by create_app
+scheduler_leader = SchedulerLeader()
@@ -0,0 +1,88 @@
+"""
+Process-local cache of signed storage URLs for audio playback.
+
+Every audio row used to cost one storage API call for a fresh one-hour URL.
+``SignedUrlCache.get_many`` now looks up a whole page of paths at once, signs
+only the misses in batched ``create_signed_urls`` calls, and reuses each URL
+until SIGNED_URL_REFRESH_MARGIN_SECONDS before it expires, so a player never
+gets a URL that is about to stop working. Hit, miss and call counters are
+reported by /health.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+class SignedUrlCache:
+    def __init__(self, expires_in=None, refresh_margin=None, max_entries=None, batch_size=None):
+        self.expires_in = expires_in or Config.SIGNED_URL_EXPIRES_SECONDS
+        self.refresh_margin = Config.SIGNED_URL_REFRESH_MARGIN_SECONDS if refresh_margin is None else refresh_margin
+        self.max_entries = max_entries or Config.SIGNED_URL_CACHE_MAX_ENTRIES
+        self.batch_size = batch_size or Config.SIGNED_URL_BATCH_SIZE
+        self._entries = OrderedDict()  # (bucket, path) -> (reuse_until, url)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sign_calls = 0
+
+    def get_many(self, bucket_name, paths, signer):
+        """Signed URLs for ``paths`` as ``{path: url}``.
+
+        Misses are passed to ``signer(bucket_name, paths, expires_in)`` in
+        chunks of ``batch_size``; it returns ``{path: url}`` for the paths it
+        could sign. Paths that could not be signed are left out.
+        """
+        now = time.monotonic()
+        urls = {}
+        missing = []
+        with self._lock:
+            for path in dict.fromkeys(p for p in paths if p):
+                entry = self._entries.get((bucket_name, path))
+                if entry and entry[0] > now:
+                    self._entries.move_to_end((bucket_name, path))
+                    urls[path] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(path)
+                    self.misses += 1
+
+        for start in range(0, len(missing), self.batch_size):
+            chunk = missing[start:start + self.batch_size]
+            signed_at = time.monotonic()
+            signed = signer(bucket_name, chunk, self.expires_in)
+            reuse_until = signed_at + self.expires_in - self.refresh_margin
+            with self._lock:
+                self.sign_calls += 1
+                for path, url in signed.items():
+                    urls[path] = url
+                    if reuse_until > signed_at:
+                        self._entries[(bucket_name, path)] = (reuse_until, url)
+                        self._entries.move_to_end((bucket_name, path))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return urls
+
+    def invalidate(self, bucket_name, *paths):
+        with self._lock:
+            for path in paths:
+                self._entries.pop((bucket_name, path), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'expires_in': self.expires_in,
+                'refresh_margin': self.refresh_margin,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'sign_calls': self.sign_calls,
+            }
+
+
+# Process-wide cache used by get_signed_audio_url(s) in models.database
+signed_url_cache = SignedUrlCache()
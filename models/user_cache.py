@@ -0,0 +1,96 @@
+"""
+Process-local identity cache for Flask-Login's ``user_loader``.
+
+Every authenticated request used to load its ``User`` from Supabase even
+though the role decorators only read ``session``. Loaded users are now kept
+in a small LRU for USER_CACHE_TTL_SECONDS. Routes that update or delete
+``users`` rows call ``invalidate_user`` (or ``invalidate_all_users`` for bulk
+changes); other workers pick such changes up when their entry expires. Hit and
+miss counters are reported by /health.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+class UserCache:
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self.max_entries = max_entries or Config.USER_CACHE_MAX_ENTRIES
+        self.ttl_seconds = Config.USER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries = OrderedDict()  # user_id -> (expires_at, user)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so a load that raced with one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, user_id, loader):
+        """Cached user for ``user_id``, calling ``loader(user_id)`` on a miss.
+
+        Users that cannot be loaded (None) are not cached.
+        """
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        user = loader(user_id)
+        if user is None or self.ttl_seconds <= 0:
+            return user
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, user)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                if user_id is not None and self._entries.pop(str(user_id), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'invalidations': self.invalidations,
+            }
+
+
+# Process-wide cache used by the user_loader in create_app
+user_cache = UserCache()
+
+
+def invalidate_user(*user_ids):
+    """Drop cached identities after their ``users`` rows changed"""
+    user_cache.invalidate(*user_ids)
+
+
+def invalidate_all_users():
+    """Drop every cached identity, e.g. after a bulk update of ``users``"""
+    user_cache.clear()
@@ -4,22 +4,34 @@ from models.database import (
     save_observation, get_observer_children, upload_file_to_storage, get_signed_audio_url,
     # Multi-tenant functions
     get_organizations, create_organization, get_pending_observer_applications,
-    review_observer_application, get_users_by_organization, get_organization_by_id,
+    review_observer_application, get_organization_by_id,
     auto_assign_parent_to_organization, get_children_by_organization,
-    get_observer_child_mappings_by_organization
+    get_observer_child_mappings_by_organization, count_rows_grouped,
+    get_organization_rollups, get_organization_daily_observations, rebuild_organization_rollups
 )
 from models.observation_extractor import ObservationExtractor
+from models.generation_cache import invalidate_child as invalidate_child_generations
+from models.generation_cache import invalidate_observer as invalidate_observer_generations
+from models.report_scores import scores_from_report_data
+from models.report_renderer import render_text
+from models.user_cache import invalidate_user, invalidate_all_users
+from models.email_outbox import email_outbox
+from models.lazy_imports import lazy_import
 from utils.decorators import admin_required
-import pandas as pd
+from config import Config
 import uuid
 import json
 from datetime import datetime
 import io
 import re
+import textwrap
 import urllib.parse
 import logging
 import os
 
+# pandas is only needed for exports and analytics
+pd = lazy_import('pandas')
+
 # Set up logging to replace print statements
 logger = logging.getLogger(__name__)
 
@@ -45,67 +57,18 @@ def dashboard():
         pending_observer_apps = supabase.table('observer_applications').select("id", count="exact").eq('status', 'pending').execute()
         pending_principal_apps = supabase.table('principal_applications').select("id", count="exact").eq('status', 'pending').execute()
 
-        # Get all reports with detailed information including file URLs
-        all_reports_response = supabase.table('observations').select("""
-            id, student_name, observer_name, date, timestamp, filename, 
-            file_url, full_data, processed_by_admin, username, student_id
-        """).order('timestamp', desc=True).execute()
-
-        all_reports = all_reports_response.data if all_reports_response.data else []
-
-        # Process reports to extract formatted reports and file info
-        processed_reports = []
-        for report in all_reports:
-            processed_report = {
-                'id': report.get('id'),
-                'student_name': report.get('student_name', 'N/A'),
-                'observer_name': report.get('observer_name', 'N/A'),
-                'date': report.get('date', 'N/A'),
-                'timestamp': report.get('timestamp', 'N/A'),
-                'filename': report.get('filename', 'N/A'),
-                'file_url': report.get('file_url'),
-                'processed_by_admin': report.get('processed_by_admin', False),
-                'has_formatted_report': False,
-                'formatted_report': None,
-                'file_type': None,
-                'signed_url': None,
-                'organization_name': 'N/A'
-            }
-
-            # URL encode the file_url to handle spaces and special characters
-            if processed_report['file_url']:
-                processed_report['file_url'] = urllib.parse.quote(processed_report['file_url'],
-                                                                  safe=':/?#[]@!$&\'()*+,;=')
-
-                # Determine file type from URL or filename
-                file_url_lower = processed_report['file_url'].lower()
-                if any(ext in file_url_lower for ext in ['.mp3', '.wav', '.m4a', '.ogg']):
-                    processed_report['file_type'] = 'audio'
-                    filename = processed_report['file_url'].split('/')[-1]
-                    signed_url = get_signed_audio_url(filename)
-                    if signed_url:
-                        processed_report['signed_url'] = signed_url
-                elif any(ext in file_url_lower for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']):
-                    processed_report['file_type'] = 'image'
-
-            # Extract formatted report from full_data
-            if report.get('full_data'):
-                try:
-                    full_data = json.loads(report['full_data'])
-                    if full_data.get('formatted_report'):
-                        processed_report['has_formatted_report'] = True
-                        processed_report['formatted_report'] = "Report Available"
-                except:
-                    pass
-
-            processed_reports.append(processed_report)
+        # One page of reports (keyset pagination) plus server-side counts
+        try:
+            before_ts, before_id = _parse_dashboard_cursor(request.args)
+        except ValueError:
+            return 'Invalid page cursor', 400
+        page = _fetch_dashboard_reports(supabase, before_ts, before_id)
+        processed_reports = page['reports']
+        counts = _dashboard_report_counts(supabase)
 
         # Get recent activity (last 10 observations)
         recent_observations = processed_reports[:10]
 
-        # Get system status data
-        total_storage_files = len([r for r in processed_reports if r['file_url']])
-
         # Get organizations for dropdown
         organizations = get_organizations()
 
@@ -115,13 +78,16 @@ def dashboard():
             'parents_count': parents_response.count if parents_response.count else 0,
             'principals_count': principals_response.count if principals_response.count else 0,
             'children_count': children_response.count if children_response.count else 0,
-            'observations_count': len(all_reports),
+            'observations_count': counts['observations'],
             'organizations_count': organizations_response.count if organizations_response.count else 0,
             'pending_observer_applications': pending_observer_apps.count if pending_observer_apps.count else 0,
             'pending_principal_applications': pending_principal_apps.count if pending_principal_apps.count else 0,
-            'storage_files': total_storage_files,
+            'storage_files': counts['with_media'],
+            'audio_files': counts['audio'],
             'recent_observations': recent_observations,
             'all_reports': processed_reports,
+            'next_cursor': page['next_cursor'],
+            'is_first_page': not request.args.get('before_ts'),
             'organizations': organizations
         }
 
@@ -139,13 +105,143 @@ def dashboard():
             'total_users': 0, 'observers_count': 0, 'parents_count': 0, 'principals_count': 0,
             'children_count': 0, 'observations_count': 0, 'organizations_count': 0,
             'pending_observer_applications': 0, 'pending_principal_applications': 0, 'storage_files': 0,
-            'recent_observations': [], 'all_reports': [], 'organizations': []
+            'audio_files': 0, 'recent_observations': [], 'all_reports': [], 'next_cursor': None,
+            'is_first_page': True, 'organizations': []
         }
         stats = {'pending_observer': 0, 'pending_principal': 0}
 
     return render_template('admin/dashboard.html', analytics=analytics, stats=stats)
 
 
+# Dashboard report rows: everything the table shows, but not the large full_data blob
+# (has_formatted_report comes from migrations/001, which is required)
+DASHBOARD_REPORT_COLUMNS = (
+    "id, student_name, observer_name, date, timestamp, filename, "
+    "file_url, processed_by_admin, username, student_id, has_formatted_report"
+)
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.ogg')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+
+# Cursor timestamps as PostgREST returns them, e.g. 2025-05-01T10:00:00.123456+00:00
+CURSOR_TIMESTAMP_PATTERN = re.compile(
+    r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}(:?\d{2})?)?$'
+)
+
+
+def _parse_dashboard_cursor(args):
+    """Validated ``(before_ts, before_id)`` from the query string, or ``(None, None)`` for the first page.
+
+    The values end up inside a PostgREST ``or`` filter, so anything that is not
+    an ISO timestamp and a UUID raises ValueError.
+    """
+    before_ts, before_id = args.get('before_ts'), args.get('before_id')
+    if not before_ts and not before_id:
+        return None, None
+    if not before_ts or not before_id or not CURSOR_TIMESTAMP_PATTERN.fullmatch(before_ts):
+        raise ValueError('Invalid dashboard cursor')
+    return before_ts, str(uuid.UUID(before_id))
+
+
+def _fetch_dashboard_reports(supabase, before_ts=None, before_id=None, page_size=None):
+    """One page of reports ordered by (timestamp, id) descending, after the given cursor.
+
+    Returns ``{'reports': [...], 'next_cursor': {'before_ts', 'before_id'} or None}``.
+    The cursor must come from ``_parse_dashboard_cursor``.
+    Signed media URLs are not created here; the table requests them per row
+    through ``admin.report_media_url``.
+    """
+    page_size = page_size or Config.ADMIN_DASHBOARD_PAGE_SIZE
+
+    def page_query(columns):
+        query = supabase.table('observations').select(columns) \
+            .order('timestamp', desc=True).order('id', desc=True)
+        if before_ts and before_id:
+            query = query.or_(
+                f'timestamp.lt."{before_ts}",and(timestamp.eq."{before_ts}",id.lt."{before_id}")'
+            )
+        return query.limit(page_size + 1).execute().data or []
+
+    rows = page_query(DASHBOARD_REPORT_COLUMNS)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    reports = []
+    for report in rows:
+        processed_report = {
+            'id': report.get('id'),
+            'student_name': report.get('student_name', 'N/A'),
+            'observer_name': report.get('observer_name', 'N/A'),
+            'date': report.get('date', 'N/A'),
+            'timestamp': report.get('timestamp', 'N/A'),
+            'filename': report.get('filename', 'N/A'),
+            'file_url': report.get('file_url'),
+            'processed_by_admin': report.get('processed_by_admin', False),
+            'has_formatted_report': bool(report.get('has_formatted_report')),
+            'formatted_report': "Report Available" if report.get('has_formatted_report') else None,
+            'file_type': None,
+            'signed_url': None,
+            'organization_name': 'N/A'
+        }
+
+        # URL encode the file_url to handle spaces and special characters
+        if processed_report['file_url']:
+            processed_report['file_url'] = urllib.parse.quote(processed_report['file_url'],
+                                                              safe=':/?#[]@!$&\'()*+,;=')
+
+            # Determine file type from URL or filename
+            file_url_lower = processed_report['file_url'].lower()
+            if any(ext in file_url_lower for ext in AUDIO_EXTENSIONS):
+                processed_report['file_type'] = 'audio'
+            elif any(ext in file_url_lower for ext in IMAGE_EXTENSIONS):
+                processed_report['file_type'] = 'image'
+
+        reports.append(processed_report)
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = {'before_ts': rows[-1].get('timestamp'), 'before_id': rows[-1].get('id')}
+
+    return {'reports': reports, 'next_cursor': next_cursor}
+
+
+def _dashboard_report_counts(supabase):
+    """Report totals computed by the database (count=exact) instead of by loading every row"""
+    counts = {'observations': 0, 'with_media': 0, 'audio': 0}
+    try:
+        counts['observations'] = supabase.table('observations').select("id", count="exact") \
+            .limit(1).execute().count or 0
+        counts['with_media'] = supabase.table('observations').select("id", count="exact") \
+            .not_.is_('file_url', 'null').limit(1).execute().count or 0
+        audio_filter = ','.join(f'file_url.ilike.*{ext}*' for ext in AUDIO_EXTENSIONS)
+        counts['audio'] = supabase.table('observations').select("id", count="exact") \
+            .or_(audio_filter).limit(1).execute().count or 0
+    except Exception as e:
+        logger.error(f"Error counting dashboard reports: {e}")
+    return counts
+
+
+@admin_bp.route('/report_media_url/<report_id>')
+@admin_required
+def report_media_url(report_id):
+    """Signed URL for a report's audio file, requested when the admin opens it from the dashboard"""
+    try:
+        supabase = get_supabase_client()
+        report = supabase.table('observations').select("file_url").eq('id', report_id).execute().data
+        if not report or not report[0].get('file_url'):
+            return jsonify({'success': False, 'error': 'Report has no file'}), 404
+
+        file_url = urllib.parse.quote(report[0]['file_url'], safe=':/?#[]@!$&\'()*+,;=')
+        signed_url = None
+        if any(ext in file_url.lower() for ext in AUDIO_EXTENSIONS):
+            signed_url = get_signed_audio_url(file_url.split('/')[-1])
+
+        return jsonify({'success': True, 'url': signed_url or file_url, 'signed': bool(signed_url)})
+    except Exception as e:
+        logger.error(f"Error creating media URL for report {report_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @admin_bp.route('/view_report/<report_id>')
 @admin_required
 def view_report(report_id):
@@ -245,7 +341,8 @@ def download_report(report_id):
         if report.get('full_data'):
             try:
                 full_data = json.loads(report['full_data'])
-                formatted_report = full_data.get('formatted_report')
+                # Structured reports render straight from their fields
+                formatted_report = full_data.get('report_data') or full_data.get('formatted_report')
             except:
                 pass
 
@@ -509,6 +606,7 @@ def add_mapping():
 
         try:
             supabase.table('users').update({'child_id': child_id}).eq('id', parent_id).execute()
+            invalidate_user(parent_id)
             flash('Parent-Child mapping added successfully!', 'success')
         except Exception as e:
             flash(f'Error adding mapping: {str(e)}', 'error')
@@ -568,6 +666,7 @@ def bulk_upload_mappings():
 
                 if parent_id and child_id:
                     supabase.table('users').update({'child_id': child_id}).eq('id', parent_id).execute()
+                    invalidate_user(parent_id)
                     success_count += 1
 
             flash(f'Successfully mapped {success_count} parent-child relationships!', 'success')
@@ -651,7 +750,8 @@ def process_observation():
             )
 
             # Generate formatted report
-            report = extractor.generate_report_from_text(observations_text, user_info)
+            report_data = extractor.generate_report_data(observations_text, user_info)
+            report = render_text(report_data)
 
             # Save observation - store formatted report in full_data
             observation_data = {
@@ -670,8 +770,11 @@ def process_observation():
                 "filename": file.filename,
                 "full_data": json.dumps({
                     **structured_data,
+                    "report_data": report_data,
                     "formatted_report": report
                 }),
+                "has_formatted_report": bool(report),
+                "report_scores": scores_from_report_data(report_data),
                 "theme_of_day": structured_data.get("themeOfDay", ""),
                 "curiosity_seed": structured_data.get("curiositySeed", ""),
                 "processed_by_admin": True,
@@ -698,6 +801,8 @@ def process_observation():
             # Save to database
             supabase.table('observations').insert(observation_data).execute()
             supabase.table('processed_observations').insert(processed_data).execute()
+            invalidate_child_generations(child_id)
+            invalidate_observer_generations(observer_id)
 
             flash('OCR observation processed and saved successfully!', 'success')
 
@@ -720,7 +825,8 @@ def process_observation():
             )
 
             # Generate formatted report from transcript
-            report = extractor.generate_report_from_text(transcript, user_info)
+            report_data = extractor.generate_report_data(transcript, user_info)
+            report = render_text(report_data)
 
             # Save observation - store formatted report in full_data
             observation_data = {
@@ -740,8 +846,11 @@ def process_observation():
                 "full_data": json.dumps({
                     "transcript": transcript,
                     "report": report,
+                    "report_data": report_data,
                     "formatted_report": report
                 }),
+                "has_formatted_report": bool(report),
+                "report_scores": scores_from_report_data(report_data),
                 "theme_of_day": "",
                 "curiosity_seed": "",
                 "processed_by_admin": True,
@@ -768,6 +877,8 @@ def process_observation():
             # Save to database
             supabase.table('observations').insert(observation_data).execute()
             supabase.table('processed_observations').insert(processed_data).execute()
+            invalidate_child_generations(child_id)
+            invalidate_observer_generations(observer_id)
 
             flash('Audio observation processed and saved successfully!', 'success')
 
@@ -805,7 +916,8 @@ def download_admin_report():
         if report.get('full_data'):
             try:
                 full_data = json.loads(report['full_data'])
-                formatted_report = full_data.get('formatted_report')
+                # Structured reports render straight from their fields
+                formatted_report = full_data.get('report_data') or full_data.get('formatted_report')
             except:
                 pass
 
@@ -864,7 +976,8 @@ def download_admin_pdf():
         if report.get('full_data'):
             try:
                 full_data = json.loads(report['full_data'])
-                formatted_report = full_data.get('formatted_report')
+                # Structured reports render straight from their fields
+                formatted_report = full_data.get('report_data') or full_data.get('formatted_report')
             except:
                 pass
 
@@ -958,6 +1071,7 @@ def delete_user(user_id):
     try:
         supabase = get_supabase_client()
         supabase.table('users').delete().eq('id', user_id).execute()
+        invalidate_user(user_id)
         flash('User deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting user: {str(e)}', 'error')
@@ -1236,10 +1350,11 @@ def send_observer_decision_notification(app_data, organization_id, org_name, app
             You may reapply in the future if circumstances change.
             """
             logger.info(f"Observer application rejected for {app_data['applicant_email']} - reason: {rejection_reason}")
-            
-        # TODO: Implement actual email sending here
-        # send_email(app_data['applicant_email'], subject, message)
-        
+
+        subject = 'Your observer application has been ' + ('approved' if approved else 'rejected')
+        email_outbox.enqueue(app_data['applicant_email'], subject, textwrap.dedent(message).strip(),
+                             kind='application_decision')
+
     except Exception as e:
         logger.error(f"Error sending observer decision notification: {e}")
 
@@ -1257,6 +1372,7 @@ def assign_observer_organization():
         supabase.table('users').update({
             'organization_id': organization_id
         }).eq('id', observer_id).execute()
+        invalidate_user(observer_id)
 
         flash('Observer assigned to organization successfully!', 'success')
     except Exception as e:
@@ -1271,23 +1387,23 @@ def global_analytics():
     """Global analytics across all organizations"""
     try:
         organizations = get_organizations()
-        supabase = get_supabase_client()
+        org_ids = [org['id'] for org in organizations]
+        rollups = get_organization_rollups(org_ids)
+        daily = get_organization_daily_observations(org_ids, days=7)
 
         analytics_data = []
         for org in organizations:
-            try:
-                org_data = {
-                    'organization': org,
-                    'observers': len(get_users_by_organization(org['id'], 'Observer')),
-                    'parents': len(get_users_by_organization(org['id'], 'Parent')),
-                    'principals': len(get_users_by_organization(org['id'], 'Principal')),
-                    'children': len(
-                        supabase.table('children').select('id').eq('organization_id', org['id']).execute().data),
-                    'observations': 0  # Simplified for now due to complex join
-                }
-                analytics_data.append(org_data)
-            except Exception as e:
-                logger.warning(f"Error getting analytics for organization {org.get('name', 'Unknown')}: {e}")
+            rollup = rollups[org['id']]
+            analytics_data.append({
+                'organization': org,
+                'observers': rollup['observers'],
+                'parents': rollup['parents'],
+                'principals': rollup['principals'],
+                'children': rollup['children'],
+                'observations': rollup['observations'],
+                'observations_last_7_days': sum(daily.get(org['id'], {}).values()),
+                'ai_reviews_pending': rollup['ai_reviews_pending']
+            })
 
         return render_template('admin/global_analytics.html', analytics_data=analytics_data)
     except Exception as e:
@@ -1295,6 +1411,18 @@ def global_analytics():
         return render_template('admin/global_analytics.html', analytics_data=[])
 
 
+@admin_bp.route('/rebuild_organization_rollups', methods=['POST'])
+@admin_required
+def rebuild_organization_rollups_route():
+    """Recompute the per-organization counters from the base tables"""
+    try:
+        rebuild_organization_rollups(request.form.get('organization_id') or None)
+        flash('Organization analytics rebuilt', 'success')
+    except Exception as e:
+        flash(f'Error rebuilding organization analytics: {str(e)}', 'error')
+    return redirect(url_for('admin.global_analytics'))
+
+
 @admin_bp.route('/analytics')
 @admin_required
 def analytics():
@@ -1382,6 +1510,7 @@ def fix_organization_assignments():
             supabase.table('users').update({
                 'organization_id': default_org_id
             }).eq('id', user['id']).execute()
+        invalidate_all_users()
 
         # Update children without organization_id
         unassigned_children = supabase.table('children').select('*').is_('organization_id', 'null').execute().data
@@ -1614,6 +1743,7 @@ def assign_user_organization():
         result = supabase.table('users').update({
             'organization_id': organization_id
         }).eq('id', user_id).execute()
+        invalidate_user(user_id)
 
         if result.data:
             logger.info(f"Successfully assigned user {user_id} to organization {organization_id}")
@@ -1697,6 +1827,7 @@ def create_parent_child_mapping():
         result = supabase.table('users').update({
             'child_id': child_id
         }).eq('id', parent_id).execute()
+        invalidate_user(parent_id)
 
         if result.data:
             # Log the mapping creation
@@ -1919,7 +2050,10 @@ def send_principal_decision_notification(app_data, organization_id, org_name, ap
             You may reapply in the future if circumstances change.
             """
             logger.info(f"Principal application rejected for {app_data['email']} - reason: {rejection_reason}")
-        # TODO: Implement actual email sending here
+
+        subject = 'Your principal application has been ' + ('approved' if approved else 'rejected')
+        email_outbox.enqueue(app_data['email'], subject, textwrap.dedent(message).strip(),
+                             kind='application_decision')
     except Exception as e:
         logger.error(f"Error sending principal decision notification: {e}")
 
@@ -1944,16 +2078,18 @@ def observer_report_counts():
         supabase = get_supabase_client()
         # Get all observers
         observers = supabase.table('users').select('id, name, email').eq('role', 'Observer').execute().data
-        # Count processed reports for each observer
+        # Processed report counts for every observer in one grouped query
+        counts = count_rows_grouped('observations', 'username', split_by='processed_by_admin', client=supabase)
         data = []
         for obs in observers:
-            processed_reports = supabase.table('observations').select('id').eq('username', obs['id']).eq('processed_by_admin', False).execute().data
-            admin_processed = supabase.table('observations').select('id').eq('username', obs['id']).eq('processed_by_admin', True).execute().data
+            by_processor = counts.get(obs['id'], {})
+            count_observer = by_processor.get('false', 0)
+            count_admin = by_processor.get('true', 0)
             data.append({
                 'observer': obs,
-                'count_observer': len(processed_reports),
-                'count_admin': len(admin_processed),
-                'total': len(processed_reports) + len(admin_processed)
+                'count_observer': count_observer,
+                'count_admin': count_admin,
+                'total': count_observer + count_admin
             })
         return render_template('admin/observer_report_counts.html', data=data)
     except Exception as e:
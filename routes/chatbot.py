@@ -1,31 +1,34 @@
 from flask import Blueprint, request, jsonify
-import google.generativeai as genai
 import os
 import logging
 from config import Config
+from models.generation_cache import generate_cached
+from models.lazy_imports import genai
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini AI using the same pattern as observation_extractor.py
-try:
-    # Use the same API key configuration as observation_extractor.py
-    gemini_api_key = Config.GOOGLE_API_KEY
-    if not gemini_api_key:
-        # Fallback to environment variable
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-    
-    if gemini_api_key:
+# Use the same API key configuration as observation_extractor.py
+gemini_api_key = Config.GOOGLE_API_KEY
+if not gemini_api_key:
+    # Fallback to environment variable
+    gemini_api_key = os.getenv('GEMINI_API_KEY')
+
+gemini_available = bool(gemini_api_key)
+if not gemini_available:
+    logger.error("❌ Gemini API key not configured")
+
+_model = None
+
+
+def get_model():
+    """Gemini model, created on the first chatbot request so google.generativeai is not imported at boot"""
+    global _model
+    if _model is None:
         genai.configure(api_key=gemini_api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        gemini_available = True
+        _model = genai.GenerativeModel('gemini-2.0-flash')
         logger.info("✅ Gemini AI initialized successfully")
-    else:
-        gemini_available = False
-        logger.error("❌ Gemini API key not configured")
-except Exception as e:
-    gemini_available = False
-    logger.error(f"❌ Failed to initialize Gemini AI: {e}")
+    return _model
 
 # Create blueprint
 chatbot_bp = Blueprint('chatbot', __name__)
@@ -152,12 +155,10 @@ def chatbot_response():
         # Create the full prompt with context
         full_prompt = f"{SANJAYA_PROMPT}\n\nUser Question: {user_message}\n\nPlease provide a helpful, accurate response based on the information above. Keep your response conversational and informative, staying within the scope of the Sanjaya application."
 
-        # Generate response using Gemini (same pattern as observation_extractor.py)
-        response = model.generate_content([
-            {"role": "user", "parts": [{"text": full_prompt}]}
-        ])
-        
-        if not response or not response.text:
+        # Generate response using Gemini; repeated questions are answered from the cache
+        response_text = generate_cached('chatbot', get_model(), full_prompt)
+
+        if not response_text:
             return jsonify({
                 'error': 'Failed to generate response',
                 'response': 'I apologize, but I couldn\'t generate a response right now. Please try rephrasing your question or contact our support team.'
@@ -167,7 +168,7 @@ def chatbot_response():
         logger.info(f"Chatbot response generated successfully")
 
         return jsonify({
-            'response': response.text.strip(),
+            'response': response_text.strip(),
             'status': 'success'
         })
 
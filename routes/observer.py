@@ -3,23 +3,38 @@ from flask_login import login_required, current_user
 from models.database import (
     get_supabase_client, get_observer_children, save_observation,
     get_observations_by_child, save_goal, get_goals_by_child,
-    get_messages_between_users, save_message, save_processed_data, upload_file_to_storage,
+    get_messages_between_users, save_message, save_processed_data,
     get_scheduled_reports_for_observer, get_next_scheduled_time_for_child,
     check_if_report_processed_today, save_scheduled_report, log_report_processing,
-    get_child_schedule_status, get_signed_audio_url,
+    get_child_schedule_status, get_signed_audio_url, get_signed_audio_urls,
     # Multi-tenant functions
     get_observer_review_assignments, submit_observer_application, get_organizations,
     # Suggestion functions
-    get_observer_suggestion_data, get_child_learning_history
+    get_observer_suggestion_data, get_child_learning_history,
+    # Batched lookups
+    get_parents_by_child_ids, get_observer_feedback_threads, get_principal_feedback_with_names,
+    get_peer_review_candidates, get_active_peer_review_claims, claim_peer_reviews, refill_peer_review_queue,
+    complete_peer_review_claim, release_peer_review_claims, select_in
 )
-from models.observation_extractor import ObservationExtractor
+from models.observation_extractor import ObservationExtractor, TranscriptPending
 from models.monthly_report_generator import MonthlyReportGenerator
+from models.job_queue import job_queue, JobFailed, JobSuspended
+from models.observation_pipeline import ObservationPipeline
+from models.generation_cache import invalidate_child as invalidate_child_generations
+from models.generation_cache import invalidate_observer as invalidate_observer_generations
+from models.report_scores import scores_from_report_data
+from models.report_renderer import render_text
 from utils.decorators import observer_required
+from werkzeug.datastructures import FileStorage
+from config import Config
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import uuid
 import io
+import os
 import re
+import shutil
+import time
 import urllib.parse
 import logging
 
@@ -27,6 +42,16 @@ logger = logging.getLogger(__name__)
 
 observer_bp = Blueprint('observer', __name__)
 
+OBSERVATION_JOB = 'observation_processing'
+# Rows written by an observation job get ids derived from the job id, so a job
+# that is re-run after a crash or a lost lease finds its earlier writes instead
+# of duplicating them
+JOB_ROW_NAMESPACE = uuid.UUID('6f0d6d2e-3c4b-4f55-9a55-2b1f4c8e7a10')
+
+
+def _job_row_id(job_id, kind):
+    return str(uuid.uuid5(JOB_ROW_NAMESPACE, f"{job_id}:{kind}"))
+
 
 @observer_bp.route('/dashboard')
 @login_required
@@ -167,6 +192,7 @@ def process_observation():
 @login_required
 @observer_required
 def process_file():
+    """Validate the upload, spool it to disk and queue it for background processing"""
     observer_id = session.get('user_id')
     child_id = request.form.get('child_id')
     processing_mode = request.form.get('processing_mode')
@@ -184,436 +210,541 @@ def process_file():
         'child_id': child_id
     }
 
-    extractor = ObservationExtractor()
-
     try:
-        if processing_mode == 'ocr':
-            if 'file' not in request.files:
+        if processing_mode not in ('ocr', 'audio'):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid processing mode'
+            })
+
+        if 'file' not in request.files:
+            return jsonify({
+                'success': False,
+                'error': 'No file uploaded'
+            })
+
+        file = request.files['file']
+
+        if processing_mode == 'audio':
+            # Validate audio file
+            if not file.filename.lower().endswith(('.mp3', '.wav', '.m4a', '.ogg', '.flac')):
                 return jsonify({
                     'success': False,
-                    'error': 'No file uploaded'
+                    'error': 'Invalid audio format. Please upload MP3, WAV, M4A, OGG, or FLAC files.'
                 })
 
-            file = request.files['file']
+        # Spool the upload to disk so the worker can read it after this request ends
+        job_id = job_queue.new_job_id()
+        file_path = job_queue.spool_upload(file, job_id)
+        file_size = os.path.getsize(file_path)
 
-            # Extract text and process
-            extracted_text = extractor.extract_text_with_ocr(file)
-            structured_data = extractor.process_with_groq(extracted_text)
-            observations_text = structured_data.get("observations", "")
+        if processing_mode == 'audio' and file_size > 25 * 1024 * 1024:  # 25MB limit
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+            return jsonify({
+                'success': False,
+                'error': 'Audio file too large. Please upload files smaller than 25MB.'
+            })
 
-            # Upload file to storage (handle error gracefully)
-            file.seek(0)
-            try:
-                file_url = upload_file_to_storage(
-                    file.read(),
-                    file.filename,
-                    f"image/{file.content_type.split('/')[1]}"
-                )
-            except Exception as upload_error:
-                print(f"Error uploading file: {upload_error}")
-                file_url = None
-
-            # Generate formatted report
-            report = extractor.generate_report_from_text(observations_text, user_info)
-
-            # Save observation
-            observation_id = str(uuid.uuid4())
-            observation_data = {
-                "id": observation_id,
-                "student_id": child_id,
-                "username": observer_id,
-                "student_name": structured_data.get("studentName", student_name),
-                "observer_name": session.get('name'),
-                "class_name": structured_data.get("className", ""),
-                "date": structured_data.get("date", session_date),
-                "observations": observations_text,
-                "strengths": json.dumps(structured_data.get("strengths", [])),
-                "areas_of_development": json.dumps(structured_data.get("areasOfDevelopment", [])),
-                "recommendations": json.dumps(structured_data.get("recommendations", [])),
-                "timestamp": datetime.now().isoformat(),
-                "filename": file.filename,
-                "full_data": json.dumps({
-                    **structured_data,
-                    "formatted_report": report
-                }),
-                "theme_of_day": structured_data.get("themeOfDay", ""),
-                "curiosity_seed": structured_data.get("curiositySeed", ""),
-                "file_url": file_url,
-                # Initialize peer review fields
-                "peer_reviews_required": 1,
-                "peer_reviews_completed": 0,
-                "peer_review_status": "pending"
-            }
+        # Check if this was a scheduled report
+        scheduled_child_id = session.get('scheduled_child_id')
+        report_type = 'scheduled' if scheduled_child_id == child_id else 'manual'
 
-            # Save to database
-            supabase = get_supabase_client()
-            supabase.table('observations').insert(observation_data).execute()
+        payload = {
+            'processing_mode': processing_mode,
+            'observer_id': observer_id,
+            'observer_name': session.get('name'),
+            'child_id': child_id,
+            'student_name': student_name,
+            'session_date': session_date,
+            'user_info': user_info,
+            'file_path': file_path,
+            'filename': file.filename,
+            'content_type': file.content_type or '',
+            'file_size': file_size,
+            'force_process': request.form.get('force_process', 'false').lower() == 'true',
+            'report_type': report_type
+        }
+        job_queue.enqueue(OBSERVATION_JOB, payload, owner_id=observer_id, job_id=job_id)
 
-            # Generate AI communication review automatically for OCR observations
-            try:
-                logger.info(f"Generating AI communication review for OCR observation {observation_id}")
-                # For OCR, we'll use the extracted text as the "transcript"
-                ai_review = extractor.generate_ai_communication_review(observations_text, user_info)
-
-                # Update the observation with AI review
-                supabase.table('observations').update({
-                    'full_data': json.dumps({
-                        **structured_data,
-                        "formatted_report": report,
-                        "communication_review": ai_review,
-                        "ai_review_generated_at": datetime.now().isoformat()
-                    })
-                }).eq('id', observation_id).execute()
-
-                logger.info(f"AI communication review generated successfully for OCR observation {observation_id}")
-
-                # Send notification to principal about new AI review (OCR)
-                try:
-                    # Get the principal for this observer's organization
-                    observer_org = supabase.table('users').select('organization_id').eq('id',
-                                                                                        observer_id).single().execute()
-                    if observer_org.data:
-                        org_id = observer_org.data['organization_id']
-                        principal = supabase.table('users').select('id,name').eq('organization_id', org_id).eq('role',
-                                                                                                               'Principal').single().execute()
-                        if principal.data:
-                            principal_id = principal.data['id']
-                            principal_name = principal.data['name']
-
-                            # Create notification
-                            notification_data = {
-                                'id': str(uuid.uuid4()),
-                                'recipient_id': principal_id,
-                                'sender_id': observer_id,
-                                'type': 'ai_review_generated',
-                                'title': f'New AI Communication Review Available',
-                                'message': f'AI communication review has been generated for {student_name}\'s observation by {session.get("name")}.',
-                                'data': {
-                                    'observation_id': observation_id,
-                                    'student_name': student_name,
-                                    'observer_name': session.get('name'),
-                                    'review_type': 'ai_communication_review'
-                                },
-                                'created_at': datetime.now().isoformat(),
-                                'read': False
-                            }
-
-                            supabase.table('notifications').insert(notification_data).execute()
-                            logger.info(f"Sent AI review notification to principal {principal_name}")
-                except Exception as notif_error:
-                    logger.warning(f"Failed to send AI review notification: {notif_error}")
-
-            except Exception as ai_error:
-                logger.error(f"Failed to generate AI communication review for OCR: {ai_error}")
-                # Continue without AI review - don't fail the entire process
-
-            # Check if this was a scheduled report and log it
-            scheduled_child_id = session.get('scheduled_child_id')
-            report_type = 'scheduled' if scheduled_child_id == child_id else 'manual'
-
-            # Log the processing
-            log_report_processing(child_id, observer_id, observation_id, report_type)
-
-            # Clear large session data and store only essentials
-            if 'last_custom_report' in session:
-                del session['last_custom_report']
-            if 'scheduled_child_id' in session:
-                del session['scheduled_child_id']
-            if 'scheduled_child_name' in session:
-                del session['scheduled_child_name']
-
-            # Store minimal session data
-            session['last_report'] = report[:1500]  # Truncate to save space
-            session['last_report_id'] = observation_id
-            session['last_student_name'] = structured_data.get("studentName", student_name)
-            session['last_date'] = structured_data.get("date", session_date)
-            session.permanent = True
-            session.modified = True
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('observer.job_status', job_id=job_id)
+        }), 202
 
-            return jsonify({
-                'success': True,
-                'message': 'OCR observation processed and saved successfully!',
-                'report': report,
-                'download_urls': {
-                    'word': url_for('observer.download_report'),
-                    'pdf': url_for('observer.download_pdf')
+    except Exception as e:
+        logger.error(f"Error in process_file: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Error processing observation: {str(e)}'
+        })
+
+
+@observer_bp.route('/job_status/<job_id>')
+@login_required
+@observer_required
+def job_status(job_id):
+    """Poll a queued observation job; returns the report once it has finished"""
+    observer_id = session.get('user_id')
+    job = job_queue.get(job_id)
+
+    if not job or job['owner_id'] != observer_id:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    if job['status'] in ('queued', 'running', 'waiting'):
+        return jsonify({'success': True, 'job_id': job_id, 'status': job['status']})
+
+    if job['status'] == 'failed':
+        error = job['error'] or {}
+        response = {
+            'success': False,
+            'job_id': job_id,
+            'status': 'failed',
+            'error': error.get('message', 'Error processing observation')
+        }
+        if error.get('details'):
+            response['debug_info'] = error['details']
+        response['metrics'] = _job_metrics(job)
+        return jsonify(response)
+
+    result = job['result']
+
+    # Update the session once, on the first poll that sees the finished job
+    if session.get('last_report_id') != result['observation_id']:
+        if 'last_custom_report' in session:
+            del session['last_custom_report']
+        if session.get('scheduled_child_id') == job['payload'].get('child_id'):
+            session.pop('scheduled_child_id', None)
+            session.pop('scheduled_child_name', None)
+
+        # Store minimal session data
+        session['last_report'] = result['report'][:1500]  # Truncate to save space
+        session['last_report_id'] = result['observation_id']
+        session['last_student_name'] = result['student_name']
+        session['last_date'] = result['date']
+        session.permanent = True
+        session.modified = True
+
+    response = {
+        'success': True,
+        'job_id': job_id,
+        'status': 'completed',
+        'message': result['message'],
+        'report': result['report'],
+        'download_urls': {
+            'word': url_for('observer.download_report'),
+            'pdf': url_for('observer.download_pdf')
+        }
+    }
+    if 'transcript_length' in result:
+        response['transcript_length'] = result['transcript_length']
+    response['metrics'] = _job_metrics(job)
+    return jsonify(response)
+
+
+def _job_metrics(job):
+    """Upload size and worker memory figures recorded for a finished job"""
+    return {'upload_bytes': job['payload'].get('file_size'), **(job['metrics'] or {})}
+
+
+def _open_spooled_upload(payload):
+    """Reopen a spooled upload as a FileStorage so extractor methods can use it unchanged"""
+    return FileStorage(
+        stream=open(payload['file_path'], 'rb'),
+        filename=payload['filename'],
+        content_type=payload['content_type']
+    )
+
+
+def _notify_principal_of_ai_review(supabase, observer_id, observer_name, student_name, observation_id,
+                                   notification_id=None):
+    """Send notification to principal about new AI review
+
+    With a ``notification_id`` the write is idempotent: a notification that
+    already exists is left as it is.
+    """
+    try:
+        # Get the principal for this observer's organization
+        observer_org = supabase.table('users').select('organization_id').eq('id',
+                                                                            observer_id).single().execute()
+        if observer_org.data:
+            org_id = observer_org.data['organization_id']
+            principal = supabase.table('users').select('id,name').eq('organization_id', org_id).eq('role',
+                                                                                                   'Principal').single().execute()
+            if principal.data:
+                principal_id = principal.data['id']
+                principal_name = principal.data['name']
+
+                # Create notification
+                notification_data = {
+                    'id': notification_id or str(uuid.uuid4()),
+                    'recipient_id': principal_id,
+                    'sender_id': observer_id,
+                    'type': 'ai_review_generated',
+                    'title': f'New AI Communication Review Available',
+                    'message': f'AI communication review has been generated for {student_name}\'s observation by {observer_name}.',
+                    'data': {
+                        'observation_id': observation_id,
+                        'student_name': student_name,
+                        'observer_name': observer_name,
+                        'review_type': 'ai_communication_review'
+                    },
+                    'created_at': datetime.now().isoformat(),
+                    'read': False
                 }
-            })
 
-        elif processing_mode == 'audio':
-            if 'file' not in request.files:
-                return jsonify({
-                    'success': False,
-                    'error': 'No file uploaded'
-                })
+                supabase.table('notifications').upsert(notification_data, ignore_duplicates=True).execute()
+                logger.info(f"Sent AI review notification to principal {principal_name}")
+    except Exception as notif_error:
+        logger.warning(f"Failed to send AI review notification: {notif_error}")
 
-            file = request.files['file']
 
-            # Validate audio file
-            if not file.filename.lower().endswith(('.mp3', '.wav', '.m4a', '.ogg', '.flac')):
-                return jsonify({
-                    'success': False,
-                    'error': 'Invalid audio format. Please upload MP3, WAV, M4A, OGG, or FLAC files.'
-                })
+def _save_job_observation(supabase, job_id, observation_data, notify_principal, report_type):
+    """Write an observation job's rows; safe to repeat when the job is re-run"""
+    observation_id = observation_data['id']
+    supabase.table('observations').upsert(observation_data, ignore_duplicates=True).execute()
+    invalidate_child_generations(observation_data['student_id'])
+    invalidate_observer_generations(observation_data['username'])
 
-            # Check file size (limit to 25MB for audio)
-            file.seek(0, 2)  # Seek to end
-            file_size = file.tell()
-            file.seek(0)  # Reset to beginning
+    if notify_principal:
+        _notify_principal_of_ai_review(supabase, observation_data['username'], observation_data['observer_name'],
+                                       observation_data['student_name'], observation_id,
+                                       notification_id=_job_row_id(job_id, 'ai_review_notification'))
 
-            if file_size > 25 * 1024 * 1024:  # 25MB limit
-                return jsonify({
-                    'success': False,
-                    'error': 'Audio file too large. Please upload files smaller than 25MB.'
-                })
+    # Log the processing
+    log_report_processing(observation_data['student_id'], observation_data['username'], observation_id, report_type)
 
-            # Upload file to storage first
-            file.seek(0)
-            try:
-                file_url = upload_file_to_storage(
-                    file.read(),
-                    file.filename,
-                    f"audio/{file.content_type.split('/')[1] if '/' in file.content_type else 'mp3'}"
-                )
-            except Exception as upload_error:
-                logger.error(f"Error uploading file: {upload_error}")
-                return jsonify({
-                    'success': False,
-                    'error': f'Failed to upload audio file: {str(upload_error)}'
-                })
 
-            # Reset file pointer for transcription
-            file.seek(0)
-
-            # Student-specific audio processing adjustments
-            min_length = 5  # Default minimum length
-            if child_id == "08cd0c39-62b1-4931-a9bb-1106a5206a39":  # Daivik's ID
-                logger.info("Applying student-specific audio processing settings")
-                min_length = 3  # More lenient for this student
-                try:
-                    file = extractor.preprocess_audio_for_student(file, child_id)
-                except Exception as preproc_err:
-                    logger.warning(f"Audio preprocessing failed: {preproc_err}")
-
-            # Add detailed logging before transcription
-            logger.info(f"Starting transcription for student {child_id}: {file.filename}")
-            logger.info(f"File size: {file_size} bytes")
-
-            # Try multiple transcription services
-            transcript = None
-            transcription_service = "unknown"
-            try:
-                transcript = extractor.transcribe_with_assemblyai(file)
-                transcription_service = "assemblyai"
-                logger.info(f"AssemblyAI transcription successful: {len(transcript) if transcript else 0} chars")
-            except Exception as e:
-                logger.warning(f"AssemblyAI failed: {e}, trying fallback methods")
-                try:
-                    file.seek(0)
-                    transcript = extractor.transcribe_with_whisper_fallback(file)
-                    transcription_service = "whisper_fallback"
-                    logger.info(f"Fallback transcription successful: {len(transcript) if transcript else 0} chars")
-                except Exception as e2:
-                    logger.error(f"All transcription methods failed: {e2}")
-                    return jsonify({
-                        'success': False,
-                        'error': f'All transcription services failed. Primary: {str(e)}, Fallback: {str(e2)}'
-                    })
-
-            logger.info(f"Transcription completed. Length: {len(transcript) if transcript else 0}")
-            logger.info(f"Transcript preview: {transcript[:100] if transcript else 'None'}")
-
-            # Add force process option
-            force_process = request.form.get('force_process', 'false').lower() == 'true'
-
-            # Check if transcription was successful
-            if not transcript or transcript.strip() == "":
-                logger.error("Empty transcript returned from transcription service")
-                return jsonify({
-                    'success': False,
-                    'error': 'Audio transcription returned empty result. Please ensure the audio is clear and contains speech.'
-                })
+def _process_ocr_observation(extractor, payload, ocr_file, upload_file, job_id):
+    observer_id = payload['observer_id']
+    observer_name = payload['observer_name']
+    child_id = payload['child_id']
+    student_name = payload['student_name']
+    session_date = payload['session_date']
+    user_info = payload['user_info']
+    pipeline = ObservationPipeline(extractor)
 
-            # More specific error detection
-            error_indicators = ["transcription failed", "no audio detected", "unable to process",
-                                "error processing audio"]
-            if any(indicator in transcript.lower() for indicator in error_indicators):
-                logger.error(f"Transcription service returned error: {transcript}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Audio transcription service reported an error. Please try again with clearer audio.'
-                })
+    # OCR + Groq structuring and the storage upload run side by side
+    stages = pipeline.extract_and_upload_image(
+        ocr_file, upload_file, f"image/{ocr_file.content_type.split('/')[1]}"
+    )
+    structured_data = stages['extract'].unwrap()
+    observations_text = structured_data.get("observations", "")
+
+    # Upload errors are not fatal for OCR observations
+    if stages['upload'].ok:
+        file_url = stages['upload'].value
+    else:
+        logger.error(f"Error uploading file: {stages['upload'].error}")
+        file_url = None
+
+    # Formatted report and AI communication review are generated concurrently
+    # For OCR, we'll use the extracted text as the "transcript"
+    generated = pipeline.report_and_review(observations_text, user_info)
+    report_data = generated['report'].unwrap()
+    report = render_text(report_data)
+
+    full_data = {
+        **structured_data,
+        "report_data": report_data,
+        "formatted_report": report
+    }
+    if generated['review'].ok:
+        full_data["communication_review"] = generated['review'].value
+        full_data["ai_review_generated_at"] = datetime.now().isoformat()
+    else:
+        # Continue without AI review - don't fail the entire process
+        logger.error(f"Failed to generate AI communication review for OCR: {generated['review'].error}")
+
+    # Save observation
+    observation_id = _job_row_id(job_id, 'observation')
+    observation_data = {
+        "id": observation_id,
+        "student_id": child_id,
+        "username": observer_id,
+        "student_name": structured_data.get("studentName", student_name),
+        "observer_name": observer_name,
+        "class_name": structured_data.get("className", ""),
+        "date": structured_data.get("date", session_date),
+        "observations": observations_text,
+        "strengths": json.dumps(structured_data.get("strengths", [])),
+        "areas_of_development": json.dumps(structured_data.get("areasOfDevelopment", [])),
+        "recommendations": json.dumps(structured_data.get("recommendations", [])),
+        "timestamp": datetime.now().isoformat(),
+        "filename": ocr_file.filename,
+        "full_data": json.dumps(full_data),
+        "has_formatted_report": bool(full_data.get("formatted_report")),
+        "report_scores": scores_from_report_data(report_data),
+        "theme_of_day": structured_data.get("themeOfDay", ""),
+        "curiosity_seed": structured_data.get("curiositySeed", ""),
+        "file_url": file_url,
+        # Initialize peer review fields
+        "peer_reviews_required": 1,
+        "peer_reviews_completed": 0,
+        "peer_review_status": "pending"
+    }
 
-            # Check for minimum length with more flexibility
-            if force_process and transcript and len(transcript.strip()) > 0:
-                logger.info("Force processing enabled, skipping length validation")
-            elif len(transcript.strip()) < min_length:
-                logger.warning(f"Short transcript ({len(transcript)} chars): {transcript}")
-                return jsonify({
-                    'success': False,
-                    'error': f'Audio transcription too short ({len(transcript)} characters). Please ensure the audio contains sufficient speech content.',
-                    'debug_info': {
-                        'transcript_length': len(transcript),
-                        'transcript_preview': transcript[:50] if transcript else None,
-                        'file_size': file_size,
-                        'service_used': transcription_service
-                    }
-                })
+    # Save to database in a single write, AI review included
+    _save_job_observation(get_supabase_client(), job_id, observation_data,
+                          "communication_review" in full_data, payload['report_type'])
+
+    return {
+        'observation_id': observation_id,
+        'message': 'OCR observation processed and saved successfully!',
+        'report': report,
+        'student_name': structured_data.get("studentName", student_name),
+        'date': structured_data.get("date", session_date),
+        'stage_timings': {name: round(result.duration, 2) for name, result in {**stages, **generated}.items()}
+    }
 
-            # Generate formatted report from transcript with validation
-            try:
-                if transcript and (force_process or len(transcript.strip()) >= min_length):
-                    report = extractor.generate_report_from_text(transcript, user_info)
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Insufficient audio content for report generation.'
-                    })
-            except Exception as report_error:
-                logger.error(f"Report generation error: {report_error}")
-                return jsonify({
-                    'success': False,
-                    'error': f'Failed to generate report: {str(report_error)}'
-                })
 
-            # Save observation only if everything succeeded
-            observation_id = str(uuid.uuid4())
-            observation_data = {
-                "id": observation_id,
-                "student_id": child_id,
-                "username": observer_id,
-                "student_name": student_name,
-                "observer_name": session.get('name'),
-                "class_name": "",
-                "date": session_date,
-                "observations": transcript,
-                "strengths": json.dumps([]),
-                "areas_of_development": json.dumps([]),
-                "recommendations": json.dumps([]),
-                "timestamp": datetime.now().isoformat(),
-                "filename": file.filename,
-                "full_data": json.dumps({
-                    "transcript": transcript,
-                    "report": report,
-                    "formatted_report": report,
-                    "file_size": file_size,
-                    "transcription_length": len(transcript),
-                    "transcription_service": transcription_service,
-                    "processing_timestamp": datetime.now().isoformat()
-                }),
-                "theme_of_day": "",
-                "curiosity_seed": "",
-                "file_url": file_url,
-                # Initialize peer review fields
-                "peer_reviews_required": 1,
-                "peer_reviews_completed": 0,
-                "peer_review_status": "pending"
-            }
+def _process_audio_observation(extractor, payload, audio_file, upload_file, job_id):
+    observer_id = payload['observer_id']
+    observer_name = payload['observer_name']
+    child_id = payload['child_id']
+    student_name = payload['student_name']
+    session_date = payload['session_date']
+    user_info = payload['user_info']
+    file_size = payload['file_size']
+    force_process = payload['force_process']
+    content_type = audio_file.content_type or ''
+    pipeline = ObservationPipeline(extractor)
+
+    # Student-specific audio processing adjustments
+    min_length = 5  # Default minimum length
+    if child_id == "08cd0c39-62b1-4931-a9bb-1106a5206a39":  # Daivik's ID
+        logger.info("Applying student-specific audio processing settings")
+        min_length = 3  # More lenient for this student
+        try:
+            audio_file = extractor.preprocess_audio_for_student(audio_file, child_id)
+        except Exception as preproc_err:
+            logger.warning(f"Audio preprocessing failed: {preproc_err}")
 
-            # Save to database
-            supabase = get_supabase_client()
-            supabase.table('observations').insert(observation_data).execute()
+    # Add detailed logging before transcription
+    logger.info(f"Starting transcription for student {child_id}: {audio_file.filename}")
+    logger.info(f"File size: {file_size} bytes")
 
-            # Generate AI communication review automatically
+    def transcribe():
+        # Try multiple transcription services
+        try:
+            transcript = extractor.transcribe_with_assemblyai(
+                audio_file, pending_after=Config.ASSEMBLYAI_INLINE_WAIT_SECONDS
+            )
+            logger.info(f"AssemblyAI transcription successful: {len(transcript) if transcript else 0} chars")
+            return transcript, "assemblyai"
+        except TranscriptPending:
+            raise
+        except Exception as e:
+            logger.warning(f"AssemblyAI failed: {e}, trying fallback methods")
             try:
-                logger.info(f"Generating AI communication review for observation {observation_id}")
-                ai_review = extractor.generate_ai_communication_review(transcript, user_info)
-
-                # Update the observation with AI review
-                supabase.table('observations').update({
-                    'full_data': json.dumps({
-                        "transcript": transcript,
-                        "report": report,
-                        "formatted_report": report,
-                        "file_size": file_size,
-                        "transcription_length": len(transcript),
-                        "transcription_service": transcription_service,
-                        "processing_timestamp": datetime.now().isoformat(),
-                        "communication_review": ai_review,
-                        "ai_review_generated_at": datetime.now().isoformat()
-                    })
-                }).eq('id', observation_id).execute()
-
-                logger.info(f"AI communication review generated successfully for observation {observation_id}")
-
-                # Send notification to principal about new AI review
-                try:
-                    # Get the principal for this observer's organization
-                    observer_org = supabase.table('users').select('organization_id').eq('id',
-                                                                                        observer_id).single().execute()
-                    if observer_org.data:
-                        org_id = observer_org.data['organization_id']
-                        principal = supabase.table('users').select('id,name').eq('organization_id', org_id).eq('role',
-                                                                                                               'Principal').single().execute()
-                        if principal.data:
-                            principal_id = principal.data['id']
-                            principal_name = principal.data['name']
-
-                            # Create notification
-                            notification_data = {
-                                'id': str(uuid.uuid4()),
-                                'recipient_id': principal_id,
-                                'sender_id': observer_id,
-                                'type': 'ai_review_generated',
-                                'title': f'New AI Communication Review Available',
-                                'message': f'AI communication review has been generated for {student_name}\'s observation by {session.get("name")}.',
-                                'data': {
-                                    'observation_id': observation_id,
-                                    'student_name': student_name,
-                                    'observer_name': session.get('name'),
-                                    'review_type': 'ai_communication_review'
-                                },
-                                'created_at': datetime.now().isoformat(),
-                                'read': False
-                            }
-
-                            supabase.table('notifications').insert(notification_data).execute()
-                            logger.info(f"Sent AI review notification to principal {principal_name}")
-                except Exception as notif_error:
-                    logger.warning(f"Failed to send AI review notification: {notif_error}")
-
-            except Exception as ai_error:
-                logger.error(f"Failed to generate AI communication review: {ai_error}")
-                # Continue without AI review - don't fail the entire process
-
-            # Log processing and update session
-            scheduled_child_id = session.get('scheduled_child_id')
-            report_type = 'scheduled' if scheduled_child_id == child_id else 'manual'
-            log_report_processing(child_id, observer_id, observation_id, report_type)
-
-            # Clear session data
-            if 'last_custom_report' in session:
-                del session['last_custom_report']
-            if 'scheduled_child_id' in session:
-                del session['scheduled_child_id']
-            if 'scheduled_child_name' in session:
-                del session['scheduled_child_name']
-
-            # Store minimal session data
-            session['last_report'] = report[:1500]
-            session['last_report_id'] = observation_id
-            session['last_student_name'] = student_name
-            session['last_date'] = session_date
-            session.permanent = True
-            session.modified = True
-
-            return jsonify({
-                'success': True,
-                'message': 'Audio observation processed and saved successfully!',
-                'report': report,
+                audio_file.seek(0)
+                transcript = extractor.transcribe_with_whisper_fallback(audio_file)
+                logger.info(f"Fallback transcription successful: {len(transcript) if transcript else 0} chars")
+                return transcript, "whisper_fallback"
+            except Exception as e2:
+                logger.error(f"All transcription methods failed: {e2}")
+                raise JobFailed(f'All transcription services failed. Primary: {str(e)}, Fallback: {str(e2)}')
+
+    storage_content_type = f"audio/{content_type.split('/')[1] if '/' in content_type else 'mp3'}"
+    stages = {}
+
+    if payload.get('transcript_id'):
+        # Resumed by the AssemblyAI webhook or by the fallback poll timer
+        file_url = payload['file_url']
+        transcript, transcription_service = _resume_assemblyai_transcript(extractor, payload)
+        extractor.cache_transcript(audio_file, transcript)
+    elif Config.ASSEMBLYAI_WEBHOOK_URL and Config.ASSEMBLYAI_API_KEY and not extractor.get_cached_transcript(audio_file):
+        # Webhook mode: submit the transcript and park the job instead of polling
+        stages = pipeline.transcribe_and_upload_audio(
+            lambda: extractor.submit_assemblyai_transcription(audio_file, webhook_url=Config.ASSEMBLYAI_WEBHOOK_URL),
+            upload_file, storage_content_type
+        )
+        if not stages['upload'].ok:
+            logger.error(f"Error uploading file: {stages['upload'].error}")
+            raise JobFailed(f"Failed to upload audio file: {str(stages['upload'].error)}")
+        if not stages['transcribe'].ok:
+            logger.error(f"AssemblyAI submission failed: {stages['transcribe'].error}")
+            raise JobFailed(f"Failed to start transcription: {str(stages['transcribe'].error)}")
+
+        transcript_id = stages['transcribe'].value
+        logger.info(f"Submitted AssemblyAI transcript {transcript_id}; waiting for webhook")
+        _wait_for_assemblyai_transcript(transcript_id, stages['upload'].value, time.time())
+    else:
+        # Storage upload and transcription run side by side
+        stages = pipeline.transcribe_and_upload_audio(transcribe, upload_file, storage_content_type)
+
+        if not stages['upload'].ok:
+            logger.error(f"Error uploading file: {stages['upload'].error}")
+            raise JobFailed(f"Failed to upload audio file: {str(stages['upload'].error)}")
+        file_url = stages['upload'].value
+
+        if isinstance(stages['transcribe'].error, TranscriptPending):
+            # Still processing after the inline wait; continue on the fallback timer
+            pending = stages['transcribe'].error
+            logger.info(f"AssemblyAI transcript {pending.transcript_id} still processing; parking the job")
+            _wait_for_assemblyai_transcript(pending.transcript_id, file_url, pending.submitted_at)
+
+        transcript, transcription_service = stages['transcribe'].unwrap()
+
+    logger.info(f"Transcription completed. Length: {len(transcript) if transcript else 0}")
+    logger.info(f"Transcript preview: {transcript[:100] if transcript else 'None'}")
+
+    # Check if transcription was successful
+    if not transcript or transcript.strip() == "":
+        logger.error("Empty transcript returned from transcription service")
+        raise JobFailed('Audio transcription returned empty result. Please ensure the audio is clear and contains speech.')
+
+    # More specific error detection
+    error_indicators = ["transcription failed", "no audio detected", "unable to process",
+                        "error processing audio"]
+    if any(indicator in transcript.lower() for indicator in error_indicators):
+        logger.error(f"Transcription service returned error: {transcript}")
+        raise JobFailed('Audio transcription service reported an error. Please try again with clearer audio.')
+
+    # Check for minimum length with more flexibility
+    if force_process and transcript and len(transcript.strip()) > 0:
+        logger.info("Force processing enabled, skipping length validation")
+    elif len(transcript.strip()) < min_length:
+        logger.warning(f"Short transcript ({len(transcript)} chars): {transcript}")
+        raise JobFailed(
+            f'Audio transcription too short ({len(transcript)} characters). Please ensure the audio contains sufficient speech content.',
+            details={
                 'transcript_length': len(transcript),
-                'download_urls': {
-                    'word': url_for('observer.download_report'),
-                    'pdf': url_for('observer.download_pdf')
-                }
-            })
+                'transcript_preview': transcript[:50] if transcript else None,
+                'file_size': file_size,
+                'service_used': transcription_service
+            }
+        )
+
+    # Generate formatted report and AI communication review concurrently
+    generated = pipeline.report_and_review(transcript, user_info)
+    if not generated['report'].ok:
+        logger.error(f"Report generation error: {generated['report'].error}")
+        raise JobFailed(f"Failed to generate report: {str(generated['report'].error)}")
+    report_data = generated['report'].value
+    report = render_text(report_data)
+
+    full_data = {
+        "transcript": transcript,
+        "report": report,
+        "report_data": report_data,
+        "formatted_report": report,
+        "file_size": file_size,
+        "transcription_length": len(transcript),
+        "transcription_service": transcription_service,
+        "processing_timestamp": datetime.now().isoformat()
+    }
+    if generated['review'].ok:
+        full_data["communication_review"] = generated['review'].value
+        full_data["ai_review_generated_at"] = datetime.now().isoformat()
+    else:
+        # Continue without AI review - don't fail the entire process
+        logger.error(f"Failed to generate AI communication review: {generated['review'].error}")
+
+    # Save observation only if everything succeeded
+    observation_id = _job_row_id(job_id, 'observation')
+    observation_data = {
+        "id": observation_id,
+        "student_id": child_id,
+        "username": observer_id,
+        "student_name": student_name,
+        "observer_name": observer_name,
+        "class_name": "",
+        "date": session_date,
+        "observations": transcript,
+        "strengths": json.dumps([]),
+        "areas_of_development": json.dumps([]),
+        "recommendations": json.dumps([]),
+        "timestamp": datetime.now().isoformat(),
+        "filename": audio_file.filename,
+        "full_data": json.dumps(full_data),
+        "has_formatted_report": bool(full_data.get("formatted_report")),
+        "report_scores": scores_from_report_data(report_data),
+        "theme_of_day": "",
+        "curiosity_seed": "",
+        "file_url": file_url,
+        # Initialize peer review fields
+        "peer_reviews_required": 1,
+        "peer_reviews_completed": 0,
+        "peer_review_status": "pending"
+    }
+
+    # Save to database in a single write, AI review included
+    _save_job_observation(get_supabase_client(), job_id, observation_data,
+                          "communication_review" in full_data, payload['report_type'])
+
+    return {
+        'observation_id': observation_id,
+        'message': 'Audio observation processed and saved successfully!',
+        'report': report,
+        'transcript_length': len(transcript),
+        'student_name': student_name,
+        'date': session_date,
+        'stage_timings': {name: round(result.duration, 2) for name, result in {**stages, **generated}.items()}
+    }
 
+
+def _wait_for_assemblyai_transcript(transcript_id, file_url, submitted_at):
+    """Park the job until the transcript's webhook arrives or the fallback poll timer fires"""
+    raise JobSuspended(
+        wait_key=f"assemblyai:{transcript_id}",
+        resume_after=Config.ASSEMBLYAI_WEBHOOK_FALLBACK_DELAY,
+        state={
+            'transcript_id': transcript_id,
+            'file_url': file_url,
+            'transcript_submitted_at': submitted_at,
+            'poll_interval': Config.ASSEMBLYAI_WEBHOOK_FALLBACK_DELAY
+        }
+    )
+
+
+def _resume_assemblyai_transcript(extractor, payload):
+    """Check a submitted AssemblyAI transcript; park the job again with backoff if it is not ready"""
+    transcript_id = payload['transcript_id']
+    try:
+        polling_data = extractor.get_assemblyai_transcript(transcript_id)
+        status = polling_data['status']
     except Exception as e:
-        print(f"Error in process_file: {e}")
-        return jsonify({
-            'success': False,
-            'error': f'Error processing observation: {str(e)}'
-        })
+        logger.warning(f"Could not check AssemblyAI transcript {transcript_id}: {e}")
+        polling_data, status = {}, 'unknown'
+
+    if status == 'completed':
+        logger.info(f"AssemblyAI transcription successful: {len(polling_data.get('text') or '')} chars")
+        return polling_data.get('text'), "assemblyai"
+    if status == 'error':
+        raise JobFailed(f"Transcription error: {polling_data.get('error', 'Unknown error')}")
+
+    remaining = Config.ASSEMBLYAI_TRANSCRIPT_DEADLINE - (time.time() - payload['transcript_submitted_at'])
+    if remaining <= 0:
+        raise JobFailed('Error: Transcription timed out or failed.')
+
+    interval = min(payload.get('poll_interval', Config.ASSEMBLYAI_POLL_INITIAL) * 2,
+                   Config.ASSEMBLYAI_WEBHOOK_FALLBACK_MAX_INTERVAL)
+    raise JobSuspended(
+        wait_key=f"assemblyai:{transcript_id}",
+        resume_after=min(interval, remaining),
+        state={'poll_interval': interval}
+    )
+
+
+def run_observation_job(payload, job_id):
+    """Job queue handler: run the OCR or audio pipeline for a spooled upload"""
+    extractor = ObservationExtractor()
+    # Separate handles so the upload and the extraction stage can read concurrently
+    work_file = _open_spooled_upload(payload)
+    upload_file = _open_spooled_upload(payload)
+    # The queue removes the spooled upload once the job has finished for good
+    try:
+        if payload['processing_mode'] == 'ocr':
+            return _process_ocr_observation(extractor, payload, work_file, upload_file, job_id)
+        return _process_audio_observation(extractor, payload, work_file, upload_file, job_id)
+    finally:
+        work_file.close()
+        upload_file.close()
+
+
+job_queue.register(OBSERVATION_JOB, run_observation_job)
 
 
 # Cross-Organization Peer Review Routes - FIXED
@@ -635,62 +766,16 @@ def peer_reviews():
 
         logger.info(f"Observer {observer_id} has made {max_reviews_allowed} observations")
 
-        # Calculate 24 hours ago and 7 days ago for more flexible filtering
-        twenty_four_hours_ago = (datetime.now() - timedelta(hours=24)).isoformat()
-        seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-
-        logger.info(f"Looking for observations from {twenty_four_hours_ago} to now")
-
-        # Get ALL observations from OTHER observers (any organization) for review
-        # Try timestamp first, then fallback to date field
-        observations_response = supabase.table('observations').select("""
-            id, student_name, observer_name, date, timestamp, filename,
-            file_url, full_data, username, observations, processed_by_admin
-        """).neq('username', observer_id).order('timestamp', desc=True).execute()
-
-        all_observations = observations_response.data if observations_response.data else []
-
-        logger.info(f"Found {len(all_observations)} total observations from other observers")
+        # Reviews already completed count against the allowance
+        completed_count = supabase.table('peer_reviews').select("id", count="exact") \
+            .eq('reviewer_id', observer_id).limit(1).execute().count or 0
+        remaining_allowance = max(0, max_reviews_allowed - completed_count)
 
-        # Filter by date more flexibly - include observations from last 7 days
-        recent_observations = []
-        for obs in all_observations:
-            obs_date = obs.get('date')
-            obs_timestamp = obs.get('timestamp')
-
-            # Try to parse the date
-            try:
-                if obs_date:
-                    # If date is in YYYY-MM-DD format, convert to datetime
-                    if isinstance(obs_date, str) and len(obs_date) == 10:
-                        obs_datetime = datetime.strptime(obs_date, '%Y-%m-%d')
-                    else:
-                        obs_datetime = datetime.fromisoformat(obs_date.replace('Z', '+00:00'))
-
-                    # Check if observation is from last 7 days
-                    if obs_datetime >= datetime.now() - timedelta(days=7):
-                        recent_observations.append(obs)
-                elif obs_timestamp:
-                    # Use timestamp if available
-                    obs_datetime = datetime.fromisoformat(obs_timestamp.replace('Z', '+00:00'))
-                    if obs_datetime >= datetime.now() - timedelta(days=7):
-                        recent_observations.append(obs)
-            except Exception as e:
-                logger.warning(f"Could not parse date/timestamp for observation {obs.get('id')}: {e}")
-                # Include observation if we can't parse the date (better to show than hide)
-                recent_observations.append(obs)
-
-        logger.info(f"Found {len(recent_observations)} observations from last 7 days")
-
-        # Get all observation IDs that have already been reviewed by ANY observer
-        reviewed_observations = supabase.table('peer_reviews').select('observation_id').execute()
-        reviewed_observation_ids = [review['observation_id'] for review in
-                                    reviewed_observations.data] if reviewed_observations.data else []
-
-        logger.info(f"Found {len(reviewed_observation_ids)} already reviewed observations")
-
-        # Filter out observations that have already been reviewed by anyone
-        unreviewed_observations = [obs for obs in recent_observations if obs['id'] not in reviewed_observation_ids]
+        # Observations this observer holds a claim on, topped up to a small batch so a
+        # single visit cannot lock a large share of the queue away from other observers
+        unreviewed_observations = _claimed_peer_review_observations(
+            supabase, observer_id, min(remaining_allowance, Config.PEER_REVIEW_CLAIM_BATCH)
+        )
 
         logger.info(f"Found {len(unreviewed_observations)} unreviewed observations")
 
@@ -706,7 +791,7 @@ def peer_reviews():
                 'filename': obs.get('filename', 'N/A'),
                 'file_url': obs.get('file_url'),
                 'processed_by_admin': obs.get('processed_by_admin', False),
-                'has_formatted_report': False,
+                'has_formatted_report': bool(obs.get('has_formatted_report')),
                 'formatted_report': None,
                 'file_type': None,
                 'signed_url': None
@@ -720,28 +805,21 @@ def peer_reviews():
                 file_url_lower = processed_obs['file_url'].lower()
                 if any(ext in file_url_lower for ext in ['.mp3', '.wav', '.m4a', '.ogg']):
                     processed_obs['file_type'] = 'audio'
-                    # Create signed URL for audio files for better compatibility
-                    filename = processed_obs['file_url'].split('/')[-1]
-                    signed_url = get_signed_audio_url(filename)
-                    if signed_url:
-                        processed_obs['signed_url'] = signed_url
                 elif any(ext in file_url_lower for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']):
                     processed_obs['file_type'] = 'image'
 
-            # Extract formatted report from full_data
-            if obs.get('full_data'):
-                try:
-                    full_data = json.loads(obs['full_data'])
-                    if full_data.get('formatted_report'):
-                        processed_obs['has_formatted_report'] = True
-                        processed_obs['formatted_report'] = full_data['formatted_report']
-                except:
-                    pass
-
             processed_observations.append(processed_obs)
 
-        # Limit to the number of reports this observer has made
-        pending_reviews = processed_observations[:max_reviews_allowed]
+        # Signed URLs for all audio files in one batched (and cached) storage call
+        audio_files = {obs['id']: obs['file_url'].split('/')[-1]
+                       for obs in processed_observations if obs['file_type'] == 'audio'}
+        signed_urls = get_signed_audio_urls(list(audio_files.values()))
+        for obs in processed_observations:
+            if obs['id'] in audio_files:
+                obs['signed_url'] = signed_urls.get(audio_files[obs['id']])
+
+        # Already limited to the claim batch and the observer's remaining allowance
+        pending_reviews = processed_observations
 
         # Get completed reviews by this observer
         completed_reviews = []
@@ -774,6 +852,38 @@ def peer_reviews():
                                observer_reports_count=0)
 
 
+def _claimed_peer_review_observations(supabase, observer_id, allowance):
+    """Observation rows for this observer's active review claims, claiming more if below ``allowance``.
+
+    Claims beyond ``allowance`` (held from when the allowance was larger) go
+    back to the queue for other observers. Falls back to the unclaimed
+    candidate query if the review queue is not available (migrations/003 not
+    applied).
+    """
+    try:
+        claims = get_active_peer_review_claims(observer_id)
+        if len(claims) > allowance:
+            release_peer_review_claims(observer_id, [claim['observation_id'] for claim in claims[allowance:]])
+            claims = claims[:allowance]
+        needed = allowance - len(claims)
+        if needed > 0:
+            new_claims = claim_peer_reviews(observer_id, needed)
+            if len(new_claims) < needed and refill_peer_review_queue():
+                new_claims += claim_peer_reviews(observer_id, needed - len(new_claims))
+            claims += new_claims
+    except Exception as e:
+        logger.warning(f"Peer review queue unavailable, using candidate query: {e}")
+        return get_peer_review_candidates(observer_id, allowance)
+
+    claimed_ids = [claim['observation_id'] for claim in claims]
+    rows = select_in('observations',
+                     "id, student_name, observer_name, date, timestamp, filename, file_url, username, "
+                     "processed_by_admin, has_formatted_report",
+                     'id', claimed_ids, client=supabase)
+    rows_by_id = {row['id']: row for row in rows}
+    return [rows_by_id[obs_id] for obs_id in claimed_ids if obs_id in rows_by_id]
+
+
 @observer_bp.route('/debug_peer_review_data')
 @login_required
 @observer_required
@@ -957,6 +1067,8 @@ def submit_peer_review_route(observation_id):
         success = insert_peer_review_with_service_role(review_data)
 
         if success:
+            complete_peer_review_claim(observation_id)
+
             # Send notification to the CORRECT principal
             if observed_user_org_id:
                 send_peer_review_notification_to_principal(observation_id, reviewer_id, observed_by,
@@ -1073,7 +1185,8 @@ def download_report():
         if report.get('full_data'):
             try:
                 full_data = json.loads(report['full_data'])
-                formatted_report = full_data.get('formatted_report')
+                # Structured reports render straight from their fields
+                formatted_report = full_data.get('report_data') or full_data.get('formatted_report')
             except Exception as e:
                 pass
 
@@ -1134,7 +1247,8 @@ def download_pdf():
         if report.get('full_data'):
             try:
                 full_data = json.loads(report['full_data'])
-                formatted_report = full_data.get('formatted_report')
+                # Structured reports render straight from their fields
+                formatted_report = full_data.get('report_data') or full_data.get('formatted_report')
             except:
                 pass
 
@@ -1444,64 +1558,16 @@ def add_goal():
 def messages():
     observer_id = session.get('user_id')
     children = get_observer_children(observer_id)
-    supabase = get_supabase_client()
 
-    # Get parents for observer's children
-    parents = []
-    for child in children:
-        try:
-            parent_data = supabase.table('users').select("*").eq('child_id', child['id']).eq('role',
-                                                                                             'Parent').execute().data
-            if parent_data:
-                parents.extend(parent_data)
-        except Exception as e:
-            logger.error(f"Error fetching parents for child {child['id']}: {str(e)}")
+    # Parents for all children in one batched lookup, reused for the feedback threads
+    parents_by_child = get_parents_by_child_ids([child['id'] for child in children])
+    parents = [parent for child in children for parent in parents_by_child.get(child['id'], [])]
 
     # Get parent feedback for observer's reports
-    feedback_data = []
-    try:
-        reports = supabase.table('observations').select("id, student_name, date, student_id").eq('username',
-                                                                                                 observer_id).execute().data
-
-        for report in reports:
-            try:
-                feedback = supabase.table('parent_feedback').select("*").eq('report_id', report['id']).execute().data
-                for fb in feedback:
-                    # Get parent info
-                    parent_info = supabase.table('users').select("name, email").eq('child_id', report['student_id']).eq(
-                        'role', 'Parent').execute().data
-                    fb['parent_info'] = parent_info[0] if parent_info else {'name': 'Unknown Parent', 'email': ''}
-                    fb['report_info'] = report
-
-                    # Check for observer response
-                    response = supabase.table('feedback_responses').select("*").eq('feedback_id',
-                                                                                   fb['id']).execute().data
-                    fb['observer_response'] = response[0] if response else None
-
-                    feedback_data.append(fb)
-            except Exception as e:
-                logger.error(f"Error processing feedback for report {report['id']}: {str(e)}")
-
-        # Sort by timestamp (newest first)
-        feedback_data.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-    except Exception as e:
-        logger.error(f"Error loading reports: {str(e)}")
+    feedback_data = get_observer_feedback_threads(observer_id, parents_by_child)
 
     # ===== PRINCIPAL FEEDBACK SECTION =====
-    principal_feedback = []
-    try:
-        principal_feedback_response = supabase.table('principal_feedback').select(
-            "id, feedback_text, feedback_type, created_at, principal_id"
-        ).eq('observer_id', observer_id).order('created_at', desc=True).execute()
-
-        principal_feedback = principal_feedback_response.data if principal_feedback_response.data else []
-
-        # Enrich with principal names
-        for fb in principal_feedback:
-            principal_info = supabase.table('users').select("name").eq('id', fb['principal_id']).single().execute().data
-            fb['principal_name'] = principal_info['name'] if principal_info else "Unknown Principal"
-    except Exception as e:
-        logger.error(f"Error loading principal feedback: {str(e)}")
+    principal_feedback = get_principal_feedback_with_names(observer_id)
 
     return render_template('observer/messages.html',
                            children=children,
@@ -1962,7 +2028,8 @@ def get_topic_suggestions():
 
         # Generate suggestions using AI
         extractor = ObservationExtractor()
-        suggestions = extractor.generate_topic_suggestions(observer_data, child_history, child_name)
+        suggestions = extractor.generate_topic_suggestions(observer_data, child_history, child_name,
+                                                           child_id=child_id, observer_id=observer_id)
 
         return jsonify({
             'success': True,
@@ -2004,7 +2071,9 @@ def refresh_suggestions():
         child_history = get_child_learning_history(child_id, limit=20)
 
         extractor = ObservationExtractor()
-        suggestions = extractor.generate_topic_suggestions(observer_data, child_history, child_name)
+        suggestions = extractor.generate_topic_suggestions(observer_data, child_history, child_name,
+                                                           child_id=child_id, refresh=True,
+                                                           observer_id=observer_id)
 
         return jsonify({
             'success': True,
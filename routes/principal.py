@@ -6,11 +6,14 @@ from models.database import (
     # Multi-tenant functions
     get_organizations, get_pending_observer_applications, review_observer_application,
     get_users_by_organization, get_children_by_organization, get_observer_child_mappings_by_organization,
-    create_principal_feedback, get_peer_reviews_for_organization, auto_assign_parent_to_organization
+    create_principal_feedback, get_peer_reviews_for_organization, auto_assign_parent_to_organization,
+    get_organization_rollup, get_organization_daily_observations
 )
 from models.observation_extractor import ObservationExtractor
 from utils.decorators import principal_required
-import pandas as pd
+from models.email_outbox import email_outbox
+from models.user_cache import invalidate_user
+from models.lazy_imports import lazy_import
 import uuid
 import json
 from datetime import datetime
@@ -20,6 +23,9 @@ import urllib.parse
 import logging
 import os
 
+# pandas is only needed for exports and analytics
+pd = lazy_import('pandas')
+
 logger = logging.getLogger(__name__)
 
 principal_bp = Blueprint('principal', __name__)
@@ -79,14 +85,8 @@ def dashboard():
 
         supabase = get_supabase_client()
 
-        # Get analytics data for THIS ORGANIZATION ONLY
-        users_response = supabase.table('users').select("id", count="exact").eq('organization_id', org_id).execute()
-        observers_response = supabase.table('users').select("id", count="exact").eq('role', 'Observer').eq(
-            'organization_id', org_id).execute()
-        parents_response = supabase.table('users').select("id", count="exact").eq('role', 'Parent').eq(
-            'organization_id', org_id).execute()
-        children_response = supabase.table('children').select("id", count="exact").eq('organization_id',
-                                                                                      org_id).execute()
+        # Counters for THIS ORGANIZATION ONLY, from the organization rollup
+        rollup = get_organization_rollup(org_id)
 
         # Get observations for this organization
         org_users_response = supabase.table('users').select("id").eq('organization_id', org_id).execute()
@@ -140,12 +140,13 @@ def dashboard():
             processed_reports.append(processed_report)
 
         analytics = {
-            'total_users': users_response.count if users_response.count else 0,
-            'observers_count': observers_response.count if observers_response.count else 0,
-            'parents_count': parents_response.count if parents_response.count else 0,
-            'principals_count': 1,
-            'children_count': children_response.count if children_response.count else 0,
-            'observations_count': len(all_reports),
+            'total_users': rollup['total_users'],
+            'observers_count': rollup['observers'],
+            'parents_count': rollup['parents'],
+            'principals_count': rollup['principals'],
+            'children_count': rollup['children'],
+            'observations_count': rollup['observations'],
+            'ai_reviews_pending': rollup['ai_reviews_pending'],
             'organizations_count': 1,
             'pending_applications': 0,
             'storage_files': len([r for r in processed_reports if r['file_url']]),
@@ -367,6 +368,7 @@ def add_mapping():
                 return redirect(url_for('principal.user_management'))
 
             result = supabase.table('users').update({'child_id': child_id}).eq('id', parent_id).execute()
+            invalidate_user(parent_id)
             if result.data:
                 flash('Parent-Child mapping added successfully!', 'success')
             else:
@@ -446,6 +448,7 @@ def remove_parent_child_mapping(parent_id):
             return redirect(url_for('principal.user_management'))
 
         supabase.table('users').update({'child_id': None}).eq('id', parent_id).execute()
+        invalidate_user(parent_id)
         flash('Parent-Child mapping removed successfully!', 'success')
 
     except Exception as e:
@@ -829,24 +832,19 @@ def analytics():
     """Organization analytics for this principal's organization"""
     try:
         org_id = session.get('organization_id')
-        supabase = get_supabase_client()
 
-        # Get comprehensive analytics data for THIS ORGANIZATION ONLY
-        users_response = supabase.table('users').select("id", count="exact").eq('organization_id', org_id).execute()
-        observers_response = supabase.table('users').select("id", count="exact").eq('role', 'Observer').eq(
-            'organization_id', org_id).execute()
-        parents_response = supabase.table('users').select("id", count="exact").eq('role', 'Parent').eq(
-            'organization_id', org_id).execute()
-        children_response = supabase.table('children').select("id", count="exact").eq('organization_id',
-                                                                                      org_id).execute()
+        # Counters for THIS ORGANIZATION ONLY, from the organization rollup
+        rollup = get_organization_rollup(org_id)
 
         analytics = {
-            'total_users': users_response.count if users_response.count else 0,
-            'observers_count': observers_response.count if observers_response.count else 0,
-            'parents_count': parents_response.count if parents_response.count else 0,
-            'principals_count': 1,
-            'children_count': children_response.count if children_response.count else 0,
-            'observations_count': 0,
+            'total_users': rollup['total_users'],
+            'observers_count': rollup['observers'],
+            'parents_count': rollup['parents'],
+            'principals_count': rollup['principals'],
+            'children_count': rollup['children'],
+            'observations_count': rollup['observations'],
+            'ai_reviews_pending': rollup['ai_reviews_pending'],
+            'daily_observations': get_organization_daily_observations([org_id]).get(org_id, {}),
             'organizations_count': 1,
             'storage_files': 0,
             'recent_observations': []
@@ -873,6 +871,7 @@ def delete_user(user_id):
             return redirect(url_for('principal.user_management'))
 
         supabase.table('users').delete().eq('id', user_id).execute()
+        invalidate_user(user_id)
         flash('User deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting user: {str(e)}', 'error')
@@ -1465,13 +1464,14 @@ def email_ai_review():
         if not review_text:
             return jsonify({'success': False, 'error': 'AI review not available'})
 
-        # Here you would integrate with your email service
-        # For now, we'll just return success
-        # TODO: Implement actual email sending logic
-        
+        student_name = obs.get("student_name", "Student")
+        body = f"{message}\n\n{review_text}" if message else review_text
+        email_outbox.enqueue(recipient_email, f"AI Communication Review - {student_name}", body,
+                             kind='ai_review')
+
         return jsonify({
             'success': True, 
-            'message': f'AI review for {obs.get("student_name", "Student")} sent to {recipient_email}'
+            'message': f'AI review for {student_name} queued for {recipient_email}'
         })
 
     except Exception as e:
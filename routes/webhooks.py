@@ -0,0 +1,31 @@
+from flask import Blueprint, request, jsonify
+from config import Config
+from models.job_queue import job_queue
+import hmac
+import logging
+
+logger = logging.getLogger(__name__)
+
+webhooks_bp = Blueprint('webhooks', __name__)
+
+
+@webhooks_bp.route('/assemblyai', methods=['POST'])
+def assemblyai_webhook():
+    """AssemblyAI transcript-ready callback: resumes the observation job waiting on it"""
+    if Config.ASSEMBLYAI_WEBHOOK_SECRET:
+        provided = request.headers.get('X-Webhook-Secret', '')
+        if not hmac.compare_digest(provided, Config.ASSEMBLYAI_WEBHOOK_SECRET):
+            logger.warning("Rejected AssemblyAI webhook with invalid secret")
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    transcript_id = data.get('transcript_id')
+    if not transcript_id:
+        return jsonify({'success': False, 'error': 'Missing transcript_id'}), 400
+
+    logger.info(f"AssemblyAI webhook for transcript {transcript_id}: {data.get('status')}")
+    job_id = job_queue.resume(f"assemblyai:{transcript_id}", {'transcript_webhook_status': data.get('status')})
+
+    # Always acknowledge so AssemblyAI does not retry. A job that is not parked yet
+    # (still uploading) picks the event up when it suspends.
+    return jsonify({'success': True, 'resumed': job_id is not None, 'deferred': job_id is None})
@@ -0,0 +1,57 @@
+"""
+Fill ``observations.report_scores`` for rows saved before scores were parsed at save time.
+
+Run once after applying migrations/008, and again whenever SCORES_VERSION
+changes (safe to re-run; only rows without current scores are touched):
+
+    python tools/backfill_report_scores.py --batch-size 200
+    python tools/backfill_report_scores.py --dry-run
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import get_supabase_client  # noqa: E402
+from models.report_scores import SCORES_VERSION, scores_from_full_data  # noqa: E402
+
+logger = logging.getLogger('backfill_report_scores')
+
+
+def backfill(batch_size=200, dry_run=False):
+    """Parse and store scores for every observation missing current ones; returns the number updated"""
+    client = get_supabase_client()
+    updated = 0
+    last_id = None
+    while True:
+        query = client.table('observations').select('id, full_data').or_(
+            f"report_scores.is.null,report_scores->>v.neq.{SCORES_VERSION}"
+        )
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.order('id').limit(batch_size).execute().data or []
+        if not rows:
+            break
+
+        for row in rows:
+            scores = scores_from_full_data(row.get('full_data'))
+            if not dry_run:
+                client.table('observations').update({'report_scores': scores}).eq('id', row['id']).execute()
+            updated += 1
+        last_id = rows[-1]['id']
+        logger.info(f"Backfilled {updated} observations so far")
+
+    return updated
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill observations.report_scores from formatted reports')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--dry-run', action='store_true', help='Parse reports without writing scores')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    count = backfill(args.batch_size, args.dry_run)
+    print(f"{'Would backfill' if args.dry_run else 'Backfilled'} {count} observations")
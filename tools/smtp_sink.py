@@ -0,0 +1,160 @@
+"""
+Local SMTP sink for testing the email outbox without a real mail server.
+
+Accepts any AUTH PLAIN/LOGIN credentials, records every message instead of
+delivering it, and counts connections and logins so connection reuse can be
+checked. ``fail_next`` makes the next N DATA commands answer 451 to exercise
+retries.
+
+Run standalone and point the app at it:
+
+    python tools/smtp_sink.py --port 8025
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=8025 MAIL_USE_TLS=False flask run
+
+or embed it in a test with ``SMTPSinkServer().start()``.
+"""
+import argparse
+import base64
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+
+
+class SMTPSinkServer:
+    def __init__(self, host='127.0.0.1', port=0, fail_next=0, reject_recipients=()):
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.fail_next = fail_next
+        self.reject_recipients = set(reject_recipients)
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _take_failure(self):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+            return False
+
+    def _make_handler(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode('ascii') + b'\r\n')
+
+            def read_line(self):
+                return self.rfile.readline().decode('utf-8', 'replace').rstrip('\r\n')
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self.reply('220 smtp-sink ready')
+                mail_from, rcpt_tos = None, []
+                while True:
+                    line = self.read_line()
+                    if not line:
+                        return
+                    command = line[:4].upper()
+                    if command == 'EHLO':
+                        self.reply('250-smtp-sink')
+                        self.reply('250-AUTH PLAIN LOGIN')
+                        self.reply('250 8BITMIME')
+                    elif command == 'HELO':
+                        self.reply('250 smtp-sink')
+                    elif command == 'AUTH':
+                        self.authenticate(line.split()[1:])
+                    elif command == 'MAIL':
+                        mail_from, rcpt_tos = line.split(':', 1)[1].strip(), []
+                        self.reply('250 OK')
+                    elif command == 'RCPT':
+                        recipient = line.split(':', 1)[1].strip().strip('<>')
+                        if recipient in sink.reject_recipients:
+                            self.reply('550 No such user')
+                        else:
+                            rcpt_tos.append(recipient)
+                            self.reply('250 OK')
+                    elif command == 'DATA':
+                        self.receive(mail_from, rcpt_tos)
+                        mail_from, rcpt_tos = None, []
+                    elif command in ('RSET', 'NOOP'):
+                        self.reply('250 OK')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+            def authenticate(self, args):
+                mechanism = args[0].upper() if args else ''
+                if mechanism == 'PLAIN' and len(args) < 2:
+                    self.reply('334 ')
+                    self.read_line()
+                elif mechanism == 'LOGIN':
+                    self.reply('334 ' + base64.b64encode(b'Username:').decode())
+                    self.read_line()
+                    self.reply('334 ' + base64.b64encode(b'Password:').decode())
+                    self.read_line()
+                with sink._lock:
+                    sink.logins += 1
+                self.reply('235 Authentication successful')
+
+            def receive(self, mail_from, rcpt_tos):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    raw = self.rfile.readline()
+                    if raw in (b'.\r\n', b'.\n', b''):
+                        break
+                    lines.append(raw[1:] if raw.startswith(b'..') else raw)
+                if sink._take_failure():
+                    self.reply('451 Temporary failure, try again later')
+                    return
+                data = b''.join(lines)
+                with sink._lock:
+                    sink.messages.append({
+                        'mail_from': mail_from,
+                        'rcpt_tos': rcpt_tos,
+                        'message': message_from_bytes(data),
+                        'received_at': time.time(),
+                    })
+                self.reply('250 OK: queued')
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record SMTP messages instead of delivering them')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    server = SMTPSinkServer(args.host, args.port).start()
+    print(f"SMTP sink listening on {args.host}:{args.port}")
+    seen = 0
+    try:
+        while True:
+            time.sleep(1)
+            for received in server.messages[seen:]:
+                print(f"{received['mail_from']} -> {', '.join(received['rcpt_tos'])}: "
+                      f"{received['message']['Subject']}")
+            seen = len(server.messages)
+    except KeyboardInterrupt:
+        server.stop()
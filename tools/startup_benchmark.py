@@ -0,0 +1,102 @@
+"""
+Measure worker cold start: import time of ``app``, ``create_app()`` time and baseline RSS.
+
+Each run starts a fresh interpreter, so nothing is shared between runs. The
+import profile comes from ``python -X importtime``; heavy libraries that are
+meant to be deferred (models/lazy_imports) are reported if they were imported
+during startup anyway:
+
+    python tools/startup_benchmark.py --runs 5
+    python tools/startup_benchmark.py --json > startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only be imported on the code paths that use them
+DEFERRED_MODULES = ('pandas', 'plotly', 'matplotlib', 'docx', 'reportlab', 'google.generativeai')
+
+# Runs in the child interpreter; prints one JSON line with its measurements
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+from models.lazy_imports import current_rss_mb
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': created - imported,
+    'rss_mb': current_rss_mb(),
+    'deferred_loaded': sorted(name for name in %r if name in sys.modules),
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def parse_importtime(stderr, top=15):
+    """Top-level modules by cumulative import time (microseconds) from ``-X importtime`` output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:  self_us |  cumulative_us | <indent>module"
+        _, cumulative_us, name = line.split('|', 2)
+        # Nested imports are indented further; first-level entries add up to the total
+        if not name[1:].startswith(' '):
+            modules.append((name.strip(), int(cumulative_us)))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return modules[:top]
+
+
+def run_once(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'probe failed')
+    metrics = json.loads(result.stdout.strip().splitlines()[-1])
+    metrics['top_imports'] = parse_importtime(result.stderr)
+    return metrics
+
+
+def benchmark(runs=3):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', SUPABASE_INIT_MODE='lazy', SUPABASE_DIAGNOSTICS='off')
+    results = [run_once(env) for _ in range(runs)]
+
+    def median(key):
+        values = [r[key] for r in results if r[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    return {
+        'runs': runs,
+        'import_seconds': median('import_seconds'),
+        'create_app_seconds': median('create_app_seconds'),
+        'rss_mb': median('rss_mb'),
+        'deferred_loaded': sorted({name for r in results for name in r['deferred_loaded']}),
+        'top_imports': results[-1]['top_imports'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure cold import time and baseline memory of a worker')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to start (median is reported)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    report = benchmark(args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+
+    print(f"import app:   {report['import_seconds']}s (median of {report['runs']})")
+    print(f"create_app(): {report['create_app_seconds']}s")
+    print(f"RSS:          {report['rss_mb']} MB")
+    print(f"Deferred libraries imported at startup: {', '.join(report['deferred_loaded']) or 'none'}")
+    print('Slowest top-level imports:')
+    for name, cumulative_us in report['top_imports']:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
@@ -0,0 +1,155 @@
+"""
+Local stand-in for the AssemblyAI REST API, for tests and offline development.
+
+Implements the three endpoints the app uses (``/v2/upload``, ``/v2/transcript``
+and ``/v2/transcript/<id>``) and calls ``webhook_url`` when a transcript
+completes, just like the real service.
+
+Run standalone and point the app at it:
+
+    python tools/stub_assemblyai.py --port 8765 --delay 3
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8765 ASSEMBLYAI_API_KEY=test flask run
+
+or embed it in a test with ``StubAssemblyAIServer().start()``.
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubAssemblyAIServer:
+    def __init__(self, host='127.0.0.1', port=0, transcript_text='Observer: What did you learn today? '
+                                                                     'Child: I learned how plants drink water.',
+                 delay=1.0, fail=False):
+        self.transcript_text = transcript_text
+        self.delay = delay
+        self.fail = fail
+        self.transcripts = {}
+        self.uploads = {}
+        self.webhook_calls = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _complete(self, transcript_id):
+        time.sleep(self.delay)
+        with self._lock:
+            record = self.transcripts[transcript_id]
+            if self.fail:
+                record.update(status='error', error='Stub transcription failure')
+            else:
+                record.update(status='completed', text=self.transcript_text)
+            webhook_url = record.get('webhook_url')
+            headers = {'Content-Type': 'application/json'}
+            if record.get('webhook_auth_header_name'):
+                headers[record['webhook_auth_header_name']] = record.get('webhook_auth_header_value', '')
+            status = record['status']
+
+        if webhook_url:
+            body = json.dumps({'transcript_id': transcript_id, 'status': status}).encode()
+            request = urllib.request.Request(webhook_url, data=body, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    self.webhook_calls.append((transcript_id, response.status))
+            except Exception as e:
+                self.webhook_calls.append((transcript_id, str(e)))
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            break
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                    return b''.join(chunks)
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def do_POST(self):
+                if not self.headers.get('authorization'):
+                    return self._send(401, {'error': 'Authentication error'})
+
+                body = self._read_body()
+                if self.path == '/v2/upload':
+                    upload_id = str(uuid.uuid4())
+                    with stub._lock:
+                        stub.uploads[upload_id] = len(body)
+                    return self._send(200, {'upload_url': f"{stub.url}/uploads/{upload_id}"})
+
+                if self.path == '/v2/transcript':
+                    request = json.loads(body or b'{}')
+                    if not request.get('audio_url'):
+                        return self._send(400, {'error': 'audio_url is required'})
+                    transcript_id = str(uuid.uuid4())
+                    with stub._lock:
+                        stub.transcripts[transcript_id] = {'id': transcript_id, 'status': 'queued', 'text': None,
+                                                           **request}
+                    threading.Thread(target=stub._complete, args=(transcript_id,), daemon=True).start()
+                    return self._send(200, {'id': transcript_id, 'status': 'queued'})
+
+                return self._send(404, {'error': 'Not found'})
+
+            def do_GET(self):
+                if self.path.startswith('/v2/transcript/'):
+                    transcript_id = self.path.rsplit('/', 1)[-1]
+                    with stub._lock:
+                        record = dict(stub.transcripts.get(transcript_id) or {})
+                    if not record:
+                        return self._send(404, {'error': 'Transcript not found'})
+                    if record['status'] == 'queued':
+                        record['status'] = 'processing'
+                    return self._send(200, record)
+                return self._send(404, {'error': 'Not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stub for the AssemblyAI API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=3.0, help='seconds before a transcript completes')
+    parser.add_argument('--fail', action='store_true', help='complete every transcript with an error')
+    args = parser.parse_args()
+
+    server = StubAssemblyAIServer(args.host, args.port, delay=args.delay, fail=args.fail)
+    print(f"Stub AssemblyAI listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,7 +1,9 @@
 import os
 import uuid
 from datetime import datetime
-import pandas as pd
+from models.lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
 
 
 def generate_unique_filename(original_filename):